@@ -1,66 +1,138 @@
-from flask import Flask, request, jsonify
+import time
+_imports_started = time.perf_counter()
+
+from flask import Flask, Response, request, jsonify, send_file
 from flask_cors import CORS
 import os
-from email_reader import authenticate_gmail, get_unread_emails
-from llm_agent import extract_schedule_from_email
-from calendar_updater import create_event
-from googleapiclient.discovery import build
-import json
-import time
+import uuid
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from email_reader import get_unread_emails, get_new_emails, fetch_new_emails, analyze_emails
+from mailboxes import mailbox_registry
+from llm_agent import OLLAMA_MODEL, extract_schedule_from_email, generation_stats
+from ollama_client import OLLAMA_WARMUP, ollama_client
+from calendar_updater import create_event, find_conflicts
+import calendar_mirror
+from extraction_cache import extraction_cache
+from prefilter import prefilter
+from scheduling_store import scheduling_store, DEFAULT_PAGE_SIZE
+from job_queue import job_queue
+from google_clients import DEFAULT_MAILBOX, get_gmail_service
+import metrics
+import profiler
+import responses
+
+logger = logging.getLogger(__name__)
+
+# Cold start is broken down by phase; /api/ready reports it once startup is done
+startup_phases = OrderedDict(imports_ms=round((time.perf_counter() - _imports_started) * 1000, 1))
+startup_state = {"ready": False, "error": None}
+
+# Component stats exposed as gauges on /api/metrics
+metrics.registry.register_gauges('extraction_cache', extraction_cache.stats)
+metrics.registry.register_gauges('prefilter', prefilter.stats)
+metrics.registry.register_gauges('llm_generation', generation_stats)
+metrics.registry.register_gauges('jobs', job_queue.stats)
+metrics.registry.register_gauges('calendar_mirror', calendar_mirror.stats)
+metrics.registry.register_gauges('ollama', ollama_client.stats)
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for frontend communication
+app.after_request(responses.compress)
 
-# Global variables for Gmail service
-gmail_service = None
+# Part of ETags that depend on this process's in-memory state (the calendar
+# mirror), so they can't match a response from before a restart
+_PROCESS_ID = uuid.uuid4().hex
 
-# In-memory storage for emails with scheduling content
-# Format: {email_id: {email_data with scheduling_info}}
-scheduling_emails_cache = {}
+# Every authorized mailbox is served by this process. Each has its own
+# credentials and incremental sync positions (fetch-emails and check-emails
+# track history separately so one doesn't consume the other's deltas).
+# Request handlers call get_gmail_service(mailbox) to get their own thread's client.
+
+
+@contextmanager
+def _startup_phase(name):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        startup_phases[f"{name}_ms"] = round((time.perf_counter() - started) * 1000, 1)
 
 def initialize_gmail():
-    """Initialize Gmail service on startup"""
-    global gmail_service
+    """Authorize every mailbox on startup; succeeds if at least one is ready"""
     try:
-        creds = authenticate_gmail()
-        gmail_service = build('gmail', 'v1', credentials=creds)
-        return True
+        with _startup_phase('mailboxes'):
+            ready = mailbox_registry.initialize()
     except Exception as e:
-        print(f"Failed to initialize Gmail: {e}")
+        logger.error("Failed to initialize Gmail: %s", e)
+        startup_state["error"] = str(e)
         return False
+    errors = {mailbox.id: mailbox.error for mailbox in mailbox_registry.all() if mailbox.error}
+    startup_state["error"] = errors or None
+    return ready > 0
+
+def _initialize_services():
+    started = time.perf_counter()
+    if initialize_gmail():
+        logger.info("✅ Gmail service initialized successfully")
+        startup_state["ready"] = True
+    else:
+        logger.error("❌ Failed to initialize Gmail service")
+    if OLLAMA_WARMUP:
+        # Load the model now so the first email doesn't pay for it; readiness doesn't wait for this
+        with _startup_phase('llm_warmup'):
+            ollama_client.warm_up(OLLAMA_MODEL)
+    startup_phases["services_total_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    logger.info("⏱️ Startup report: %s", ", ".join(f"{name}={value}" for name, value in startup_phases.items()))
+
+def start_background_initialization():
+    """Initialize services off the main thread so the server can accept traffic right away"""
+    thread = threading.Thread(target=_initialize_services, name='startup-init', daemon=True)
+    thread.start()
+    return thread
+
+@app.route('/api/ready', methods=['GET'])
+def readiness_check():
+    """Readiness endpoint: 200 once services are initialized, 503 while starting up or after a failed start.
+
+    /api/health stays a pure liveness check.
+    """
+    status = 200 if startup_state["ready"] else 503
+    return jsonify({
+        "ready": startup_state["ready"],
+        "error": startup_state["error"],
+        "startup": startup_phases
+    }), status
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
     return jsonify({
         "status": "healthy",
-        "gmail_connected": gmail_service is not None
+        "gmail_connected": any(mailbox.ready for mailbox in mailbox_registry.all()),
+        "mailboxes": [mailbox.to_dict() for mailbox in mailbox_registry.all()],
+        "ollama": ollama_client.endpoint_stats()
     })
 
 @app.route('/api/debug-scheduling', methods=['GET'])
 def debug_scheduling():
     """Debug endpoint to test scheduling detection"""
-    global scheduling_emails_cache
-    
     test_email_text = request.args.get('text', 'Meeting tomorrow at 3pm in room A')
     
     try:
-        structured = extract_schedule_from_email(test_email_text)
-        parsed_data = json.loads(structured)
-        
-        has_action = "action" in parsed_data
-        has_date = bool(str(parsed_data.get("date", "")).strip()) if parsed_data.get("date") else False
-        has_start_time = bool(str(parsed_data.get("start_time", "")).strip()) if parsed_data.get("start_time") else False
+        extraction = extract_schedule_from_email(test_email_text)
         
         return jsonify({
             "test_email": test_email_text,
-            "structured_output": structured,
-            "parsed_data": parsed_data,
-            "has_action_key": has_action,
-            "has_date": has_date,
-            "has_start_time": has_start_time,
-            "would_be_detected": not has_action and has_date and has_start_time,
-            "cache_count": len(scheduling_emails_cache)
+            "parsed_data": extraction.to_dict(),
+            "would_be_detected": extraction.has_event,
+            "cache_count": scheduling_store.count(),
+            "extraction_cache": extraction_cache.stats(),
+            "prefilter": prefilter.stats(),
+            "llm_generation": generation_stats(),
+            "jobs": job_queue.stats()
         })
     except Exception as e:
         import traceback
@@ -69,142 +141,198 @@ def debug_scheduling():
             "traceback": traceback.format_exc()
         }), 500
 
+def _get_mailbox(require_ready=True):
+    """Resolve the ``mailbox`` query (or JSON body) parameter.
+
+    Returns (mailbox, None), or (None, error response) for an invalid,
+    unknown or not yet initialized mailbox.
+    """
+    mailbox_id = request.args.get('mailbox')
+    if mailbox_id is None and request.is_json:
+        mailbox_id = (request.get_json(silent=True) or {}).get('mailbox')
+    try:
+        mailbox = mailbox_registry.get(mailbox_id or DEFAULT_MAILBOX)
+    except ValueError as e:
+        return None, (jsonify({"error": str(e)}), 400)
+    if mailbox is None:
+        return None, (jsonify({"error": f"Unknown mailbox: {mailbox_id}"}), 404)
+    if require_ready and not mailbox.ready:
+        return None, (jsonify({"error": "Gmail service not initialized"}), 500)
+    return mailbox, None
+
 @app.route('/api/emails', methods=['GET'])
 def get_emails():
-    """Get unread emails"""
-    if not gmail_service:
-        return jsonify({"error": "Gmail service not initialized"}), 500
+    """Get unread emails.
+
+    ``fields=id,subject`` limits each email to those keys. The ETag is a hash
+    of the body, so an unchanged inbox is answered with a 304.
+    """
+    mailbox, error = _get_mailbox()
+    if error:
+        return error
     
     try:
         max_results = request.args.get('max_results', 5, type=int)
-        emails = get_unread_emails(gmail_service, max_results)
-        return jsonify({"emails": emails})
+        emails = get_unread_emails(get_gmail_service(mailbox.id), max_results, mailbox=mailbox.id)
+        response = jsonify({"emails": responses.project(emails, responses.requested_fields())})
+        return responses.with_etag(response).make_conditional(request)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @app.route('/api/fetch-emails', methods=['GET'])
 def fetch_emails():
-    """Fetch up to 10 unread emails and analyze them for scheduling content"""
-    global scheduling_emails_cache
+    """Queue a job that fetches new unread emails and analyzes them for scheduling content.
+
+    Returns 202 with a job id; poll /api/jobs/<job_id> for per-email progress
+    and the result. While a fetch job for the mailbox is queued or running,
+    further requests get that same job back.
+    """
+    mailbox, error = _get_mailbox()
+    if error:
+        return error
     
-    if not gmail_service:
-        return jsonify({"error": "Gmail service not initialized"}), 500
+    full = request.args.get('full', 'false').lower() == 'true'
+    run = lambda job: _fetch_and_analyze_emails(job, mailbox, full)
+    if _profiling_requested():
+        run = _profiled_job(run)
+    job, created = job_queue.submit('fetch-emails', mailbox.id, run)
+    return _job_accepted(job, created)
+
+def _fetch_and_analyze_emails(job, mailbox, full=False):
+    """Fetch unread emails that arrived since the last fetch and analyze them for scheduling content.
+
+    The first run (or ``full=True``) does a full resync of up to 10 unread
+    emails; later runs only analyze new mail. Results are upserted into the
+    scheduling store, and emails that failed are fetched again next run.
+    """
+    # A full resync checks at most 10 emails
+    max_results = 10
+    if full or not mailbox.fetch_sync.history_id:
+        mailbox.fetch_sync.reset()
+    emails, history_id, failed_ids = fetch_new_emails(get_gmail_service(mailbox.id), mailbox.fetch_sync, max_results)
     
-    try:
-        # Always check exactly 10 emails
-        max_results = 10
-        emails = get_unread_emails(gmail_service, max_results, process_emails=False)
-        
-        # Clear previous cache
-        scheduling_emails_cache = {}
+    # Analyze all emails for scheduling content concurrently (bounded by LLM_CONCURRENCY);
+    # emails the prefilter rules out never reach the LLM
+    for email in emails:
+        job.set_progress(email['id'], 'analyzing')
+    extraction_results = analyze_emails(emails, mailbox.id)
+    
+    scheduling_count = 0
+    for email, extraction in zip(emails, extraction_results):
+        logger.debug("📧 Analyzing email: %s", email.get('subject', 'No subject')[:50])
         
-        # Analyze each email for scheduling content
-        scheduling_count = 0
-        for email in emails:
-            try:
-                print(f"\n📧 Analyzing email: {email.get('subject', 'No subject')[:50]}")
-                
-                # Analyze email content for scheduling information
-                structured = extract_schedule_from_email(email.get('snippet', ''))
-                parsed_data = json.loads(structured)
-                
-                print(f"📊 Parsed data keys: {list(parsed_data.keys())}")
-                print(f"📊 Has 'action' key: {'action' in parsed_data}")
-                
-                # Check if it contains scheduling information
-                # Method 1: Check if it explicitly says "No scheduling info"
-                has_action_key = "action" in parsed_data
-                
-                # Method 2: Check if it has valid scheduling fields (date and start_time)
-                # Handle None, null strings, and empty strings
-                date_value = parsed_data.get("date")
-                start_time_value = parsed_data.get("start_time")
-                
-                has_date = (
-                    date_value is not None 
-                    and str(date_value).strip().lower() not in ["null", "none", ""]
-                    and len(str(date_value).strip()) > 0
-                )
-                
-                has_start_time = (
-                    start_time_value is not None 
-                    and str(start_time_value).strip().lower() not in ["null", "none", ""]
-                    and len(str(start_time_value).strip()) > 0
-                )
-                
-                has_valid_scheduling = has_date and has_start_time
-                
-                print(f"📊 Has date: {has_date} ({parsed_data.get('date')})")
-                print(f"📊 Has start_time: {has_start_time} ({parsed_data.get('start_time')})")
-                print(f"📊 Has valid scheduling: {has_valid_scheduling}")
-                
-                if not has_action_key and has_valid_scheduling:
-                    # This email has scheduling information - store it
-                    scheduling_count += 1
-                    print(f"✅ Email {email['id']} has scheduling content!")
-                    scheduling_emails_cache[email['id']] = {
-                        "email_id": email['id'],
-                        "subject": email['subject'],
-                        "from": email['from'],
-                        "snippet": email['snippet'],
-                        "scheduling_data": parsed_data,
-                        "has_scheduling": True
-                    }
-                else:
-                    print(f"❌ Email {email['id']} does NOT have scheduling content")
-                    if has_action_key:
-                        print(f"   Reason: Has 'action' key: {parsed_data.get('action')}")
-                    if not has_valid_scheduling:
-                        print(f"   Reason: Missing date or start_time")
-                    
-            except json.JSONDecodeError as e:
-                # If JSON parsing fails, skip this email
-                print(f"⚠️ JSON Error analyzing email {email.get('id', 'unknown')}: {e}")
-                print(f"   Raw structured output: {structured[:200]}")
-                continue
-            except Exception as e:
-                # If parsing fails, skip this email
-                print(f"⚠️ Error analyzing email {email.get('id', 'unknown')}: {e}")
-                import traceback
-                traceback.print_exc()
-                continue
+        # A failed extraction comes back as the exception it raised; skip that email
+        if isinstance(extraction, Exception):
+            logger.warning("⚠️ Error analyzing email %s: %s", email.get('id', 'unknown'), extraction)
+            job.set_progress(email['id'], 'error')
+            failed_ids.append(email['id'])
+            continue
         
-        return jsonify({
-            "success": True,
-            "count": len(emails),
-            "emails": emails,
-            "scheduling_found": scheduling_count,
-            "message": f"Fetched {len(emails)} emails. Found {scheduling_count} emails with scheduling content."
-        })
+        try:
+            if extraction.has_event:
+                # This email has scheduling information - store it
+                logger.debug("✅ Email %s has scheduling content!", email['id'])
+                scheduling_store.upsert(email, extraction.to_dict(), mailbox.id)
+                scheduling_count += 1
+                job.set_progress(email['id'], 'scheduling_found')
+            else:
+                logger.debug("❌ Email %s does NOT have scheduling content", email['id'])
+                scheduling_store.remove(email['id'], mailbox.id)
+                job.set_progress(email['id'], 'no_scheduling')
+        except Exception as e:
+            logger.exception("⚠️ Error storing result for email %s: %s", email.get('id', 'unknown'), e)
+            job.set_progress(email['id'], 'error')
+            failed_ids.append(email['id'])
+    mailbox.fetch_sync.commit(history_id, failed_ids)
+    
+    return {
+        "success": True,
+        "count": len(emails),
+        "emails": emails,
+        "scheduling_found": scheduling_count,
+        "message": f"Fetched {len(emails)} new emails. Found {scheduling_count} emails with scheduling content."
+    }
+
+def _sync_calendar_mirror(mailbox):
+    """Bring the mailbox's calendar mirror up to date (one incremental sync at most); False if that failed"""
+    try:
+        calendar_mirror.get_mirror(mailbox.id).refresh()
+        return True
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        logger.warning("⚠️ Couldn't sync calendar for %s: %s", mailbox.id, e)
+        return False
+
+def _flag_conflicts(emails, mailbox, synced):
+    """Set ``conflict`` on each stored email: whether its event overlaps another calendar event.
+
+    The check runs against the local calendar mirror; ``conflict`` is None
+    when it can't be decided.
+    """
+    for email in emails:
+        conflicts = None
+        if synced:
+            try:
+                conflicts = find_conflicts(email['scheduling_data'], mailbox.id, email['email_id'])
+            except Exception:
+                pass
+        email['conflict'] = None if conflicts is None else bool(conflicts)
+        email['conflicts'] = conflicts or []
 
 @app.route('/api/scheduling-emails', methods=['GET'])
 def get_scheduling_emails():
-    """Get cached emails that contain scheduling information"""
-    global scheduling_emails_cache
-    
-    if not gmail_service:
-        return jsonify({"error": "Gmail service not initialized"}), 500
+    """Get stored emails that contain scheduling information.
+
+    Query params:
+        limit: page size (default 50, max 500)
+        cursor: ``next_cursor`` from the previous page
+        date_from, date_to: inclusive YYYY-MM-DD bounds on the event date
+        mailbox: mailbox id (default "default")
+        fields: comma-separated keys to keep in each email, e.g. ``email_id,subject,event_date``
+
+    The ETag follows the store's version and the calendar mirror, so polls
+    that find nothing new get a 304 without the page being rebuilt.
+    """
+    mailbox, error = _get_mailbox()
+    if error:
+        return error
     
     try:
-        # Return cached scheduling emails (stored when fetch-emails was called)
-        valid_scheduling_emails = list(scheduling_emails_cache.values())
+        synced = _sync_calendar_mirror(mailbox)
+        mirror_version = calendar_mirror.get_mirror(mailbox.id).version if synced else None
+        etag = responses.etag_for(scheduling_store.version(), _PROCESS_ID, mirror_version)
+        cached = responses.not_modified(etag)
+        if cached is not None:
+            return cached
+
+        limit = request.args.get('limit', DEFAULT_PAGE_SIZE, type=int)
+        cursor = request.args.get('cursor')
+        date_from = request.args.get('date_from')
+        date_to = request.args.get('date_to')
         
-        if len(valid_scheduling_emails) == 0:
-            return jsonify({
+        try:
+            # Return stored scheduling emails (stored when fetch-emails was called)
+            valid_scheduling_emails, next_cursor = scheduling_store.list(limit, cursor, date_from, date_to, mailbox.id)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        total = scheduling_store.count(date_from, date_to, mailbox.id)
+        _flag_conflicts(valid_scheduling_emails, mailbox, synced)
+        
+        if total == 0:
+            return responses.with_etag(jsonify({
                 "success": True,
                 "scheduling_count": 0,
                 "scheduling_emails": [],
+                "next_cursor": None,
                 "message": "No emails with scheduling content found. Please click 'Fetch Emails' first to analyze emails."
-            })
+            }), etag)
         
-        return jsonify({
+        return responses.with_etag(jsonify({
             "success": True,
-            "scheduling_count": len(valid_scheduling_emails),
-            "scheduling_emails": valid_scheduling_emails,
-            "message": f"Found {len(valid_scheduling_emails)} emails with scheduling information"
-        })
+            "scheduling_count": total,
+            "scheduling_emails": responses.project(valid_scheduling_emails, responses.requested_fields()),
+            "next_cursor": next_cursor,
+            "message": f"Found {total} emails with scheduling information"
+        }), etag)
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -212,6 +340,9 @@ def get_scheduling_emails():
 @app.route('/api/schedule-event', methods=['POST'])
 def schedule_event():
     """Schedule an event from scheduling data"""
+    mailbox, error = _get_mailbox(require_ready=False)
+    if error:
+        return error
     try:
         data = request.get_json()
         scheduling_data = data.get('scheduling_data')
@@ -231,12 +362,15 @@ def schedule_event():
             }), 400
         
         # Create calendar event
-        create_event(scheduling_data)
+        event = create_event(scheduling_data, mailbox.id)
         
         return jsonify({
             "success": True,
             "message": "Event created successfully",
-            "event_data": scheduling_data
+            "event_data": scheduling_data,
+            "event_id": event.get('id'),
+            "event_link": event.get('htmlLink'),
+            "conflicts": event.get('conflicts', [])
         })
         
     except Exception as e:
@@ -245,6 +379,18 @@ def schedule_event():
 @app.route('/api/process-email', methods=['POST'])
 def process_email():
     """Process a specific email for scheduling"""
+    if not _profiling_requested():
+        return _process_email()
+    with profiler.profile('process-email') as prof:
+        response = _process_email()
+    # Handlers return either a response or a (response, status) tuple
+    (response[0] if isinstance(response, tuple) else response).headers['X-Profile-Url'] = _profile_url(prof)
+    return response
+
+def _process_email():
+    mailbox, error = _get_mailbox(require_ready=False)
+    if error:
+        return error
     try:
         data = request.get_json()
         email_text = data.get('email_text')
@@ -253,78 +399,119 @@ def process_email():
             return jsonify({"error": "Email text is required"}), 400
         
         # Extract schedule information using LLM
-        structured = extract_schedule_from_email(email_text)
-        
         try:
-            parsed_data = json.loads(structured)
-            
-            # Check if it's a scheduling email
-            if "action" in parsed_data:
-                return jsonify({
-                    "success": False,
-                    "message": "No scheduling information found in email",
-                    "raw_output": structured
-                })
-            
-            # Validate required fields
-            required_fields = ['title', 'date', 'start_time', 'end_time']
-            missing_fields = [field for field in required_fields if not parsed_data.get(field)]
-            
-            if missing_fields:
-                return jsonify({
-                    "success": False,
-                    "message": f"Missing required fields: {', '.join(missing_fields)}",
-                    "raw_output": structured
-                })
-            
-            # Create calendar event
-            create_event(parsed_data)
-            
+            extraction = extract_schedule_from_email(email_text)
+        except ValueError as e:
             return jsonify({
-                "success": True,
-                "message": "Event created successfully",
-                "event_data": parsed_data
+                "success": False,
+                "message": "Failed to parse LLM output",
+                "error": str(e)
             })
-            
-        except json.JSONDecodeError as e:
+        
+        # Extractions without a date and start time come back as "no event"
+        if not extraction.has_event:
             return jsonify({
                 "success": False,
-                "message": "Failed to parse LLM output as JSON",
-                "raw_output": structured,
-                "error": str(e)
+                "message": "No scheduling information found in email"
             })
+        
+        # Create calendar event
+        event_data = extraction.to_dict()
+        event = create_event(event_data, mailbox.id)
+        
+        return jsonify({
+            "success": True,
+            "message": "Event created successfully",
+            "event_data": event_data,
+            "event_id": event.get('id'),
+            "event_link": event.get('htmlLink'),
+            "conflicts": event.get('conflicts', [])
+        })
             
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @app.route('/api/check-emails', methods=['POST'])
 def check_emails():
-    """Check for new emails and process them automatically"""
-    if not gmail_service:
-        return jsonify({"error": "Gmail service not initialized"}), 500
+    """Queue a job that checks for emails that arrived since the last check and processes them automatically.
+
+    Returns 202 with a job id; poll /api/jobs/<job_id> for progress and the result.
+    """
+    mailbox, error = _get_mailbox()
+    if error:
+        return error
     
-    try:
-        max_results = request.args.get('max_results', 5, type=int)
-        # Delegate scheduling to email_reader which already creates events
-        emails = get_unread_emails(gmail_service, max_results, process_emails=True)
+    max_results = request.args.get('max_results', 5, type=int)
+    job, created = job_queue.submit('check-emails', mailbox.id, lambda job: _check_and_schedule_emails(job, mailbox, max_results))
+    return _job_accepted(job, created)
 
-        return jsonify({
-            "processed_count": len(emails),
-            "emails": emails,
-            "message": f"Checked {len(emails)} unread emails; scheduling attempted via email_reader."
-        })
-        
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+def _check_and_schedule_emails(job, mailbox, max_results):
+    # Delegate scheduling to email_reader which already creates events
+    emails = get_new_emails(get_gmail_service(mailbox.id), mailbox.check_sync, max_results, process_emails=True, progress=job.set_progress)
+
+    return {
+        "processed_count": len(emails),
+        "emails": emails,
+        "message": f"Checked {len(emails)} new unread emails; scheduling attempted via email_reader."
+    }
+
+def _profiling_requested():
+    """A request opts into profiling with ?profile=1 or an ``X-Profile: 1`` header"""
+    if not profiler.PROFILING_ENABLED:
+        return False
+    flag = request.args.get('profile') or request.headers.get('X-Profile') or ''
+    return flag.lower() in ('1', 'true')
+
+def _profile_url(prof):
+    return f"/api/profiles/{prof.id}"
+
+def _profiled_job(run):
+    def profiled(job):
+        with profiler.profile(job.kind) as prof:
+            result = run(job)
+        result["profile_url"] = _profile_url(prof)
+        return result
+    return profiled
+
+def _job_accepted(job, created):
+    return jsonify({
+        "success": True,
+        "job_id": job.id,
+        "status": job.status,
+        "coalesced": not created,
+        "status_url": f"/api/jobs/{job.id}"
+    }), 202
+
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """Per-stage latency histograms, error counters and component stats in the Prometheus text format"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/profiles/<profile_id>', methods=['GET'])
+def get_profile(profile_id):
+    """Download a saved profile as JSON"""
+    path = profiler.profile_path(profile_id)
+    if path is None:
+        return jsonify({"error": "Profile not found"}), 404
+    return send_file(os.path.abspath(path), mimetype='application/json', as_attachment=True,
+                     download_name=f"profile-{profile_id}.json")
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Report status, per-email progress and (once finished) the result of a background job"""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job.to_dict())
 
 if __name__ == '__main__':
-    print("🚀 Starting AI Email Scheduler Backend...")
+    logging.basicConfig(level=os.getenv('LOG_LEVEL', 'INFO').upper(), format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+    logger.info("🚀 Starting AI Email Scheduler Backend...")
     
-    # Initialize Gmail service
-    if initialize_gmail():
-        print("✅ Gmail service initialized successfully")
-    else:
-        print("❌ Failed to initialize Gmail service")
+    # Initialize Gmail service in the background; /api/ready reports when it's done
+    start_background_initialization()
     
-    # Start Flask app
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    # Start Flask app. The debug reloader re-imports everything in a second
+    # process, so it's opt-in via FLASK_DEBUG.
+    debug = os.getenv('FLASK_DEBUG', 'false').lower() in ('1', 'true')
+    app.run(host='0.0.0.0', port=5000, debug=debug, use_reloader=debug)
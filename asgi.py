@@ -0,0 +1,121 @@
+"""ASGI entry point: the Flask app plus the asyncio email pipeline.
+
+    uvicorn asgi:application --host 0.0.0.0 --port 5000
+
+Every existing route is served by the Flask app through asgiref's
+WsgiToAsgi (in a thread pool). ``POST /api/async/check-emails`` runs
+fetch -> extract -> schedule on the event loop instead, so one process can
+keep hundreds of emails in flight without a thread for each.
+"""
+import json
+import asyncio
+import logging
+import os
+from urllib.parse import parse_qs
+from asgiref.wsgi import WsgiToAsgi
+
+import app as flask_app
+from async_pipeline import AsyncGoogleClient, process_mailbox
+from mailboxes import mailbox_registry
+from google_clients import DEFAULT_MAILBOX
+from ollama_client import close_async_client
+
+logger = logging.getLogger(__name__)
+
+wsgi_application = WsgiToAsgi(flask_app.app)
+
+# Created at startup, inside the server's event loop
+_google_client = None
+
+
+async def _send_json(send, status, payload):
+    body = json.dumps(payload).encode('utf-8')
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())]
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def _wait_for_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+async def check_emails(scope, receive, send):
+    """Process a mailbox's new unread emails on the event loop.
+
+    Shares its sync position with ``POST /api/check-emails``, so each new
+    email is handled by one of the two. Query params: mailbox (default
+    "default"), max_results (default 50), create_events (default true).
+    If the client disconnects, the run is cancelled.
+    """
+    params = {key: values[-1] for key, values in parse_qs(scope['query_string'].decode('latin-1')).items()}
+    mailbox_id = params.get('mailbox') or DEFAULT_MAILBOX
+    try:
+        max_results = int(params.get('max_results', '50'))
+        mailbox = mailbox_registry.get(mailbox_id)
+    except ValueError as e:
+        return await _send_json(send, 400, {"error": str(e)})
+    if mailbox is None:
+        return await _send_json(send, 404, {"error": f"Unknown mailbox: {mailbox_id}"})
+    if not mailbox.ready:
+        return await _send_json(send, 500, {"error": "Gmail service not initialized"})
+    create_events = params.get('create_events', 'true').lower() == 'true'
+
+    run = asyncio.create_task(process_mailbox(_google_client, mailbox.check_sync, max_results, create_events))
+    disconnect = asyncio.create_task(_wait_for_disconnect(receive))
+    await asyncio.wait({run, disconnect}, return_when=asyncio.FIRST_COMPLETED)
+    if not run.done():
+        logger.info("🛑 Client went away, cancelling the run for %s", mailbox.id)
+        run.cancel()
+        return
+    disconnect.cancel()
+
+    try:
+        results = run.result()
+    except TimeoutError:
+        return await _send_json(send, 504, {"error": "Timed out"})
+    except Exception as e:
+        logger.exception("❌ Async run for %s failed", mailbox.id)
+        return await _send_json(send, 500, {"error": str(e)})
+    await _send_json(send, 200, {
+        "success": True,
+        "mailbox": mailbox.id,
+        "count": len(results),
+        "scheduled": sum(1 for result in results if result.get('event_id')),
+        "emails": results
+    })
+
+
+ASYNC_ROUTES = {
+    ('POST', '/api/async/check-emails'): check_emails
+}
+
+
+async def _lifespan(receive, send):
+    global _google_client
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            logging.basicConfig(level=os.getenv('LOG_LEVEL', 'INFO').upper(),
+                                format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+            flask_app.start_background_initialization()
+            _google_client = AsyncGoogleClient()
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            if _google_client is not None:
+                await _google_client.aclose()
+            await close_async_client()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await _lifespan(receive, send)
+    route = ASYNC_ROUTES.get((scope.get('method'), scope.get('path'))) if scope['type'] == 'http' else None
+    if route is None:
+        return await wsgi_application(scope, receive, send)
+    return await route(scope, receive, send)
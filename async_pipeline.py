@@ -0,0 +1,220 @@
+import os
+import asyncio
+import logging
+from urllib.parse import quote
+from email_body import EMAIL_BODY_MAX_BYTES, MESSAGE_FIELDS, email_text
+from email_reader import METADATA_HEADERS, _parse_message
+from google_clients import get_credentials, get_gmail_service
+from llm_agent import extract_schedules_async
+from metrics import timed
+from prefilter import prefilter, NO_SCHEDULING_RESULT
+from rate_limiter import GMAIL_QUOTA_UNITS, rate_limiter
+from scheduling_store import scheduling_store
+import calendar_mirror
+import calendar_updater
+
+logger = logging.getLogger(__name__)
+
+# Per-stage timeouts in seconds: one Gmail or Calendar call, one LLM generation, and a whole run
+ASYNC_GOOGLE_TIMEOUT = float(os.getenv('ASYNC_GOOGLE_TIMEOUT', '30'))
+ASYNC_LLM_TIMEOUT = float(os.getenv('ASYNC_LLM_TIMEOUT', '120'))
+ASYNC_PIPELINE_TIMEOUT = float(os.getenv('ASYNC_PIPELINE_TIMEOUT', '600'))
+# Open connections to Google per process
+ASYNC_GOOGLE_CONNECTIONS = int(os.getenv('ASYNC_GOOGLE_CONNECTIONS', '100'))
+
+GMAIL_API_URL = 'https://gmail.googleapis.com/gmail/v1/users/me'
+CALENDAR_API_URL = 'https://www.googleapis.com/calendar/v3'
+
+
+def _http_error(response):
+    """A googleapiclient HttpError for a failed response, so retry and 409 handling match the sync path"""
+    import httplib2
+    from googleapiclient.errors import HttpError
+
+    resp = httplib2.Response(dict(response.headers, status=str(response.status_code)))
+    return HttpError(resp, response.content, uri=str(response.url))
+
+
+class AsyncGoogleClient:
+    """Gmail and Calendar REST calls over one ``httpx.AsyncClient``.
+
+    Calls share the process's rate limiter buckets with the sync clients
+    and are retried the same way. Credentials come from google_clients;
+    a refresh runs in a worker thread.
+    """
+
+    def __init__(self, connections=ASYNC_GOOGLE_CONNECTIONS, timeout=ASYNC_GOOGLE_TIMEOUT):
+        import httpx
+
+        self.http = httpx.AsyncClient(
+            timeout=httpx.Timeout(timeout),
+            limits=httpx.Limits(max_connections=connections, max_keepalive_connections=connections)
+        )
+        self._credentials = {}
+
+    async def _token(self, mailbox):
+        creds = self._credentials.get(mailbox)
+        if creds is None or not creds.valid:
+            creds = self._credentials[mailbox] = await asyncio.to_thread(get_credentials, mailbox)
+        return creds.token
+
+    async def request(self, method, url, api, mailbox, cost=1, idempotent=True, **kwargs):
+        import httpx
+
+        async def call():
+            headers = {'Authorization': f"Bearer {await self._token(mailbox)}"}
+            try:
+                response = await self.http.request(method, url, headers=headers, **kwargs)
+            except httpx.TransportError as e:
+                # OSError, so is_retryable treats it like a dropped connection
+                raise ConnectionError(f"{method} {url}: {e!r}") from e
+            if response.status_code >= 400:
+                raise _http_error(response)
+            return response.json()
+
+        return await rate_limiter.execute_async(call, api, mailbox, cost, idempotent)
+
+    async def get_message(self, mailbox, message_id):
+        if EMAIL_BODY_MAX_BYTES > 0:
+            params = {'format': 'full', 'fields': MESSAGE_FIELDS}
+        else:
+            params = {'format': 'metadata', 'metadataHeaders': METADATA_HEADERS}
+        with timed('gmail_get'):
+            message = await self.request('GET', f"{GMAIL_API_URL}/messages/{quote(message_id)}", 'gmail', mailbox,
+                                         cost=GMAIL_QUOTA_UNITS['messages.get'], params=params)
+        return _parse_message(message)
+
+    async def insert_event(self, mailbox, event):
+        """Insert an event with a client-chosen id; an existing event with that id is fetched instead"""
+        from googleapiclient.errors import HttpError
+
+        url = f"{CALENDAR_API_URL}/calendars/{quote(calendar_mirror.CALENDAR_ID)}/events"
+        try:
+            with timed('calendar_insert'):
+                return await self.request('POST', url, 'calendar', mailbox, json=event)
+        except HttpError as e:
+            if e.resp.status != 409:
+                raise
+        logger.info("✅ Event %s already exists", event['id'])
+        return await self.request('GET', f"{url}/{quote(event['id'])}", 'calendar', mailbox)
+
+    async def aclose(self):
+        await self.http.aclose()
+
+
+def _check_mirror(mirror, event_id, title, start, end):
+    """The duplicate of an event (or None) and the events it conflicts with"""
+    existing = mirror.find_duplicate(event_id, title, start, end)
+    if existing is not None:
+        return existing, mirror.conflicts(title, start, end, existing['id'])
+    return None, mirror.conflicts(title, start, end, event_id)
+
+
+async def _schedule(client, mailbox, email, data, mirror):
+    """Async version of ``calendar_updater.create_event`` for one extracted event"""
+    data = dict(data, title=data.get('title') or "Untitled Event")
+    event = calendar_updater.build_event(data, mailbox, email['id'])
+    start, end = event['start']['dateTime'], event['end']['dateTime']
+    conflicts = []
+    if mirror is not None:
+        # The mirror's lock is held while it syncs with Calendar, so never wait for it on the loop
+        existing, conflicts = await asyncio.to_thread(_check_mirror, mirror, event['id'], data['title'], start, end)
+        if existing is not None:
+            return dict(existing, conflicts=conflicts)
+    created = await client.insert_event(mailbox, event)
+    if mirror is not None:
+        await asyncio.to_thread(mirror.record, created)
+    return dict(created, conflicts=conflicts)
+
+
+async def _store_and_schedule(client, mailbox, email, data, mirror, create_events):
+    await asyncio.to_thread(scheduling_store.upsert, email, data, mailbox)
+    if create_events:
+        return await _schedule(client, mailbox, email, data, mirror)
+    return None
+
+
+async def _guarded(coro):
+    # One email's failure is its result, not a reason to cancel the others
+    try:
+        return await coro
+    except Exception as e:
+        return e
+
+
+def _new_message_ids(sync, max_results):
+    return sync.get_new_message_ids(get_gmail_service(sync.mailbox), max_results)
+
+
+async def process_mailbox(client, sync, max_results=50, create_events=True):
+    """Fetch the unread emails that are new to ``sync``, extract their events and add them to the calendar.
+
+    Like ``email_reader.get_new_emails``, the run starts from the position
+    of the mailbox's ``MailboxSync`` and commits it once the emails are
+    handled; emails that failed are retried by the next run. Each stage
+    runs its emails concurrently, and a failed email gets an ``error``
+    while the rest carry on. The whole run is bounded by
+    ASYNC_PIPELINE_TIMEOUT, and cancelling it (e.g. the client
+    disconnecting) cancels everything still in flight without committing.
+    """
+    mailbox = sync.mailbox
+    async with asyncio.timeout(ASYNC_PIPELINE_TIMEOUT):
+        # history.list and the commit go through the sync client and file I/O, so they run in a thread
+        message_ids, history_id = await asyncio.to_thread(_new_message_ids, sync, max_results)
+
+        async with asyncio.TaskGroup() as group:
+            fetches = [group.create_task(_guarded(client.get_message(mailbox, message_id))) for message_id in message_ids]
+        emails, results, failed_ids = [], [], []
+        for message_id, fetch in zip(message_ids, fetches):
+            if isinstance(fetch.result(), Exception):
+                logger.warning("⚠️ Couldn't fetch message %s: %s", message_id, fetch.result())
+                results.append({"id": message_id, "error": str(fetch.result())})
+                failed_ids.append(message_id)
+            elif 'UNREAD' in fetch.result()['labels']:
+                # A message may have been read between the history record and our fetch
+                emails.append(fetch.result())
+
+        decisions = [prefilter.check(email) for email in emails]
+        to_extract = [email for email, decision in zip(emails, decisions) if decision['call_llm']]
+        extracted = iter(await extract_schedules_async([email_text(email) for email in to_extract], ASYNC_LLM_TIMEOUT))
+        extractions = [next(extracted) if decision['call_llm'] else NO_SCHEDULING_RESULT for decision in decisions]
+
+        mirror = None
+        if create_events:
+            mirror = calendar_mirror.get_mirror(mailbox)
+            try:
+                await asyncio.to_thread(mirror.refresh)
+            except Exception as e:
+                logger.warning("⚠️ Couldn't sync calendar for %s: %s", mailbox, e)
+                mirror = None
+
+        for email, decision, extraction in zip(emails, decisions, extractions):
+            if not isinstance(extraction, Exception) and decision['call_llm']:
+                prefilter.record_outcome(email, decision, extraction)
+
+        handled = {}
+        async with asyncio.TaskGroup() as group:
+            for email, extraction in zip(emails, extractions):
+                if isinstance(extraction, Exception) or not extraction.has_event:
+                    continue
+                handled[email['id']] = group.create_task(_guarded(
+                    _store_and_schedule(client, mailbox, email, extraction.to_dict(), mirror, create_events)))
+
+        for email, extraction in zip(emails, extractions):
+            result = {"id": email['id'], "subject": email['subject'], "from": email['from']}
+            if isinstance(extraction, Exception):
+                result["error"] = str(extraction)
+            else:
+                result["scheduling_data"] = extraction.to_dict()
+            task = handled.get(email['id'])
+            event = task.result() if task is not None else None
+            if isinstance(event, Exception):
+                result["error"] = str(event)
+            elif event is not None:
+                result.update(event_id=event.get('id'), event_link=event.get('htmlLink'), conflicts=event.get('conflicts', []))
+            if "error" in result:
+                failed_ids.append(email['id'])
+            results.append(result)
+
+        await asyncio.to_thread(sync.commit, history_id, failed_ids)
+    return results
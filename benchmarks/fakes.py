@@ -0,0 +1,368 @@
+"""Offline stand-ins for Gmail, Calendar and Ollama used by the benchmarks.
+
+Each fake can inject a fixed latency per call and fail a configurable share
+of calls, so the pipeline can be measured without any network access.
+"""
+import base64
+import json
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SCHEDULING_SNIPPETS = [
+    "Hi team, let's have a meeting on {date} at {hour}:00pm in room {room} to review the roadmap.",
+    "Can we do a call on {date} at {hour}:30pm? I'd like to walk through the demo.",
+    "Interview scheduled for {date} at {hour}:00am with the hiring panel in room {room}.",
+]
+
+OTHER_SNIPPETS = [
+    "Your order #{room}{hour} has shipped and is on its way.",
+    "This week's newsletter: ten tips for better productivity.",
+    "Thanks for the update, I'll take a look when I get a chance.",
+]
+
+
+class _FakeResponse(dict):
+    """Response headers plus status, like httplib2.Response"""
+
+    def __init__(self, status, reason, headers=None):
+        super().__init__(headers or {})
+        self.status = status
+        self.reason = reason
+
+
+class FakeHttpError(Exception):
+    """Looks enough like googleapiclient.errors.HttpError for the code under test"""
+
+    def __init__(self, status, reason='backendError', headers=None):
+        super().__init__(f"<HttpError {status} \"{reason}\">")
+        self.resp = _FakeResponse(status, reason, headers)
+        self.status_code = status
+
+
+def _b64url(text):
+    return base64.urlsafe_b64encode(text.encode()).decode().rstrip('=')
+
+
+def _body_parts(text, i):
+    """text/plain and text/html alternatives with a signature and a quoted earlier message"""
+    plain = (
+        f"{text}\n\nLet me know if that works.\n\nBest regards,\nSender {i % 50}\n"
+        f"Sender Corp | +1 555 0100\n\n"
+        f"On Mon, Jan 6, 2025 at 9:00 AM Someone <someone@example.com> wrote:\n"
+        f"> Earlier thread about last week's meeting at 10:00am.\n"
+    )
+    rich = f"<html><body><p>{text}</p><p>Let me know if that works.</p><blockquote>old thread</blockquote></body></html>"
+    return [
+        {'mimeType': 'text/plain', 'filename': '', 'body': {'size': len(plain), 'data': _b64url(plain)}},
+        {'mimeType': 'text/html', 'filename': '', 'body': {'size': len(rich), 'data': _b64url(rich)}},
+    ]
+
+
+def make_mailbox(size, scheduling_ratio=0.2, seed=42):
+    """Build a synthetic mailbox of ``size`` unread messages"""
+    rng = random.Random(seed)
+    messages = []
+    for i in range(size):
+        fields = {
+            'date': f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            'hour': rng.randint(1, 11),
+            'room': rng.randint(100, 999),
+        }
+        scheduling = rng.random() < scheduling_ratio
+        template = rng.choice(SCHEDULING_SNIPPETS if scheduling else OTHER_SNIPPETS)
+        text = f"{template.format(**fields)} (ref {i})"
+        messages.append({
+            'id': f"msg{i:06d}",
+            'threadId': f"thr{i:06d}",
+            'labelIds': ['UNREAD', 'INBOX'],
+            'snippet': text,
+            'payload': {
+                'mimeType': 'multipart/alternative',
+                'headers': [
+                    {'name': 'Subject', 'value': f"Subject {i}"},
+                    {'name': 'From', 'value': f"sender{i % 50}@example.com"},
+                ],
+                'body': {'size': 0},
+                'parts': _body_parts(text, i),
+            },
+            'scheduling': scheduling,
+        })
+    return messages
+
+
+class _Request:
+    def __init__(self, fn):
+        self._fn = fn
+
+    def execute(self, **kwargs):
+        return self._fn()
+
+
+class _Batch:
+    def __init__(self, service, callback):
+        self._service = service
+        self._callback = callback
+        self._requests = []
+
+    def add(self, request, request_id=None, callback=None):
+        self._requests.append((request, request_id, callback or self._callback))
+
+    def execute(self, **kwargs):
+        # One round trip for the whole batch, plus a small per-item cost
+        self._service._sleep(self._service.latency + self._service.per_item_latency * len(self._requests))
+        for request, request_id, callback in self._requests:
+            try:
+                callback(request_id, request._fn(), None)
+            except Exception as e:
+                callback(request_id, None, e)
+
+
+class FakeGmailService:
+    """Duck-typed replacement for a built Gmail v1 client"""
+
+    def __init__(self, messages, latency=0.0, per_item_latency=0.0, error_rate=0.0, seed=7):
+        self.mailbox = messages
+        self.by_id = {msg['id']: msg for msg in messages}
+        self.latency = latency
+        self.per_item_latency = per_item_latency
+        self.error_rate = error_rate
+        self.history_id = 1000
+        self.pending_history = []
+        self.calls = {'list': 0, 'get': 0, 'batch': 0, 'history': 0}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _sleep(self, seconds):
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def _maybe_fail(self):
+        with self._lock:
+            failed = self._rng.random() < self.error_rate
+        if failed:
+            raise FakeHttpError(503)
+
+    # Resource chain: service.users().messages().get(...)
+    def users(self):
+        return self
+
+    def messages(self):
+        return self
+
+    def history(self):
+        return _FakeHistory(self)
+
+    def getProfile(self, userId='me'):
+        return _Request(lambda: {'historyId': str(self.history_id)})
+
+    def list(self, userId='me', labelIds=None, maxResults=100, pageToken=None, **kwargs):
+        def run():
+            self.calls['list'] += 1
+            self._sleep(self.latency)
+            self._maybe_fail()
+            start = int(pageToken or 0)
+            page = self.mailbox[start:start + min(maxResults, 500)]
+            response = {'messages': [{'id': msg['id'], 'threadId': msg['threadId']} for msg in page]}
+            if start + len(page) < len(self.mailbox) and len(page) == min(maxResults, 500):
+                response['nextPageToken'] = str(start + len(page))
+            return response
+        return _Request(run)
+
+    def get(self, userId='me', id=None, format='full', metadataHeaders=None, **kwargs):
+        def run():
+            self.calls['get'] += 1
+            self._maybe_fail()
+            msg = {key: value for key, value in self.by_id[id].items() if key != 'scheduling'}
+            if format == 'metadata':
+                msg['payload'] = {key: value for key, value in msg['payload'].items() if key == 'headers'}
+            return msg
+        return _Request(run)
+
+    def new_batch_http_request(self, callback=None):
+        self.calls['batch'] += 1
+        return _Batch(self, callback)
+
+
+class _FakeHistory:
+    def __init__(self, service):
+        self._service = service
+
+    def list(self, userId='me', startHistoryId=None, pageToken=None, **kwargs):
+        def run():
+            service = self._service
+            service.calls['history'] += 1
+            service._sleep(service.latency)
+            added = [{'message': {'id': msg_id, 'labelIds': ['UNREAD']}} for msg_id in service.pending_history]
+            service.pending_history = []
+            return {'history': [{'messagesAdded': added}] if added else [], 'historyId': str(service.history_id)}
+        return _Request(run)
+
+
+class FakeCalendarService:
+    """Duck-typed replacement for a built Calendar v3 client"""
+
+    def __init__(self, latency=0.0, error_rate=0.0, seed=11):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.events_created = []
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def events(self):
+        return self
+
+    def insert(self, calendarId='primary', body=None, **kwargs):
+        def run():
+            if self.latency > 0:
+                time.sleep(self.latency)
+            with self._lock:
+                if self._rng.random() < self.error_rate:
+                    raise FakeHttpError(429, 'rateLimitExceeded')
+                if body.get('id') and any(event['id'] == body['id'] for event in self.events_created):
+                    raise FakeHttpError(409, 'duplicate')
+                event = dict(body, id=body.get('id') or f"evt{len(self.events_created)}",
+                             htmlLink=f"https://calendar.example/{len(self.events_created)}")
+                self.events_created.append(event)
+            return event
+        return _Request(run)
+
+    def list(self, calendarId='primary', syncToken=None, pageToken=None, **kwargs):
+        def run():
+            # The sync token is the number of events already seen; no deletions
+            with self._lock:
+                seen = int(syncToken or 0)
+                return {'items': list(self.events_created[seen:]), 'nextSyncToken': str(len(self.events_created))}
+        return _Request(run)
+
+    def get(self, calendarId='primary', eventId=None, **kwargs):
+        def run():
+            with self._lock:
+                for event in self.events_created:
+                    if event['id'] == eventId:
+                        return event
+            raise FakeHttpError(404, 'notFound')
+        return _Request(run)
+
+
+def _answer_for(prompt):
+    """What a well-behaved model would say about the email (or numbered emails) inside ``prompt``"""
+    batch = _BATCH_EMAIL.findall(prompt)
+    if len(batch) > 1:
+        answers = [dict(_extraction_for(email), index=int(index)) for index, email in batch]
+        return json.dumps(answers) + "\nEach object above holds the result for one email."
+    email = prompt.split('"""')[1] if prompt.count('"""') >= 2 else prompt
+    answer = _extraction_for(email)
+    if "action" in answer:
+        return json.dumps(answer) + "\nThe email doesn't mention an event."
+    return json.dumps(answer) + "\nThis JSON holds the event details extracted from the email above."
+
+
+_BATCH_EMAIL = re.compile(r'Email (\d+):\n"""(.*?)"""', re.S)
+
+
+def _extraction_for(email):
+    if any(word in email.lower() for word in ('meeting', 'call', 'interview')):
+        words = email.split()
+        date = next((w for w in words if w.count('-') == 2), "2025-10-23")
+        time_word = next((w for w in words if w.endswith(('pm', 'am', 'pm?'))), "3:00pm").rstrip('?')
+        return {
+            "title": "Meeting", "date": date, "start_time": time_word,
+            "end_time": "", "location": "", "participants": []
+        }
+    return {"action": "No scheduling info found."}
+
+
+class _QuietHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients hanging up mid-stream is expected, not worth a traceback
+        if not isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError)):
+            super().handle_error(request, client_address)
+
+
+class FakeOllamaServer:
+    """Tiny local HTTP server speaking enough of Ollama's /api/generate"""
+
+    def __init__(self, latency=0.0, token_latency=0.0, error_rate=0.0, port=0, seed=13):
+        self.latency = latency
+        self.token_latency = token_latency
+        self.error_rate = error_rate
+        self.requests = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = _QuietHTTPServer(('127.0.0.1', port), self._handler())
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def _send_json(self, status, payload):
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _write_chunk(self, payload):
+                data = json.dumps(payload).encode() + b'\n'
+                self.wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
+                self.wfile.flush()
+
+            def do_GET(self):
+                self._send_json(200, {'models': [{'name': 'phi3'}]})
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                with fake._lock:
+                    fake.requests += 1
+                    failed = fake._rng.random() < fake.error_rate
+                if fake.latency > 0:
+                    time.sleep(fake.latency)
+                if failed:
+                    self._send_json(500, {'error': 'injected failure'})
+                    return
+
+                answer = _answer_for(body.get('prompt', ''))
+                tokens = [answer[i:i + 4] for i in range(0, len(answer), 4)]
+                if not body.get('stream', True):
+                    if fake.token_latency > 0:
+                        time.sleep(fake.token_latency * len(tokens))
+                    self._send_json(200, {'response': answer, 'done': True, 'eval_count': len(tokens)})
+                    return
+
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/x-ndjson')
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.end_headers()
+                try:
+                    for token in tokens:
+                        if fake.token_latency > 0:
+                            time.sleep(fake.token_latency)
+                        self._write_chunk({'response': token, 'done': False})
+                    self._write_chunk({'response': '', 'done': True, 'eval_count': len(tokens)})
+                    self.wfile.write(b'0\r\n\r\n')
+                except (BrokenPipeError, ConnectionResetError):
+                    # Client hung up early, like the streaming extractor does
+                    pass
+
+        return Handler
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, name='fake-ollama', daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,101 @@
+"""Compare the dedup backends in memory.py on memory use and latency.
+
+    python -m benchmarks.memory_bench --size 5000
+
+Each backend runs in its own subprocess so import cost and RSS are measured
+from a clean interpreter. The embedding backend needs chromadb and
+sentence-transformers installed; it is reported as skipped otherwise.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+WORKER = r"""
+import json, os, resource, sys, time
+backend, size, batch = sys.argv[1], int(sys.argv[2]), int(sys.argv[3])
+
+def rss_mb():
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+from benchmarks.fakes import make_mailbox
+texts = [msg['snippet'] for msg in make_mailbox(size)]
+# Re-seen emails differing only in case, spacing and punctuation, and
+# edited copies with one extra word
+resent = ['  ' + text.upper().replace(' ', '  ') + '!' for text in texts[:batch]]
+edited = [text.rstrip(')') + ' thanks)' for text in texts[:batch]]
+baseline_rss = rss_mb()
+
+t0 = time.perf_counter()
+os.environ['MEMORY_BACKEND'] = backend
+import memory
+backend_obj = memory.get_backend()
+load_s = time.perf_counter() - t0
+
+t0 = time.perf_counter()
+for start in range(0, len(texts), batch):
+    memory.add_many_to_memory(texts[start:start + batch])
+insert_s = time.perf_counter() - t0
+
+t0 = time.perf_counter()
+resent_hits = memory.check_duplicates(resent)
+batch_query_s = time.perf_counter() - t0
+edited_hits = memory.check_duplicates(edited)
+
+t0 = time.perf_counter()
+for probe in resent[:100]:
+    memory.check_duplicate(probe)
+single_query_s = (time.perf_counter() - t0) / max(1, min(100, len(resent)))
+
+print(json.dumps({
+    'backend': backend,
+    'entries': size,
+    'load_ms': load_s * 1000,
+    'insert_per_email_us': insert_s / size * 1e6,
+    'batch_query_per_email_us': batch_query_s / max(1, len(resent)) * 1e6,
+    'single_query_us': single_query_s * 1e6,
+    'resent_recall': sum(resent_hits) / max(1, len(resent_hits)),
+    'edited_recall': sum(edited_hits) / max(1, len(edited_hits)),
+    'rss_growth_mb': rss_mb() - baseline_rss,
+}))
+"""
+
+
+def run_backend(backend, size, batch, workdir):
+    env = dict(os.environ, MEMORY_FILE=os.path.join(workdir, f'{backend}.simhash'))
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    proc = subprocess.run(
+        [sys.executable, '-c', WORKER, backend, str(size), str(batch)],
+        cwd=repo_root, env=env, capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        last_line = (proc.stderr.strip().splitlines() or ['unknown error'])[-1]
+        return {'backend': backend, 'skipped': last_line}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size', type=int, default=5000, help='emails inserted into each backend')
+    parser.add_argument('--batch', type=int, default=500, help='batch size for inserts and queries')
+    parser.add_argument('--backends', default='simhash,embedding')
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix='memory-bench-')
+    columns = ('load_ms', 'insert_per_email_us', 'batch_query_per_email_us', 'single_query_us',
+               'resent_recall', 'edited_recall', 'rss_growth_mb')
+    print(f"{'backend':<12}" + ''.join(f"{column:>26}" for column in columns))
+    for backend in args.backends.split(','):
+        result = run_backend(backend.strip(), args.size, args.batch, workdir)
+        if 'skipped' in result:
+            print(f"{backend:<12}skipped: {result['skipped']}")
+            continue
+        print(f"{backend:<12}" + ''.join(f"{result[column]:>26.2f}" for column in columns))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,264 @@
+"""End-to-end pipeline benchmark against local Gmail/Ollama/Calendar stand-ins.
+
+Runs fully offline. Example:
+
+    python -m benchmarks.pipeline_bench --sizes 10,1000,100000 --ollama-latency 0.05
+
+Reports throughput and p50/p95/p99 latency per stage. Pass ``--output`` to
+save the results as JSON and ``--baseline`` to fail (exit code 1) when a
+stage's p95 got slower than the baseline by more than ``--tolerance``.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+# Stages in the order they are reported
+STAGES = ('gmail_fetch', 'llm_extract', 'llm_extract_batched', 'calendar_insert', 'route_fetch_emails', 'route_scheduling_emails')
+
+
+def percentile(sorted_samples, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_samples:
+        return None
+    rank = max(1, int(round(pct / 100.0 * len(sorted_samples))))
+    return sorted_samples[min(rank, len(sorted_samples)) - 1]
+
+
+class StageTimer:
+    def __init__(self):
+        self.samples = {}
+        self.items = {}
+        self.wall = {}
+        self.errors = {}
+
+    def record(self, stage, seconds, items=1, error=False):
+        self.samples.setdefault(stage, []).append(seconds)
+        self.items[stage] = self.items.get(stage, 0) + items
+        if error:
+            self.errors[stage] = self.errors.get(stage, 0) + 1
+
+    def add_wall(self, stage, seconds):
+        self.wall[stage] = self.wall.get(stage, 0.0) + seconds
+
+    def summary(self):
+        report = {}
+        for stage, samples in self.samples.items():
+            ordered = sorted(samples)
+            wall = self.wall.get(stage) or sum(samples)
+            report[stage] = {
+                'samples': len(samples),
+                'items': self.items[stage],
+                'errors': self.errors.get(stage, 0),
+                'throughput_per_s': self.items[stage] / wall if wall else None,
+                'p50_ms': percentile(ordered, 50) * 1000,
+                'p95_ms': percentile(ordered, 95) * 1000,
+                'p99_ms': percentile(ordered, 99) * 1000,
+            }
+        return report
+
+
+def _configure_environment(workdir, ollama_url):
+    # Module-level settings are read at import time, so set them before importing the app
+    os.environ['OLLAMA_URL'] = ollama_url
+    os.environ['EXTRACTION_CACHE_FILE'] = ''
+    os.environ['SCHEDULING_DB_FILE'] = os.path.join(workdir, 'scheduling.db')
+    os.environ['SYNC_STATE_FILE'] = os.path.join(workdir, 'sync_state.json')
+    os.environ['PREFILTER_LOG'] = os.path.join(workdir, 'prefilter_skips.jsonl')
+    # The fakes have no quota; measure the pipeline, not the rate limiter
+    os.environ.setdefault('GMAIL_QUOTA_UNITS_PER_SEC', '1e9')
+    os.environ.setdefault('CALENDAR_REQUESTS_PER_SEC', '1e9')
+    os.environ.setdefault('GOOGLE_BACKOFF_BASE', '0.01')
+
+
+def bench_gmail_fetch(timer, gmail, size, batch_size):
+    """One sample per ``get_unread_emails`` poll: the UNREAD list, the batched fetch and the report"""
+    import email_reader
+
+    # Gmail lists at most 500 messages per call; poll often enough to fetch ``size`` messages in all
+    per_poll = min(size, 500)
+    started = time.perf_counter()
+    for _ in range(-(-size // per_poll)):
+        t0 = time.perf_counter()
+        emails = email_reader.get_unread_emails(gmail, per_poll, process_emails=False, batch_size=batch_size)
+        timer.record('gmail_fetch', time.perf_counter() - t0, items=len(emails),
+                     error=len(emails) < per_poll)
+    timer.add_wall('gmail_fetch', time.perf_counter() - started)
+
+
+def bench_llm_extract(timer, gmail, sample):
+    import llm_agent
+
+    # Measure real model round trips, not cache hits from an earlier size
+    llm_agent.extraction_cache.clear()
+    messages = gmail.mailbox[:sample]
+    started = time.perf_counter()
+    for msg in messages:
+        t0 = time.perf_counter()
+        error = False
+        try:
+            llm_agent.extract_schedule_from_email(msg['snippet'])
+        except Exception:
+            error = True
+        timer.record('llm_extract', time.perf_counter() - t0, error=error)
+    timer.add_wall('llm_extract', time.perf_counter() - started)
+
+    # The same emails through the batched, pooled path the pipeline uses
+    llm_agent.extraction_cache.clear()
+    texts = [msg['snippet'] for msg in messages]
+    for indexes in llm_agent.plan_batches(texts):
+        batch = [texts[i] for i in indexes]
+        t0 = time.perf_counter()
+        results = llm_agent.extract_schedules(batch)
+        timer.record('llm_extract_batched', time.perf_counter() - t0, items=len(batch),
+                     error=any(isinstance(result, Exception) for result in results))
+
+
+def bench_calendar_insert(timer, calendar, gmail, sample):
+    import calendar_mirror
+    import calendar_updater
+
+    calendar_updater.get_calendar_service = lambda mailbox='default': calendar
+    calendar_mirror.get_calendar_service = lambda mailbox='default': calendar
+    scheduling = [msg for msg in gmail.mailbox if msg['scheduling']][:sample]
+    started = time.perf_counter()
+    for i, msg in enumerate(scheduling):
+        data = {
+            'title': f"Meeting {i}",
+            'date': '2025-10-23',
+            'start_time': '3:00pm',
+            'end_time': '3:30pm',
+            'participants': ['someone@example.com'],
+        }
+        error = False
+        t0 = time.perf_counter()
+        try:
+            calendar_updater.create_event(data, source_id=msg['id'])
+        except Exception:
+            error = True
+        timer.record('calendar_insert', time.perf_counter() - t0, error=error)
+    timer.add_wall('calendar_insert', time.perf_counter() - started)
+
+
+def bench_routes(timer, gmail, calendar, iterations):
+    import app
+    from mailboxes import Mailbox
+
+    mailbox = Mailbox('bench')
+    mailbox.ready = True
+    app.mailbox_registry.add(mailbox)
+    app.get_gmail_service = lambda mailbox='default': gmail
+    app.calendar_mirror.get_calendar_service = lambda mailbox='default': calendar
+    client = app.app.test_client()
+
+    for _ in range(iterations):
+        app.extraction_cache.clear()
+        t0 = time.perf_counter()
+        response = client.get('/api/fetch-emails?full=true&mailbox=bench')
+        job_id = response.get_json()['job_id']
+        while True:
+            job = client.get(f'/api/jobs/{job_id}').get_json()
+            if job['status'] in ('done', 'failed'):
+                break
+            time.sleep(0.005)
+        count = (job.get('result') or {}).get('count', 0)
+        timer.record('route_fetch_emails', time.perf_counter() - t0, items=max(count, 1),
+                     error=job['status'] == 'failed')
+
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        response = client.get('/api/scheduling-emails?limit=50&mailbox=bench')
+        timer.record('route_scheduling_emails', time.perf_counter() - t0, error=response.status_code != 200)
+
+
+def print_report(size, report):
+    print(f"\n=== mailbox size {size} ===")
+    print(f"{'stage':<26}{'samples':>8}{'errors':>8}{'items/s':>12}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for stage in STAGES:
+        row = report.get(stage)
+        if not row:
+            continue
+        throughput = f"{row['throughput_per_s']:.1f}" if row['throughput_per_s'] else '-'
+        print(f"{stage:<26}{row['samples']:>8}{row['errors']:>8}{throughput:>12}"
+              f"{row['p50_ms']:>10.2f}{row['p95_ms']:>10.2f}{row['p99_ms']:>10.2f}")
+
+
+def compare_to_baseline(results, baseline, tolerance):
+    """Return a list of regressions where p95 grew by more than ``tolerance``"""
+    regressions = []
+    for size, stages in results.items():
+        for stage, row in stages.items():
+            previous = baseline.get(size, {}).get(stage)
+            if previous and previous['p95_ms'] and row['p95_ms'] > previous['p95_ms'] * (1 + tolerance):
+                regressions.append(f"{stage} @ {size}: p95 {previous['p95_ms']:.2f}ms -> {row['p95_ms']:.2f}ms")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='10,1000,100000', help='comma-separated synthetic mailbox sizes')
+    parser.add_argument('--scheduling-ratio', type=float, default=0.2, help='share of messages that hold an event')
+    parser.add_argument('--batch-size', type=int, default=50, help='Gmail batch size')
+    parser.add_argument('--llm-sample', type=int, default=100, help='max messages sent to the LLM per size')
+    parser.add_argument('--calendar-sample', type=int, default=100, help='max events inserted per size')
+    parser.add_argument('--route-iterations', type=int, default=5, help='requests per Flask route per size')
+    parser.add_argument('--gmail-latency', type=float, default=0.0, help='seconds per Gmail round trip')
+    parser.add_argument('--gmail-item-latency', type=float, default=0.0, help='extra seconds per message in a batch')
+    parser.add_argument('--gmail-error-rate', type=float, default=0.0)
+    parser.add_argument('--ollama-latency', type=float, default=0.0, help='seconds before the first token')
+    parser.add_argument('--ollama-token-latency', type=float, default=0.0, help='seconds per streamed token')
+    parser.add_argument('--ollama-error-rate', type=float, default=0.0)
+    parser.add_argument('--calendar-latency', type=float, default=0.0)
+    parser.add_argument('--calendar-error-rate', type=float, default=0.0)
+    parser.add_argument('--skip-routes', action='store_true', help="don't drive the Flask routes")
+    parser.add_argument('--output', help='write results as JSON to this file')
+    parser.add_argument('--baseline', help='JSON results of a previous run to compare p95 against')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed p95 slowdown vs baseline (0.2 = 20%%)')
+    args = parser.parse_args(argv)
+
+    from benchmarks.fakes import FakeGmailService, FakeCalendarService, FakeOllamaServer, make_mailbox
+
+    ollama = FakeOllamaServer(args.ollama_latency, args.ollama_token_latency, args.ollama_error_rate).start()
+    workdir = tempfile.mkdtemp(prefix='pipeline-bench-')
+    _configure_environment(workdir, ollama.url)
+
+    sizes = [int(size) for size in args.sizes.split(',') if size.strip()]
+    mailbox = make_mailbox(max(sizes), args.scheduling_ratio)
+    results = {}
+
+    try:
+        for size in sizes:
+            timer = StageTimer()
+            gmail = FakeGmailService(mailbox[:size], args.gmail_latency, args.gmail_item_latency, args.gmail_error_rate)
+            calendar = FakeCalendarService(args.calendar_latency, args.calendar_error_rate)
+            bench_gmail_fetch(timer, gmail, size, args.batch_size)
+            bench_llm_extract(timer, gmail, min(size, args.llm_sample))
+            bench_calendar_insert(timer, calendar, gmail, args.calendar_sample)
+            if not args.skip_routes:
+                bench_routes(timer, gmail, calendar, args.route_iterations)
+            results[str(size)] = timer.summary()
+            print_report(size, results[str(size)])
+    finally:
+        ollama.stop()
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare_to_baseline(results, json.load(f), args.tolerance)
+        if regressions:
+            print("\n❌ Performance regressions:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print("\n✅ No p95 regressions against baseline")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,236 @@
+import os
+import time
+import bisect
+import logging
+import threading
+from datetime import datetime
+from google_clients import get_calendar_service
+from metrics import timed
+from rate_limiter import execute
+
+logger = logging.getLogger(__name__)
+
+# Calendar the agent writes to and mirrors
+CALENDAR_ID = os.getenv('CALENDAR_ID', 'primary')
+# Seconds a mirror is trusted before the next incremental sync
+CALENDAR_SYNC_INTERVAL = float(os.getenv('CALENDAR_SYNC_INTERVAL', '60'))
+# Events that ended more than this many days ago are not kept in the mirror
+CALENDAR_MIRROR_PAST_DAYS = int(os.getenv('CALENDAR_MIRROR_PAST_DAYS', '1'))
+
+# events.list page size; 2500 is the API maximum
+_PAGE_SIZE = 2500
+
+
+def timestamp(value):
+    """Epoch seconds for an RFC 3339 dateTime"""
+    return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+
+
+def _public(entry):
+    """An index entry as returned to callers, without the epoch bounds"""
+    return {key: value for key, value in entry.items() if not key.endswith('_ts')}
+
+
+def _same_title(a, b):
+    return (a or '').strip().casefold() == (b or '').strip().casefold()
+
+
+class IntervalIndex:
+    """Timed events sorted by start, for overlap queries in O(log n + k).
+
+    Starts are kept in a sorted list. Any event overlapping [start, end)
+    must start before ``end`` and no earlier than ``start - max_duration``,
+    so one bisect bounds the scan. ``max_duration`` only grows, which keeps
+    queries correct after removals at the cost of a slightly wider scan.
+    """
+
+    def __init__(self):
+        self._starts = []
+        self._ids = []
+        self._events = {}
+        self.max_duration = 0.0
+
+    def __len__(self):
+        return len(self._events)
+
+    def __contains__(self, event_id):
+        return event_id in self._events
+
+    def get(self, event_id):
+        return self._events.get(event_id)
+
+    def add(self, event):
+        self.remove(event['id'])
+        i = bisect.bisect_right(self._starts, event['start_ts'])
+        self._starts.insert(i, event['start_ts'])
+        self._ids.insert(i, event['id'])
+        self._events[event['id']] = event
+        self.max_duration = max(self.max_duration, event['end_ts'] - event['start_ts'])
+
+    def remove(self, event_id):
+        event = self._events.pop(event_id, None)
+        if event is None:
+            return
+        i = bisect.bisect_left(self._starts, event['start_ts'])
+        while self._ids[i] != event_id:
+            i += 1
+        del self._starts[i]
+        del self._ids[i]
+
+    def overlapping(self, start_ts, end_ts):
+        lo = bisect.bisect_left(self._starts, start_ts - self.max_duration)
+        hi = bisect.bisect_left(self._starts, end_ts)
+        events = (self._events[event_id] for event_id in self._ids[lo:hi])
+        return [event for event in events if event['end_ts'] > start_ts]
+
+
+class CalendarMirror:
+    """Local copy of one mailbox's calendar, kept current with incremental sync.
+
+    The first sync lists every event and keeps the ``nextSyncToken``; later
+    syncs only fetch what changed since. A 410 means the token expired and
+    the mirror is rebuilt from a full sync. Only timed, busy events are
+    indexed: all-day and "free" events never make a slot unavailable.
+    """
+
+    def __init__(self, mailbox='default', calendar_id=CALENDAR_ID, sync_interval=CALENDAR_SYNC_INTERVAL):
+        self.mailbox = mailbox
+        self.calendar_id = calendar_id
+        self.sync_interval = sync_interval
+        self.sync_token = None
+        self.synced_at = None
+        self.full_syncs = 0
+        self.incremental_syncs = 0
+        # Changes whenever the mirrored events may have changed
+        self.version = 0
+        self._index = IntervalIndex()
+        self._lock = threading.RLock()
+
+    def _apply(self, event):
+        # Called with the lock held
+        self.version += 1
+        start = (event.get('start') or {}).get('dateTime')
+        end = (event.get('end') or {}).get('dateTime')
+        if (event.get('status') == 'cancelled' or not start or not end
+                or event.get('transparency') == 'transparent'):
+            self._index.remove(event['id'])
+            return
+        end_ts = timestamp(end)
+        if end_ts < time.time() - CALENDAR_MIRROR_PAST_DAYS * 86400:
+            self._index.remove(event['id'])
+            return
+        self._index.add({
+            'id': event['id'],
+            'summary': event.get('summary', ''),
+            'start': event['start'],
+            'end': event['end'],
+            'htmlLink': event.get('htmlLink'),
+            'start_ts': timestamp(start),
+            'end_ts': end_ts
+        })
+
+    def sync(self):
+        """Fetch changes since the last sync (everything on the first one)"""
+        with self._lock:
+            service = get_calendar_service(self.mailbox)
+            full = self.sync_token is None
+            if full:
+                self._index = IntervalIndex()
+                self.version += 1
+            params = {'calendarId': self.calendar_id, 'singleEvents': True, 'showDeleted': not full,
+                      'maxResults': _PAGE_SIZE}
+            if not full:
+                params['syncToken'] = self.sync_token
+
+            page_token = None
+            try:
+                while True:
+                    with timed('calendar_sync'):
+                        page = execute(service.events().list(pageToken=page_token, **params), 'calendar', self.mailbox)
+                    for event in page.get('items', []):
+                        self._apply(event)
+                    page_token = page.get('nextPageToken')
+                    if not page_token:
+                        break
+            except Exception as e:
+                if full or getattr(getattr(e, 'resp', None), 'status', None) != 410:
+                    raise
+                # The sync token expired; start over from a full sync
+                logger.info("🔄 Calendar sync token for %s expired, resyncing", self.mailbox)
+                self.sync_token = None
+                return self.sync()
+
+            self.sync_token = page.get('nextSyncToken')
+            self.synced_at = time.monotonic()
+            if full:
+                self.full_syncs += 1
+            else:
+                self.incremental_syncs += 1
+
+    def refresh(self):
+        """Sync if the mirror is older than ``sync_interval``"""
+        with self._lock:
+            if self.synced_at is None or time.monotonic() - self.synced_at >= self.sync_interval:
+                self.sync()
+
+    def record(self, event):
+        """Apply an event this process just created, without waiting for the next sync"""
+        with self._lock:
+            self._apply(event)
+
+    def overlapping(self, start, end):
+        """Index entries overlapping [start, end), given as RFC 3339 dateTimes"""
+        with self._lock:
+            return self._index.overlapping(timestamp(start), timestamp(end))
+
+    def find_duplicate(self, event_id, title, start, end):
+        """The mirrored event with this id, or one with the same title and times, else None"""
+        with self._lock:
+            existing = self._index.get(event_id)
+            if existing is not None:
+                return _public(existing)
+            start_ts, end_ts = timestamp(start), timestamp(end)
+            for event in self._index.overlapping(start_ts, end_ts):
+                if event['start_ts'] == start_ts and event['end_ts'] == end_ts and _same_title(event['summary'], title):
+                    return _public(event)
+        return None
+
+    def conflicts(self, title, start, end, event_id=None):
+        """Overlapping events, leaving out this event itself and identical copies of it"""
+        start_ts, end_ts = timestamp(start), timestamp(end)
+        return [
+            _public(event) for event in self.overlapping(start, end)
+            if event['id'] != event_id
+            and not (event['start_ts'] == start_ts and event['end_ts'] == end_ts and _same_title(event['summary'], title))
+        ]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "events": len(self._index),
+                "full_syncs": self.full_syncs,
+                "incremental_syncs": self.incremental_syncs
+            }
+
+
+_mirrors = {}
+_mirrors_lock = threading.Lock()
+
+
+def get_mirror(mailbox='default'):
+    """The shared CalendarMirror for a mailbox"""
+    with _mirrors_lock:
+        mirror = _mirrors.get(mailbox)
+        if mirror is None:
+            mirror = _mirrors[mailbox] = CalendarMirror(mailbox)
+        return mirror
+
+
+def stats():
+    with _mirrors_lock:
+        mirrors = list(_mirrors.values())
+    totals = {"mailboxes": len(mirrors), "events": 0, "full_syncs": 0, "incremental_syncs": 0}
+    for mirror in mirrors:
+        for key, value in mirror.stats().items():
+            totals[key] += value
+    return totals
@@ -1,74 +1,132 @@
-from googleapiclient.discovery import build
-from google.oauth2.credentials import Credentials
-from datetime import datetime, time, timedelta
-import pytz
+import base64
+import hashlib
+import logging
+from google_clients import get_calendar_service
+from calendar_mirror import CALENDAR_ID, get_mirror
+from datetime import datetime, time
+from metrics import timed
+from rate_limiter import execute
+import temporal_parser
+
+logger = logging.getLogger(__name__)
 
 def parse_date(date_str):
-    if not date_str:
-        raise ValueError("Date is missing.")
-    date_str = date_str.lower().replace("st", "").replace("nd", "").replace("rd", "").replace("th", "").title()
-    for fmt in ("%Y-%m-%d", "%A, %B %d", "%B %d", "%A %B %d", "%B %d, %Y", "%A %d %B"):
-        try:
-            parsed = datetime.strptime(date_str.strip(), fmt)
-            # Fill in year if missing
-            if parsed.year == 1900:
-                parsed = parsed.replace(year=datetime.now().year)
-            return parsed
-        except ValueError:
-            continue
-    raise ValueError(f"Date format not recognized: {date_str}")
+    return datetime.combine(temporal_parser.parse_date(date_str), time())
 
 def parse_time(time_str):
-    if not time_str:
-        raise ValueError("Time is missing.")
-    time_str = time_str.strip().lower().replace(" ", "")
-    for fmt in ("%I:%M%p", "%H:%M", "%H:%M:%S"):
-        try:
-            return datetime.strptime(time_str, fmt).time()
-        except ValueError:
-            continue
-    raise ValueError(f"Time format not recognized: {time_str}")
-
-def create_event(data):
-    try:
-        # Validate title
-        if not data.get('title'):
-            data['title'] = "Untitled Event"
+    return temporal_parser.parse_time(time_str)
+
+def event_id(mailbox, title, start, end, source_id=None):
+    """Deterministic event id, so retrying an insert can't create the event twice.
 
-        creds = Credentials.from_authorized_user_file('token.json', ['https://www.googleapis.com/auth/calendar'])
-        service = build('calendar', 'v3', credentials=creds)
+    Calendar accepts client-chosen ids made of base32hex characters (0-9, a-v).
+    """
+    key = '\x1f'.join([mailbox, source_id or '', title, start, end])
+    digest = hashlib.sha256(key.encode('utf-8')).digest()
+    return base64.b32hexencode(digest).decode('ascii').rstrip('=').lower()
 
-        # Parse date and time
+def event_window(data):
+    """(start, end, timezone) of extracted scheduling data, as RFC 3339 dateTimes"""
+    with timed('date_parse'):
         date_obj = parse_date(data['date'])
         start_time = parse_time(data['start_time'])
-        end_time = parse_time(data['end_time']) if data.get('end_time') else (datetime.combine(datetime.today(), start_time) + timedelta(minutes=30)).time()
-
-        start_dt = datetime.combine(date_obj.date(), start_time)
-        end_dt = datetime.combine(date_obj.date(), end_time)
-
-        timezone = 'America/New_York'
-        tz = pytz.timezone(timezone)
-        start_dt = tz.localize(start_dt).isoformat()
-        end_dt = tz.localize(end_dt).isoformat()
-
-        # Validate attendees
-        raw_emails = data.get('participants', [])
-        attendees = []
-        for email in raw_emails:
-            if isinstance(email, str) and "@" in email:
-                attendees.append({'email': email})
-
-        event = {
-            'summary': data['title'],
-            'location': data.get('location', ''),
-            'description': 'Created by AI Email Scheduler Agent',
-            'start': {'dateTime': start_dt, 'timeZone': timezone},
-            'end': {'dateTime': end_dt, 'timeZone': timezone},
-            'attendees': attendees,
-        }
-
-        created_event = service.events().insert(calendarId='primary', body=event).execute()
-        print(f"✅ Event created successfully!\n📅 Link: {created_event.get('htmlLink')}")
+        end_time = parse_time(data['end_time']) if data.get('end_time') else temporal_parser.add_minutes(start_time, 30)
+
+    start_dt = datetime.combine(date_obj.date(), start_time)
+    end_dt = datetime.combine(date_obj.date(), end_time)
+
+    # pytz is only needed once an event is actually created
+    import pytz
+
+    timezone = 'America/New_York'
+    tz = pytz.timezone(timezone)
+    return tz.localize(start_dt).isoformat(), tz.localize(end_dt).isoformat(), timezone
 
+def _synced_mirror(mailbox):
+    """The mailbox's calendar mirror, synced if stale; None if the sync failed"""
+    mirror = get_mirror(mailbox)
+    try:
+        mirror.refresh()
     except Exception as e:
-        print(f"❌ Failed to create event: {e}")
+        logger.warning("⚠️ Couldn't sync calendar for %s: %s", mailbox, e)
+        return None
+    return mirror
+
+def find_conflicts(data, mailbox='default', source_id=None):
+    """Calendar events overlapping the event that ``data`` describes (other than that event itself).
+
+    Checks the mailbox's calendar mirror as of its last sync; raises if the
+    date or time can't be parsed.
+    """
+    title = data.get('title') or "Untitled Event"
+    start_dt, end_dt, _ = event_window(data)
+    mirror = get_mirror(mailbox)
+    return mirror.conflicts(title, start_dt, end_dt, event_id(mailbox, title, start_dt, end_dt, source_id))
+
+def build_event(data, mailbox='default', source_id=None):
+    """Calendar event body for extracted scheduling data (which must have a title)"""
+    start_dt, end_dt, timezone = event_window(data)
+
+    # Validate attendees
+    raw_emails = data.get('participants', [])
+    attendees = []
+    for email in raw_emails:
+        if isinstance(email, str) and "@" in email:
+            attendees.append({'email': email})
+
+    return {
+        'id': event_id(mailbox, data['title'], start_dt, end_dt, source_id),
+        'summary': data['title'],
+        'location': data.get('location', ''),
+        'description': 'Created by AI Email Scheduler Agent',
+        'start': {'dateTime': start_dt, 'timeZone': timezone},
+        'end': {'dateTime': end_dt, 'timeZone': timezone},
+        'attendees': attendees,
+    }
+
+def create_event(data, mailbox='default', source_id=None):
+    """Insert a calendar event for extracted scheduling data and return it.
+
+    ``source_id`` (the email id) goes into the event id, so the same email
+    always maps to the same event. An event already on the calendar, with
+    the same id or the same title and times, is returned instead of
+    inserting a copy; the check runs against the local calendar mirror.
+    Events overlapping the new one are returned under ``conflicts``.
+    Failures raise; quota and server errors are retried first.
+    """
+    # Validate title
+    if not data.get('title'):
+        data['title'] = "Untitled Event"
+
+    service = get_calendar_service(mailbox)
+
+    event = build_event(data, mailbox, source_id)
+    start_dt, end_dt = event['start']['dateTime'], event['end']['dateTime']
+
+    mirror = _synced_mirror(mailbox)
+    conflicts = []
+    if mirror is not None:
+        existing = mirror.find_duplicate(event['id'], data['title'], start_dt, end_dt)
+        if existing is not None:
+            logger.info("✅ Event %s is already on the calendar", existing['id'])
+            return dict(existing, conflicts=mirror.conflicts(data['title'], start_dt, end_dt, existing['id']))
+        conflicts = mirror.conflicts(data['title'], start_dt, end_dt, event['id'])
+        if conflicts:
+            logger.warning("⚠️ %s overlaps %s", data['title'], ', '.join(c['summary'] or c['id'] for c in conflicts))
+
+    try:
+        with timed('calendar_insert'):
+            created_event = execute(service.events().insert(calendarId=CALENDAR_ID, body=event), 'calendar', mailbox)
+    except Exception as e:
+        # 409: an earlier attempt (or an earlier run) already created this event
+        if getattr(getattr(e, 'resp', None), 'status', None) != 409:
+            logger.error("❌ Failed to create event: %s", e)
+            raise
+        logger.info("✅ Event %s already exists", event['id'])
+        created_event = execute(service.events().get(calendarId=CALENDAR_ID, eventId=event['id']), 'calendar', mailbox)
+    else:
+        logger.info("✅ Event created successfully! 📅 Link: %s", created_event.get('htmlLink'))
+
+    if mirror is not None:
+        mirror.record(created_event)
+    return dict(created_event, conflicts=conflicts)
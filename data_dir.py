@@ -0,0 +1,10 @@
+import os
+
+# Where the stores, caches and sync positions live by default; mount a volume here in Docker
+DATA_DIR = os.getenv('DATA_DIR', '.')
+
+
+def data_path(name):
+    """Default path of a state file, creating DATA_DIR if needed"""
+    os.makedirs(DATA_DIR, exist_ok=True)
+    return os.path.join(DATA_DIR, name)
@@ -0,0 +1,160 @@
+import os
+import re
+import html
+import base64
+import codecs
+
+# Decoded bytes read from a message's text part; 0 turns body extraction off
+# and only the snippet is analyzed
+EMAIL_BODY_MAX_BYTES = int(os.getenv('EMAIL_BODY_MAX_BYTES', '16384'))
+# Characters of cleaned body text kept for the prompt
+EMAIL_BODY_MAX_CHARS = int(os.getenv('EMAIL_BODY_MAX_CHARS', '2000'))
+
+# Partial response for messages.get(format='full'): only what's needed to pick
+# and decode a text part, down to three levels of multipart nesting
+_PART_FIELDS = 'mimeType,filename,headers,body(size,data)'
+MESSAGE_FIELDS = (
+    'id,snippet,labelIds,payload('
+    f'{_PART_FIELDS},parts({_PART_FIELDS},parts({_PART_FIELDS},parts({_PART_FIELDS}))))'
+)
+
+# base64 characters decoded per step; a multiple of 4 so each chunk decodes on its own
+_DECODE_CHUNK = 4096
+
+_CHARSET = re.compile(r'charset="?([\w.:-]+)', re.IGNORECASE)
+
+_HTML_HIDDEN = re.compile(r'<(script|style|head)\b.*?</\1\s*>', re.IGNORECASE | re.DOTALL)
+_HTML_QUOTE = re.compile(r'<blockquote\b.*?</blockquote\s*>|<div class="gmail_quote".*', re.IGNORECASE | re.DOTALL)
+_HTML_BREAK = re.compile(r'<(br|/p|/div|/tr|/li|/h\d)\b[^>]*>', re.IGNORECASE)
+_HTML_TAG = re.compile(r'<[^>]+>')
+
+# A line that starts the quoted original in a reply or forward
+_REPLY_HEADER = re.compile(
+    r'^(On .{1,200} wrote:|-{2,} ?Original Message ?-{2,}|-{2,} ?Forwarded message ?-{2,}'
+    r'|_{10,}|Sent from my \w+.*)\s*$',
+    re.IGNORECASE
+)
+# "From:" only starts a quoted original as part of a header block: with an
+# <address>, or followed by Sent/Date/To/Cc/Subject lines
+_FROM_HEADER = re.compile(r'^\*?From:\*?\s+(.+)$', re.IGNORECASE)
+_FROM_ADDRESS = re.compile(r'<[^<>@\s]+@[^<>\s]+>')
+_HEADER_FIELD = re.compile(r'^\*?(Sent|Date|To|Cc|Subject):\*?\s', re.IGNORECASE)
+_SIGNATURE_DELIMITER = re.compile(r'^-- ?$')
+_SIGN_OFF = re.compile(
+    r'^(best|kind|warm)?\s*(regards|wishes)[,!.]?$|^(thanks|thank you|cheers|sincerely)[,!.]?$',
+    re.IGNORECASE
+)
+# Sign-offs only end the message when they are this close to the end
+_SIGN_OFF_TAIL_LINES = 8
+_BLANK_RUNS = re.compile(r'\n{3,}')
+
+
+def decode_base64url(data, max_bytes=EMAIL_BODY_MAX_BYTES, charset='utf-8'):
+    """Decode base64url text chunk by chunk, stopping after ``max_bytes`` decoded bytes.
+
+    Only the kept bytes are ever materialized; a character cut in half by
+    the cap is dropped.
+    """
+    try:
+        decoder = codecs.getincrementaldecoder(charset)(errors='replace')
+    except LookupError:
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+
+    pieces = []
+    remaining = max_bytes
+    for start in range(0, len(data), _DECODE_CHUNK):
+        if remaining <= 0:
+            break
+        chunk = data[start:start + _DECODE_CHUNK]
+        raw = base64.urlsafe_b64decode(chunk + '=' * (-len(chunk) % 4))[:remaining]
+        remaining -= len(raw)
+        pieces.append(decoder.decode(raw))
+    return ''.join(pieces)
+
+
+def _walk(part):
+    yield part
+    for child in part.get('parts') or ():
+        yield from _walk(child)
+
+
+def pick_text_part(payload):
+    """The first inline text/plain part, else the first text/html part, else None"""
+    plain = rich = None
+    for part in _walk(payload or {}):
+        if part.get('filename') or not (part.get('body') or {}).get('data'):
+            continue
+        mime_type = (part.get('mimeType') or '').lower()
+        if mime_type == 'text/plain' and plain is None:
+            plain = part
+        elif mime_type == 'text/html' and rich is None:
+            rich = part
+    return plain or rich
+
+
+def _charset(part):
+    for header in part.get('headers') or ():
+        if header.get('name', '').lower() == 'content-type':
+            match = _CHARSET.search(header.get('value', ''))
+            if match:
+                return match.group(1)
+    return 'utf-8'
+
+
+def strip_html(text):
+    text = _HTML_HIDDEN.sub('', text)
+    text = _HTML_QUOTE.sub('', text)
+    text = _HTML_BREAK.sub('\n', text)
+    return html.unescape(_HTML_TAG.sub('', text))
+
+
+def _is_from_header(lines, i):
+    match = _FROM_HEADER.match(lines[i].strip())
+    if match is None:
+        return False
+    if _FROM_ADDRESS.search(match.group(1)):
+        return True
+    following = [line.strip() for line in lines[i + 1:i + 3]]
+    return any(_HEADER_FIELD.match(line) for line in following)
+
+
+def strip_quotes_and_signature(text):
+    """Drop quoted replies, forwarded originals and the signature block"""
+    lines = [line.rstrip() for line in text.replace('\r\n', '\n').split('\n')]
+    kept = []
+    for i, line in enumerate(lines):
+        stripped = line.strip()
+        if _REPLY_HEADER.match(stripped) or _SIGNATURE_DELIMITER.match(line) or _is_from_header(lines, i):
+            break
+        if stripped.startswith('>'):
+            continue
+        kept.append(line)
+
+    tail_start = max(0, len(kept) - _SIGN_OFF_TAIL_LINES)
+    for i in range(tail_start, len(kept)):
+        if _SIGN_OFF.match(kept[i].strip()):
+            kept = kept[:i]
+            break
+    return _BLANK_RUNS.sub('\n\n', '\n'.join(kept)).strip()
+
+
+def email_text(email):
+    """The text analyzed for an email: subject and cleaned body, or the snippet when there's no body"""
+    if email.get('body'):
+        return f"Subject: {email.get('subject', '')}\n\n{email['body']}"
+    return email.get('snippet', '')
+
+
+def extract_body(payload, max_bytes=EMAIL_BODY_MAX_BYTES, max_chars=EMAIL_BODY_MAX_CHARS):
+    """Cleaned text of a Gmail message payload, bounded by ``max_bytes`` decoded and ``max_chars`` kept"""
+    part = pick_text_part(payload)
+    if part is None:
+        return ''
+    text = decode_base64url(part['body']['data'], max_bytes, _charset(part))
+    if (part.get('mimeType') or '').lower() == 'text/html':
+        text = strip_html(text)
+    text = strip_quotes_and_signature(text)
+    if len(text) > max_chars:
+        cut = text.rfind(' ', 0, max_chars)
+        text = text[:cut if cut > max_chars // 2 else max_chars]
+    return text
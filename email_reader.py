@@ -1,97 +1,243 @@
 import os
-import base64
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
-from email import message_from_bytes
-from google.auth.transport.requests import Request
-from llm_agent import extract_schedule_from_email
+import logging
+from llm_agent import extract_schedules
+from prefilter import prefilter, NO_SCHEDULING_RESULT
 from calendar_updater import create_event
-import json
+from google_clients import get_credentials, get_gmail_service
+from metrics import timed
+from email_body import EMAIL_BODY_MAX_BYTES, MESSAGE_FIELDS, email_text, extract_body
+from rate_limiter import GMAIL_QUOTA_UNITS, execute, is_retryable, rate_limiter
 import time
 
-# If modifying these SCOPES, delete the token.json file first
-SCOPES = ['https://www.googleapis.com/auth/gmail.readonly','https://www.googleapis.com/auth/calendar.events']
+logger = logging.getLogger(__name__)
+
+def authenticate_gmail(mailbox='default'):
+    return get_credentials(mailbox)
+
+# Gmail accepts up to 100 calls per batch, but recommends staying at or below 50
+# to avoid rate limiting on the batch endpoint
+GMAIL_BATCH_SIZE = int(os.getenv('GMAIL_BATCH_SIZE', '50'))
+
+# Only these headers are downloaded when fetching message metadata
+METADATA_HEADERS = ['Subject', 'From']
+
+def _parse_message(msg_data):
+    headers = msg_data.get('payload', {}).get('headers', [])
+    subject = sender = ""
+    for header in headers:
+        if header['name'] == 'Subject':
+            subject = header['value']
+        if header['name'] == 'From':
+            sender = header['value']
+    return {
+        'id': msg_data['id'],
+        'subject': subject,
+        'from': sender,
+        'snippet': msg_data.get('snippet', ''),
+        'body': extract_body(msg_data.get('payload')) if EMAIL_BODY_MAX_BYTES > 0 else '',
+        'labels': msg_data.get('labelIds', [])
+    }
+
+def _get_request(service, msg_id):
+    messages = service.users().messages()
+    if EMAIL_BODY_MAX_BYTES > 0:
+        # The partial response leaves out everything but the text parts; Gmail
+        # sends attachment ids, not attachment data, in format='full'
+        return messages.get(userId='me', id=msg_id, format='full', fields=MESSAGE_FIELDS)
+    return messages.get(userId='me', id=msg_id, format='metadata', metadataHeaders=METADATA_HEADERS)
+
+def fetch_email_metadata(service, message_ids, batch_size=GMAIL_BATCH_SIZE, mailbox='default'):
+    """Fetch Subject/From/snippet and the cleaned body for many messages using Gmail's batch endpoint.
+
+    Results are returned in the same order as ``message_ids``. Messages
+    rejected inside a batch for quota or server errors are re-fetched in a
+    smaller batch after a backoff; messages that still fail are skipped
+    with a warning.
+    """
+    results = {}
+    failed = {}
+
+    def on_response(request_id, response, exception):
+        if exception is not None:
+            failed[request_id] = exception
+            return
+        results[request_id] = _parse_message(response)
+
+    batch_size = max(1, min(batch_size, 100))
+    pending = list(message_ids)
+    for attempt in range(rate_limiter.max_retries + 1):
+        failed.clear()
+        for start in range(0, len(pending), batch_size):
+            chunk = pending[start:start + batch_size]
+            batch = service.new_batch_http_request(callback=on_response)
+            for msg_id in chunk:
+                batch.add(_get_request(service, msg_id), request_id=msg_id)
+            with timed('gmail_get'):
+                execute(batch, 'gmail', mailbox, cost=GMAIL_QUOTA_UNITS['messages.get'] * len(chunk))
+
+        retryable = {msg_id: e for msg_id, e in failed.items() if is_retryable(e)}
+        if not retryable or attempt == rate_limiter.max_retries:
+            break
+        pending = [msg_id for msg_id in pending if msg_id in retryable]
+        time.sleep(rate_limiter.throttled('gmail', mailbox, next(iter(retryable.values())), attempt))
+
+    for msg_id, exception in failed.items():
+        logger.warning("⚠️ Couldn't fetch message %s: %s", msg_id, exception)
+    return [results[msg_id] for msg_id in message_ids if msg_id in results]
+
+def analyze_emails(emails, mailbox='default'):
+    """Extract scheduling info for many emails, only sending likely candidates to the LLM.
+
+    Returns one ``Extraction`` per email, in input order. Emails the
+    prefilter rules out get the same "no scheduling" result the LLM would
+    give; a failed extraction is returned as its exception.
+    """
+    decisions = [prefilter.check(email) for email in emails]
+    to_extract = [email for email, decision in zip(emails, decisions) if decision['call_llm']]
+    extracted = iter(extract_schedules([email_text(email) for email in to_extract], mailbox))
+
+    results = []
+    for email, decision in zip(emails, decisions):
+        if not decision['call_llm']:
+            logger.debug("⏭️ Skipping LLM for %s (score %s, reasons: %s)", email.get('id'), decision['score'], decision['reasons'])
+            results.append(NO_SCHEDULING_RESULT)
+            continue
+        extraction = next(extracted)
+        if not isinstance(extraction, Exception):
+            prefilter.record_outcome(email, decision, extraction)
+        results.append(extraction)
+    return results
+
+def process_email_for_scheduling(email, extraction, mailbox='default'):
+    """Create a calendar event from an email's ``Extraction`` if it holds one.
+
+    Returns False if the extraction failed or the event couldn't be created.
+    """
+    logger.debug("🧠 Extraction: %s", extraction)
+
+    try:
+        if isinstance(extraction, Exception):
+            raise extraction
+
+        if extraction.has_event:
+            logger.info("📋 Scheduling Event: title=%s date=%s start=%s end=%s location=%s participants=%s",
+                        extraction.title, extraction.date, extraction.start_time, extraction.end_time,
+                        extraction.location or 'N/A', ', '.join(extraction.participants))
+
+            create_event(extraction.to_dict(), mailbox, source_id=email.get('id'))
+        return True
+
+    except Exception as e:
+        logger.warning("⚠️ Couldn't extract or schedule event: %s", e)
+        return False
+
+def _report_emails(emails, process_emails, progress=None, mailbox='default'):
+    """Log the emails and, with ``process_emails``, schedule them; returns the ids that failed"""
+    failed_ids = []
+    if progress and process_emails:
+        for email in emails:
+            progress(email['id'], 'analyzing')
+    results = analyze_emails(emails, mailbox) if process_emails else [None] * len(emails)
+    for email, extraction in zip(emails, results):
+        logger.debug("🔹 From: %s | Subject: %s | Snippet: %s", email['from'], email['subject'], email['snippet'])
 
-def authenticate_gmail():
-    creds = None
-    if os.path.exists('token.json'):
-        creds = Credentials.from_authorized_user_file('token.json', SCOPES)
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-        else:
-            flow = InstalledAppFlow.from_client_secrets_file('credentials.json', SCOPES)
-            creds = flow.run_local_server(port=0)
-        with open('token.json', 'w') as token:
-            token.write(creds.to_json())
-    return creds
-
-def get_unread_emails(service, max_results=5, process_emails=False):
-    results = service.users().messages().list(userId='me', labelIds=['UNREAD'], maxResults=max_results).execute()
+        if process_emails:
+            processed = process_email_for_scheduling(email, extraction, mailbox)
+            if not processed:
+                failed_ids.append(email['id'])
+            if progress:
+                progress(email['id'], 'processed' if processed else 'error')
+    return failed_ids
+
+def get_unread_emails(service, max_results=5, process_emails=False, batch_size=GMAIL_BATCH_SIZE, mailbox='default'):
+    with timed('gmail_list'):
+        results = execute(service.users().messages().list(userId='me', labelIds=['UNREAD'], maxResults=max_results),
+                          'gmail', mailbox, cost=GMAIL_QUOTA_UNITS['messages.list'])
     messages = results.get('messages', [])
 
     if not messages:
-        print("✅ No unread emails.")
+        logger.info("✅ No unread emails.")
         return []
 
-    print(f"📨 Found {len(messages)} unread email(s):\n")
-    emails = []
-
-    for msg in messages:
-        msg_data = service.users().messages().get(userId='me', id=msg['id'], format='full').execute()
-        headers = msg_data['payload'].get('headers', [])
-        subject = sender = ""
-        for header in headers:
-            if header['name'] == 'Subject':
-                subject = header['value']
-            if header['name'] == 'From':
-                sender = header['value']
-        snippet = msg_data.get('snippet', '')
-        emails.append({
-            'id': msg['id'],
-            'subject': subject,
-            'from': sender,
-            'snippet': snippet
-        })
-
-        print(f"🔹 From: {sender}")
-        print(f"🔹 Subject: {subject}")
-        print(f"🔹 Snippet: {snippet}\n")
-
-        if process_emails:
-            structured = extract_schedule_from_email(snippet)
-            print("🧠 Structured Output:\n", structured)
-
-            try:
-                data = json.loads(structured)
-
-                if "action" not in data:
-                    print("\n📋 Scheduling Event:")
-                    print(f"Title      : {data['title']}")
-                    print(f"Date       : {data['date']}")
-                    print(f"Start Time : {data['start_time']}")
-                    print(f"End Time   : {data['end_time']}")
-                    print(f"Location   : {data.get('location', 'N/A')}")
-                    print(f"Participants: {', '.join(data.get('participants', []))}")
-
-                    create_event(data)
-
-            except Exception as e:
-                print(f"⚠️ Couldn't parse or schedule event: {e}")
+    logger.info("📨 Found %d unread email(s)", len(messages))
+    emails = fetch_email_metadata(service, [msg['id'] for msg in messages], batch_size, mailbox)
+    _report_emails(emails, process_emails, mailbox=mailbox)
+    return emails
 
+def fetch_new_emails(service, sync, max_results=5, batch_size=GMAIL_BATCH_SIZE):
+    """Fetch the unread mail that arrived since the last commit of ``sync``.
+
+    Returns ``(emails, history_id, failed_ids)``. The caller handles the
+    emails and then calls ``sync.commit(history_id, failed_ids + its own
+    failures)``; until it does, the next poll returns the same mail again.
+    """
+    message_ids, history_id = sync.get_new_message_ids(service, max_results)
+    if not message_ids:
+        return [], history_id, []
+
+    emails = fetch_email_metadata(service, message_ids, batch_size, sync.mailbox)
+    fetched = {email['id'] for email in emails}
+    failed_ids = [msg_id for msg_id in message_ids if msg_id not in fetched]
+    # A message may have been read between the history record and our fetch
+    return [email for email in emails if 'UNREAD' in email['labels']], history_id, failed_ids
+
+def get_new_emails(service, sync, max_results=5, process_emails=False, batch_size=GMAIL_BATCH_SIZE, progress=None):
+    """Like get_unread_emails, but only returns mail that arrived since the last poll of ``sync``.
+
+    The poll is committed once the emails have been handled; emails that
+    couldn't be fetched or scheduled are retried by the next poll.
+    ``progress(email_id, status)`` is called as each email moves through processing.
+    """
+    emails, history_id, failed_ids = fetch_new_emails(service, sync, max_results, batch_size)
+
+    if emails:
+        logger.info("📨 Found %d new unread email(s)", len(emails))
+    else:
+        logger.info("✅ No new unread emails.")
+    failed_ids += _report_emails(emails, process_emails, progress, sync.mailbox)
+    sync.commit(history_id, failed_ids)
     return emails
 
 if __name__ == '__main__':
-    creds = authenticate_gmail()
-    service = build('gmail', 'v1', credentials=creds)
-
-    while True:
-        print("\n🔁 Checking for unread emails...\n")
-        try:
-            get_unread_emails(service, process_emails=True)
-        except Exception as e:
-            print(f"❌ Error during agent run: {e}")
-
-        print("⏳ Sleeping for 1 minute...")
-        time.sleep(1 * 60)
+    logging.basicConfig(level=os.getenv('LOG_LEVEL', 'INFO').upper(), format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+    import signal
+    import itertools
+    from fair_pool import FairPool
+    from job_queue import JOB_WORKERS
+    from mailboxes import mailbox_registry
+    from poll_scheduler import POLL_TRIGGER_PORT, PollScheduler, start_trigger_server
+    from llm_agent import OLLAMA_MODEL
+    from ollama_client import OLLAMA_WARMUP, ollama_client
+
+    # New emails fetched per poll; a poll that gets this many polls again soon
+    poll_max_results = int(os.getenv('POLL_MAX_RESULTS', '5'))
+    # Profile every Nth poll; 0 turns poll profiling off
+    profile_every = int(os.getenv('PROFILE_POLL_EVERY', '0'))
+    poll_count = itertools.count(1)
+
+    def poll_mailbox(mailbox):
+        service = get_gmail_service(mailbox.id)
+        if profile_every and next(poll_count) % profile_every == 0:
+            import profiler
+            with profiler.profile('poll-cycle') as prof:
+                emails = get_new_emails(service, mailbox.agent_sync, poll_max_results, process_emails=True)
+            logger.info("🔬 Poll profile saved to %s", os.path.join(profiler.PROFILE_DIR, f"{prof.id}.json"))
+        else:
+            emails = get_new_emails(service, mailbox.agent_sync, poll_max_results, process_emails=True)
+        return len(emails), len(emails) >= poll_max_results
+
+    # Mailboxes share the workers (and the LLM pool) round-robin, one poll per
+    # mailbox at a time; each is polled on its own adaptive schedule
+    scheduler = PollScheduler(mailbox_registry, FairPool(JOB_WORKERS, 1, name='poll'), poll_mailbox)
+
+    def shutdown(signum, frame):
+        logger.info("👋 Shutting down after the polls in progress...")
+        scheduler.stop()
+
+    signal.signal(signal.SIGINT, shutdown)
+    signal.signal(signal.SIGTERM, shutdown)
+    if POLL_TRIGGER_PORT:
+        start_trigger_server(scheduler)
+    if OLLAMA_WARMUP:
+        ollama_client.warm_up(OLLAMA_MODEL)
+    scheduler.run()
@@ -0,0 +1,148 @@
+import json
+import logging
+import temporal_parser
+
+logger = logging.getLogger(__name__)
+
+# What the prompts ask the model to answer for an email without an event
+NO_SCHEDULING_ACTION = "No scheduling info found."
+
+# Strings small models write instead of leaving a field out
+_EMPTY_VALUES = {"", "null", "none", "n/a"}
+
+_FIELD_SCHEMA = {
+    "title": {"type": "string"},
+    "date": {"type": "string"},
+    "start_time": {"type": "string"},
+    "end_time": {"type": "string"},
+    "location": {"type": "string"},
+    "participants": {"type": "array", "items": {"type": "string"}},
+    "action": {"type": "string"}
+}
+
+# JSON schemas passed as Ollama's ``format`` so the model can only produce objects of this shape
+EXTRACTION_SCHEMA = {"type": "object", "properties": _FIELD_SCHEMA}
+BATCH_EXTRACTION_SCHEMA = {
+    "type": "array",
+    "items": {"type": "object", "properties": dict(_FIELD_SCHEMA, index={"type": "integer"}), "required": ["index"]}
+}
+
+
+def _text(value):
+    if value is None:
+        return ""
+    text = str(value).strip()
+    return "" if text.lower() in _EMPTY_VALUES else text
+
+
+def _participant(value):
+    # Models sometimes list people as {"name": ..., "email": ...}; prefer the address
+    if isinstance(value, dict):
+        value = value.get("email") or value.get("name")
+    return _text(value) if isinstance(value, str) else ""
+
+
+class Extraction:
+    """The scheduling info extracted from one email, validated once.
+
+    ``has_event`` is true when a date and a start time were found; then
+    title, end_time, location and participants are filled in as well.
+    Otherwise every field is empty and ``to_dict`` gives the same
+    ``{"action": ...}`` answer the model uses for "no event".
+    Instances are immutable and hashable.
+    """
+
+    __slots__ = ('title', 'date', 'start_time', 'end_time', 'location', 'participants')
+
+    def __init__(self, title="", date="", start_time="", end_time="", location="", participants=()):
+        # Instances are shared through the cache and NO_EVENT, so they can't change after this
+        set_field = object.__setattr__
+        set_field(self, 'title', title)
+        set_field(self, 'date', date)
+        set_field(self, 'start_time', start_time)
+        set_field(self, 'end_time', end_time)
+        set_field(self, 'location', location)
+        set_field(self, 'participants', tuple(participants))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Extraction is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("Extraction is immutable")
+
+    @property
+    def has_event(self):
+        return bool(self.date and self.start_time)
+
+    @classmethod
+    def from_dict(cls, data):
+        """Validate and normalize one object parsed from the model's answer"""
+        if not isinstance(data, dict):
+            raise ValueError("Parsed JSON is not an object")
+        if data.get("action"):
+            return NO_EVENT
+
+        date = _text(data.get("date"))
+        # Some models answer with "time" instead of "start_time"
+        start_time = _text(data.get("start_time")) or _text(data.get("time"))
+        if not (date and start_time):
+            logger.debug("⚠️ Missing required fields: date=%s, start_time=%s", bool(date), bool(start_time))
+            return NO_EVENT
+
+        end_time = _text(data.get("end_time"))
+        if not end_time:
+            # Default to 30 minutes; keep the start time if it can't be parsed
+            start_raw = start_time.lower().replace(" ", "")
+            try:
+                end_time = temporal_parser.add_minutes(temporal_parser.parse_time(start_raw), 30).strftime("%H:%M")
+            except ValueError:
+                end_time = start_raw
+
+        participants = data.get("participants")
+        if not isinstance(participants, list):
+            participants = [participants]
+
+        logger.debug("✅ Valid scheduling data found: date=%s, start_time=%s", date, start_time)
+        return cls(
+            title=_text(data.get("title")) or "Meeting",
+            date=date,
+            start_time=start_time,
+            end_time=end_time,
+            location=_text(data.get("location")),
+            participants=[name for name in map(_participant, participants) if name]
+        )
+
+    @classmethod
+    def from_json(cls, text):
+        return cls.from_dict(json.loads(text))
+
+    def to_dict(self):
+        """A fresh dict in the shape the API, store and calendar code use"""
+        if not self.has_event:
+            return {"action": NO_SCHEDULING_ACTION}
+        return {
+            "title": self.title,
+            "date": self.date,
+            "start_time": self.start_time,
+            "end_time": self.end_time,
+            "location": self.location,
+            "participants": list(self.participants)
+        }
+
+    def to_json(self):
+        return json.dumps(self.to_dict())
+
+    def __eq__(self, other):
+        if not isinstance(other, Extraction):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __hash__(self):
+        return hash(tuple(getattr(self, name) for name in self.__slots__))
+
+    def __repr__(self):
+        return f"Extraction({self.to_dict()!r})"
+
+
+# The result for every email without an event; shared since it never changes
+NO_EVENT = Extraction()
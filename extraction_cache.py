@@ -0,0 +1,158 @@
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from extraction import Extraction
+from data_dir import data_path
+
+# On-disk tier location; set EXTRACTION_CACHE_FILE to an empty string to keep the cache in memory only
+EXTRACTION_CACHE_FILE = os.getenv('EXTRACTION_CACHE_FILE', data_path('extraction_cache.db'))
+# Max entries kept in the in-memory LRU tier
+EXTRACTION_CACHE_SIZE = int(os.getenv('EXTRACTION_CACHE_SIZE', '1024'))
+# Max entries kept on disk before the oldest are evicted
+EXTRACTION_CACHE_DISK_SIZE = int(os.getenv('EXTRACTION_CACHE_DISK_SIZE', '50000'))
+# Seconds an entry stays valid in either tier (default: 7 days)
+EXTRACTION_CACHE_TTL = float(os.getenv('EXTRACTION_CACHE_TTL', str(7 * 24 * 3600)))
+
+_whitespace = re.compile(r'\s+')
+
+
+def make_key(model, prompt_version, email_text):
+    """Content address for an extraction: model + prompt version + normalized email text"""
+    normalized = _whitespace.sub(' ', email_text or '').strip()
+    digest = hashlib.sha256()
+    for part in (model, str(prompt_version), normalized):
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+class ExtractionCache:
+    """Two-tier cache for LLM extraction results.
+
+    Lookups go to an in-memory LRU first, then to a SQLite file that
+    survives restarts. Disk hits are promoted back into memory. Values are
+    ``Extraction`` objects; only the disk tier stores them as JSON. Both tiers
+    expire entries after ``ttl`` seconds; the memory tier is bounded by
+    ``max_entries`` and the disk tier by ``max_disk_entries``.
+    """
+
+    def __init__(self, path=EXTRACTION_CACHE_FILE, max_entries=EXTRACTION_CACHE_SIZE,
+                 max_disk_entries=EXTRACTION_CACHE_DISK_SIZE, ttl=EXTRACTION_CACHE_TTL):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl = ttl
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self._stores_since_prune = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _connect(self):
+        # Opened lazily so importing the module never touches the disk
+        if self._db is None and self.path:
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS extractions ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " created_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_extractions_created_at ON extractions (created_at)")
+            self._db.commit()
+        return self._db
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, created_at = entry
+                if now - created_at <= self.ttl:
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    return value
+                del self._memory[key]
+
+            db = self._connect()
+            if db is not None:
+                row = db.execute(
+                    "SELECT value, created_at FROM extractions WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    value, created_at = row
+                    if now - created_at <= self.ttl:
+                        value = Extraction.from_json(value)
+                        self._remember(key, value, created_at)
+                        self.disk_hits += 1
+                        return value
+                    db.execute("DELETE FROM extractions WHERE key = ?", (key,))
+                    db.commit()
+
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        now = time.time()
+        with self._lock:
+            self._remember(key, value, now)
+
+            db = self._connect()
+            if db is not None:
+                db.execute(
+                    "INSERT OR REPLACE INTO extractions (key, value, created_at) VALUES (?, ?, ?)",
+                    (key, value.to_json(), now)
+                )
+                self._stores_since_prune += 1
+                # Pruning scans the table, so only do it every so often
+                if self._stores_since_prune >= 100:
+                    self._prune_disk(db, now)
+                db.commit()
+
+    def _remember(self, key, value, created_at):
+        self._memory[key] = (value, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    def _prune_disk(self, db, now):
+        self._stores_since_prune = 0
+        expired = db.execute("DELETE FROM extractions WHERE created_at < ?", (now - self.ttl,)).rowcount
+        overflow = db.execute(
+            "DELETE FROM extractions WHERE key IN ("
+            " SELECT key FROM extractions ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_disk_entries,)
+        ).rowcount
+        self.evictions += max(expired, 0) + max(overflow, 0)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            db = self._connect()
+            if db is not None:
+                db.execute("DELETE FROM extractions")
+                db.commit()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_entries": len(self._memory),
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0
+            }
+
+
+# Shared cache used by llm_agent
+extraction_cache = ExtractionCache()
@@ -0,0 +1,102 @@
+import threading
+from collections import deque
+from concurrent.futures import Future
+
+
+class FairPool:
+    """Worker threads shared by many keys (mailboxes) and served round-robin.
+
+    Each key has its own FIFO of pending tasks. Workers take the next task
+    from the next key in turn, so a key with a thousand queued tasks gets
+    the same share of the pool as a key with one. A key never has more than
+    ``per_key_limit`` tasks running at once (override per key with
+    ``set_limit``). ``submit`` returns a ``concurrent.futures.Future``.
+    """
+
+    def __init__(self, workers, per_key_limit=None, name='fair-pool'):
+        self.workers = max(1, workers)
+        self.per_key_limit = per_key_limit or self.workers
+        self.name = name
+        self._limits = {}
+        self._pending = {}
+        self._turns = deque()
+        self._running = {}
+        self._cond = threading.Condition()
+        self._threads = []
+
+    def set_limit(self, key, limit):
+        with self._cond:
+            self._limits[key] = max(1, limit)
+            self._cond.notify_all()
+
+    def _limit(self, key):
+        return self._limits.get(key, self.per_key_limit)
+
+    def _ensure_workers(self):
+        # Workers start on first use so importing a module doesn't spawn threads
+        if self._threads:
+            return
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f'{self.name}-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, key, fn, *args, **kwargs):
+        future = Future()
+        with self._cond:
+            self._ensure_workers()
+            pending = self._pending.get(key)
+            if pending is None:
+                pending = self._pending[key] = deque()
+                self._turns.append(key)
+            pending.append((future, fn, args, kwargs))
+            self._cond.notify()
+        return future
+
+    def _take(self):
+        # Called with the condition held. Rotate through the keys that have
+        # work, skipping the ones already at their concurrency limit.
+        for _ in range(len(self._turns)):
+            key = self._turns.popleft()
+            if self._running.get(key, 0) >= self._limit(key):
+                self._turns.append(key)
+                continue
+            pending = self._pending[key]
+            task = pending.popleft()
+            if pending:
+                self._turns.append(key)
+            else:
+                del self._pending[key]
+            self._running[key] = self._running.get(key, 0) + 1
+            return key, task
+        return None
+
+    def _work(self):
+        while True:
+            with self._cond:
+                taken = self._take()
+                while taken is None:
+                    self._cond.wait()
+                    taken = self._take()
+            key, (future, fn, args, kwargs) = taken
+            try:
+                if future.set_running_or_notify_cancel():
+                    try:
+                        future.set_result(fn(*args, **kwargs))
+                    except BaseException as e:
+                        future.set_exception(e)
+            finally:
+                with self._cond:
+                    self._running[key] -= 1
+                    if not self._running[key]:
+                        del self._running[key]
+                    self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            return {
+                "workers": self.workers,
+                "keys_waiting": len(self._pending),
+                "pending": sum(len(pending) for pending in self._pending.values()),
+                "running": sum(self._running.values())
+            }
@@ -33,6 +33,7 @@ import axios from 'axios';
 import './App.css';
 
 const API_BASE_URL = process.env.REACT_APP_API_URL || 'http://localhost:5000/api';
+const JOB_POLL_INTERVAL_MS = 1000;
 
 function App() {
   // State for emails
@@ -63,6 +64,21 @@ function App() {
     }
   };
 
+  // Long-running endpoints return a job id; poll it until the job finishes
+  const waitForJob = async (jobId) => {
+    for (;;) {
+      const response = await axios.get(`${API_BASE_URL}/jobs/${jobId}`);
+      const job = response.data;
+      if (job.status === 'done') {
+        return job.result;
+      }
+      if (job.status === 'failed') {
+        throw new Error(job.error || 'Job failed');
+      }
+      await new Promise((resolve) => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+    }
+  };
+
   const fetchEmails = async () => {
     setLoading(true);
     setError(null);
@@ -70,10 +86,15 @@ function App() {
     
     try {
       const response = await axios.get(`${API_BASE_URL}/fetch-emails`);
-      setFetchedEmails(response.data.emails);
-      setSuccess(`Successfully fetched ${response.data.count} unread emails`);
+      const result = await waitForJob(response.data.job_id);
+      // The backend only returns mail that is new since the last fetch, so add it to what is already shown
+      setFetchedEmails((previous) => {
+        const newIds = new Set(result.emails.map((email) => email.id));
+        return [...result.emails, ...previous.filter((email) => !newIds.has(email.id))];
+      });
+      setSuccess(`Fetched ${result.count} new unread emails`);
     } catch (err) {
-      setError(err.response?.data?.error || 'Failed to fetch emails');
+      setError(err.response?.data?.error || err.message || 'Failed to fetch emails');
     } finally {
       setLoading(false);
     }
@@ -199,7 +220,7 @@ function App() {
       {fetchedEmails.length > 0 && (
         <Paper elevation={2} sx={{ p: 3, mb: 3 }}>
           <Typography variant="h5" gutterBottom sx={{ display: 'flex', alignItems: 'center', gap: 1, mb: 2 }}>
-            <Email /> All Unread Emails ({fetchedEmails.length})
+            <Email /> Fetched Emails ({fetchedEmails.length})
           </Typography>
           
           <List>
@@ -275,6 +296,14 @@ function App() {
                           color={getStatusColor(email.has_scheduling)}
                           size="small"
                         />
+                        {email.conflict && (
+                          <Chip
+                            label="Conflict"
+                            color="warning"
+                            size="small"
+                            title={email.conflicts.map((event) => event.summary).join(', ')}
+                          />
+                        )}
                       </Box>
                     }
                     secondary={
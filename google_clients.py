@@ -0,0 +1,108 @@
+import os
+import re
+import threading
+from data_dir import data_path
+
+# The Google client libraries take a few hundred ms to import, so they are
+# only imported once credentials or a client are actually needed.
+
+# If modifying these SCOPES, delete the token.json file first
+SCOPES = ['https://www.googleapis.com/auth/gmail.readonly','https://www.googleapis.com/auth/calendar.events']
+
+TOKEN_FILE = os.getenv('GOOGLE_TOKEN_FILE', 'token.json')
+CLIENT_SECRETS_FILE = os.getenv('GOOGLE_CLIENT_SECRETS_FILE', 'credentials.json')
+
+# Every additional mailbox keeps its token at MAILBOXES_DIR/<mailbox>/token.json;
+# the default mailbox uses TOKEN_FILE
+MAILBOXES_DIR = os.getenv('MAILBOXES_DIR', data_path('mailboxes'))
+DEFAULT_MAILBOX = 'default'
+
+_MAILBOX_ID = re.compile(r'^[A-Za-z0-9][A-Za-z0-9_.@+-]*$')
+
+# Seconds to wait on a Google API socket before giving up
+GOOGLE_API_TIMEOUT = int(os.getenv('GOOGLE_API_TIMEOUT', '60'))
+
+# mailbox -> credentials
+_credentials = {}
+_credentials_lock = threading.RLock()
+
+# httplib2.Http is not thread-safe, so every thread gets its own keep-alive
+# connection and its own built services. Credentials are shared.
+_local = threading.local()
+
+
+def token_file(mailbox=DEFAULT_MAILBOX):
+    """Path of the OAuth token for a mailbox; raises ValueError for an invalid mailbox id"""
+    if mailbox == DEFAULT_MAILBOX:
+        return TOKEN_FILE
+    if not _MAILBOX_ID.match(mailbox or ''):
+        raise ValueError(f"Invalid mailbox id: {mailbox!r}")
+    return os.path.join(MAILBOXES_DIR, mailbox, 'token.json')
+
+
+def get_credentials(mailbox=DEFAULT_MAILBOX):
+    """Load (and if needed refresh) a mailbox's OAuth credentials once per process.
+
+    The token file is only written when the credentials actually change,
+    i.e. after the interactive consent flow or a refresh.
+    """
+    from google.oauth2.credentials import Credentials
+    from google.auth.transport.requests import Request
+
+    path = token_file(mailbox)
+    with _credentials_lock:
+        creds = _credentials.get(mailbox)
+        if creds is None and os.path.exists(path):
+            creds = Credentials.from_authorized_user_file(path, SCOPES)
+
+        if not creds or not creds.valid:
+            if creds and creds.expired and creds.refresh_token:
+                creds.refresh(Request())
+            else:
+                from google_auth_oauthlib.flow import InstalledAppFlow
+                flow = InstalledAppFlow.from_client_secrets_file(CLIENT_SECRETS_FILE, SCOPES)
+                creds = flow.run_local_server(port=0)
+            if os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w') as token:
+                token.write(creds.to_json())
+
+        _credentials[mailbox] = creds
+        return creds
+
+
+def get_service(api, version, mailbox=DEFAULT_MAILBOX):
+    """Return a mailbox's built API client for the calling thread, building it on first use.
+
+    Clients use the discovery documents bundled with google-api-python-client
+    (no discovery network call) and reuse one keep-alive connection per thread.
+    """
+    services = getattr(_local, 'services', None)
+    if services is None:
+        services = _local.services = {}
+
+    service = services.get((api, version, mailbox))
+    if service is None:
+        import httplib2
+        from google_auth_httplib2 import AuthorizedHttp
+        from googleapiclient.discovery import build
+
+        http = AuthorizedHttp(get_credentials(mailbox), http=httplib2.Http(timeout=GOOGLE_API_TIMEOUT))
+        service = build(api, version, http=http, static_discovery=True, cache_discovery=False)
+        services[(api, version, mailbox)] = service
+    return service
+
+
+def get_gmail_service(mailbox=DEFAULT_MAILBOX):
+    return get_service('gmail', 'v1', mailbox)
+
+
+def get_calendar_service(mailbox=DEFAULT_MAILBOX):
+    return get_service('calendar', 'v3', mailbox)
+
+
+def reset():
+    """Drop cached credentials and this thread's clients (e.g. after a token file was replaced)"""
+    with _credentials_lock:
+        _credentials.clear()
+    _local.services = {}
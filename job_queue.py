@@ -0,0 +1,132 @@
+import os
+import time
+import logging
+import uuid
+import threading
+from collections import OrderedDict
+from fair_pool import FairPool
+
+logger = logging.getLogger(__name__)
+
+# Background threads that run queued jobs
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', '2'))
+# Jobs one mailbox may run at once, so a busy mailbox can't take every worker
+MAILBOX_JOB_CONCURRENCY = int(os.getenv('MAILBOX_JOB_CONCURRENCY', '1'))
+# Finished jobs kept around so clients can still read their result
+JOB_HISTORY_SIZE = int(os.getenv('JOB_HISTORY_SIZE', '200'))
+
+
+class Job:
+    """A unit of background work plus the per-email progress it reports"""
+
+    def __init__(self, kind, key, fn):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.key = key
+        self.fn = fn
+        self.status = 'queued'
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.result = None
+        self.error = None
+        self.progress = OrderedDict()
+        self._lock = threading.Lock()
+
+    def set_progress(self, email_id, status):
+        with self._lock:
+            self.progress[email_id] = status
+
+    @property
+    def active(self):
+        return self.status in ('queued', 'running')
+
+    def to_dict(self):
+        with self._lock:
+            progress = [{"email_id": email_id, "status": status} for email_id, status in self.progress.items()]
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "mailbox": self.key,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "progress": progress,
+            "result": self.result,
+            "error": self.error
+        }
+
+
+class JobQueue:
+    """In-process job queue served by a small pool of daemon worker threads.
+
+    The key is the mailbox. Mailboxes take turns on the shared workers and
+    each runs at most ``per_mailbox`` jobs at once. Submitting a job while
+    another job of the same kind for the same mailbox is still queued or
+    running returns the existing job instead of starting a second one.
+    """
+
+    def __init__(self, workers=JOB_WORKERS, history_size=JOB_HISTORY_SIZE, per_mailbox=MAILBOX_JOB_CONCURRENCY):
+        self.workers = max(1, workers)
+        self.history_size = history_size
+        self._pool = FairPool(self.workers, per_mailbox, name='job-worker')
+        self._jobs = OrderedDict()
+        self._active = {}
+        self._lock = threading.Lock()
+
+    def submit(self, kind, key, fn):
+        """Queue ``fn(job)`` and return (job, created). ``created`` is False when coalesced."""
+        with self._lock:
+            existing = self._active.get((kind, key))
+            if existing is not None and existing.active:
+                return existing, False
+
+            job = Job(kind, key, fn)
+            self._jobs[job.id] = job
+            self._active[(kind, key)] = job
+            self._trim()
+
+        self._pool.submit(key, self._run, job)
+        return job, True
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _trim(self):
+        finished = [job_id for job_id, job in self._jobs.items() if not job.active]
+        for job_id in finished[:max(0, len(finished) - self.history_size)]:
+            del self._jobs[job_id]
+
+    def _run(self, job):
+        job.status = 'running'
+        job.started_at = time.time()
+        try:
+            job.result = job.fn(job)
+            job.status = 'done'
+        except Exception as e:
+            logger.exception("❌ Job %s (%s) failed", job.kind, job.id)
+            job.error = str(e)
+            job.status = 'failed'
+        finally:
+            job.finished_at = time.time()
+            with self._lock:
+                if self._active.get((job.kind, job.key)) is job:
+                    del self._active[(job.kind, job.key)]
+
+    def stats(self):
+        with self._lock:
+            statuses = [job.status for job in self._jobs.values()]
+        return {
+            "workers": self.workers,
+            "queued": statuses.count('queued'),
+            "running": statuses.count('running'),
+            "done": statuses.count('done'),
+            "failed": statuses.count('failed'),
+            "mailboxes_waiting": self._pool.stats()["keys_waiting"]
+        }
+
+
+# Shared queue used by the API
+job_queue = JobQueue()
@@ -1,19 +1,214 @@
 import re
 import json
-import requests
 import os
-from datetime import datetime, timedelta
+import time
+import asyncio
+import logging
+import threading
+from fair_pool import FairPool
+from extraction import BATCH_EXTRACTION_SCHEMA, EXTRACTION_SCHEMA, Extraction
+from extraction_cache import extraction_cache, make_key
+from metrics import timed
+from ollama_client import get_async_client, ollama_client
 
-# Get Ollama URL from environment variable (defaults to localhost for local development)
-OLLAMA_BASE_URL = os.getenv('OLLAMA_URL', 'http://localhost:11434')
-OLLAMA_API_URL = f"{OLLAMA_BASE_URL}/api/generate"
+logger = logging.getLogger(__name__)
+
+# Ollama servers are configured in ollama_client (OLLAMA_URL / OLLAMA_URLS)
 
 # Get model name from environment variable (defaults to smaller model for better memory usage)
 # Options: "phi3", "gemma2:2b", "llama3.2", "llama3" (larger, needs more RAM)
 OLLAMA_MODEL = os.getenv('OLLAMA_MODEL', 'phi3')
 
+# Stream tokens and stop generating once the JSON answer is complete
+OLLAMA_STREAM = os.getenv('OLLAMA_STREAM', 'true').lower() == 'true'
+
+# Pass the answer's JSON schema as Ollama's ``format`` so decoding can't stray from it (Ollama 0.5+)
+OLLAMA_STRUCTURED_OUTPUT = os.getenv('OLLAMA_STRUCTURED_OUTPUT', 'true').lower() == 'true'
+
+# Bump whenever the extraction prompt or output normalization changes so cached results are not reused
+PROMPT_VERSION = "2"
+
+# Max extractions in flight at once across the whole process. Match this to the
+# OLLAMA_NUM_PARALLEL setting of the Ollama server; extra requests would only queue there.
+LLM_CONCURRENCY = int(os.getenv('LLM_CONCURRENCY', os.getenv('OLLAMA_NUM_PARALLEL', '4')))
+# Extractions one mailbox may have in flight; defaults to the whole pool
+MAILBOX_LLM_CONCURRENCY = int(os.getenv('MAILBOX_LLM_CONCURRENCY', str(LLM_CONCURRENCY)))
+
+# Several snippets share one prompt so the instructions are evaluated once per
+# batch. A batch is closed when its estimated input plus output tokens would
+# exceed the budget, or at the email cap; 1 disables batching.
+LLM_BATCH_TOKEN_BUDGET = int(os.getenv('LLM_BATCH_TOKEN_BUDGET', '1500'))
+LLM_BATCH_MAX_EMAILS = int(os.getenv('LLM_BATCH_MAX_EMAILS', '8'))
+# Rough answer size per email, counted against the budget
+OUTPUT_TOKENS_PER_EMAIL = 80
+
+_extraction_pool = None
+_extraction_pool_lock = threading.Lock()
+
+def _get_extraction_pool():
+    global _extraction_pool
+    with _extraction_pool_lock:
+        if _extraction_pool is None:
+            _extraction_pool = FairPool(LLM_CONCURRENCY, MAILBOX_LLM_CONCURRENCY, name='llm-extract')
+        return _extraction_pool
+
+def _estimate_tokens(text):
+    # ~4 characters per token for English text, plus the per-email framing
+    return len(text) // 4 + 10
+
+def plan_batches(email_texts, token_budget=LLM_BATCH_TOKEN_BUDGET, max_emails=LLM_BATCH_MAX_EMAILS):
+    """Group text indexes into batches that fit the token budget, keeping input order"""
+    batches, batch, used = [], [], 0
+    for i, text in enumerate(email_texts):
+        cost = _estimate_tokens(text) + OUTPUT_TOKENS_PER_EMAIL
+        if batch and (used + cost > token_budget or len(batch) >= max_emails):
+            batches.append(batch)
+            batch, used = [], 0
+        batch.append(i)
+        used += cost
+    if batch:
+        batches.append(batch)
+    return batches
+
+def extract_schedules(email_texts, mailbox='default'):
+    """Extract scheduling info for many texts, batching cache misses into shared prompts.
+
+    Batches run on the shared worker pool; mailboxes take turns on it, so
+    one large mailbox doesn't hold up the others. ``Extraction`` results
+    come back in input order. A failed extraction doesn't stop the others:
+    its slot holds the exception that was raised instead of a result.
+    """
+    results = [None] * len(email_texts)
+    keys = [make_key(OLLAMA_MODEL, PROMPT_VERSION, text) for text in email_texts]
+    misses = []
+    for i, key in enumerate(keys):
+        cached = extraction_cache.get(key)
+        if cached is None:
+            misses.append(i)
+        else:
+            results[i] = cached
+
+    pool = _get_extraction_pool()
+    batches = plan_batches([email_texts[i] for i in misses])
+    futures = [
+        (indexes, pool.submit(mailbox, extract_schedule_batch, [email_texts[i] for i in indexes]))
+        for indexes in ([misses[j] for j in batch] for batch in batches)
+    ]
+    for indexes, future in futures:
+        try:
+            batch_results = future.result()
+        except Exception as e:
+            batch_results = [e] * len(indexes)
+        for i, extraction in zip(indexes, batch_results):
+            results[i] = extraction
+            _cache_result(keys[i], extraction)
+    return results
+
+def _cache_result(key, extraction):
+    # Failures come back as exceptions and are never cached, so they get another try
+    if isinstance(extraction, Extraction):
+        extraction_cache.put(key, extraction)
+
+def extract_schedule_batch(email_texts):
+    """Extract several emails with one prompt, returning one result (or exception) per text.
+
+    The model answers with a JSON array of objects tagged with the email's
+    1-based ``index``. Emails missing from a malformed or partial answer are
+    retried in halves, down to the single-email prompt.
+    """
+    if len(email_texts) == 1:
+        try:
+            return [_extract_schedule_uncached(email_texts[0])]
+        except Exception as e:
+            return [e]
+
+    try:
+        with timed('llm_request'):
+            raw_output = _generate(_batch_prompt(email_texts), opener='[', emails=len(email_texts))
+        logger.debug("🔍 Raw LLM batch output: %s", raw_output)
+        with timed('json_extraction'):
+            parsed = _parse_batch(raw_output, len(email_texts))
+    except Exception as e:
+        logger.debug("⚠️ Batch of %d failed (%s), splitting", len(email_texts), e)
+        parsed = {}
+
+    missing = [i for i in range(len(email_texts)) if i not in parsed]
+    if missing:
+        _record_split()
+        if len(missing) == len(email_texts):
+            half = len(missing) // 2
+            groups = [missing[:half], missing[half:]]
+        else:
+            groups = [missing]
+        for group in groups:
+            for i, structured in zip(group, extract_schedule_batch([email_texts[i] for i in group])):
+                parsed[i] = structured
+    return [parsed[i] for i in range(len(email_texts))]
+
+def _batch_prompt(email_texts):
+    emails = "\n\n".join(f'Email {i}:\n"""{text}"""' for i, text in enumerate(email_texts, 1))
+    return f"""
+You are a helpful AI assistant that extracts meeting and scheduling information from email content.
+
+Below are {len(email_texts)} emails, numbered 1 to {len(email_texts)}.
+
+{emails}
+
+For each email that contains an event, extract:
+- Title
+- Date
+- Start Time
+- End Time
+- Location (if any)
+- Participants (if mentioned)
+Return all dates in ISO format like "2025-10-23".
+
+Respond ONLY with a JSON array holding exactly one object per email, in order, each with the email's "index":
+[
+  {{ "index": 1, "title": "...", "date": "...", "start_time": "...", "end_time": "...", "location": "...", "participants": [...] }},
+  {{ "index": 2, "action": "No scheduling info found." }}
+]
+
+Use {{ "index": N, "action": "No scheduling info found." }} for an email without an event.
+"""
+
+def _parse_batch(raw_output, count):
+    """Map 0-based email position -> Extraction for every valid item in a batch answer"""
+    json_str = _first_json_object(raw_output, opener='[')
+    if json_str is None:
+        raise ValueError("No JSON array found in LLM output")
+    items = _loads(json_str)
+    if not isinstance(items, list):
+        raise ValueError("Parsed JSON is not an array")
+
+    parsed = {}
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        index = item.pop("index", None)
+        if isinstance(index, str) and index.strip().isdigit():
+            index = int(index)
+        if not isinstance(index, int) or not 1 <= index <= count or index - 1 in parsed:
+            continue
+        try:
+            parsed[index - 1] = Extraction.from_dict(item)
+        except ValueError:
+            continue
+    return parsed
+
 def extract_schedule_from_email(email_text):
-    prompt = f"""
+    """Extract an ``Extraction`` from email text, reusing a cached result when the same text was seen before"""
+    key = make_key(OLLAMA_MODEL, PROMPT_VERSION, email_text)
+    cached = extraction_cache.get(key)
+    if cached is not None:
+        return cached
+
+    extraction = _extract_schedule_uncached(email_text)
+    _cache_result(key, extraction)
+    return extraction
+
+def _single_prompt(email_text):
+    return f"""
 You are a helpful AI assistant that extracts meeting and scheduling information from email content.
 
 Email:
@@ -42,94 +237,351 @@ If there's no event, respond:
 {{ "action": "No scheduling info found." }}
 """
 
-    response = requests.post(
-        OLLAMA_API_URL,
-        json={
-            "model": OLLAMA_MODEL,
-            "prompt": prompt,
-            "stream": False
-        },
-        timeout=60  # Add timeout for better error handling
-    )
+def _extract_schedule_uncached(email_text):
+    prompt = _single_prompt(email_text)
 
-    result = response.json()
-    print("🔍 Result:", result)
+    with timed('llm_request'):
+        raw_output = _generate(prompt)
+    logger.debug("🔍 Raw LLM Output: %s", raw_output)
 
-    if "error" in result:
-        raise ValueError(result["error"])
-
-    raw_output = result["response"]
-    print("🔍 Raw LLM Output:", raw_output)
+    with timed('json_extraction'):
+        return _parse_extraction(raw_output)
 
+def _parse_extraction(raw_output):
+    """Pull the first JSON object out of the model output and validate it into an Extraction"""
     # Extract first JSON block only (removes explanations, comments, etc.)
-    match = re.search(r'{[\s\S]*}', raw_output)
-    if match:
-        json_str = match.group()
+    json_str = _first_json_object(raw_output)
+    if json_str is None:
+        match = re.search(r'{[\s\S]*}', raw_output)
+        json_str = match.group() if match else None
+    if not json_str:
+        raise ValueError("No valid JSON found in LLM output")
+    return Extraction.from_dict(_loads(json_str))
 
-        # Remove JS-style comments if any
-        json_str = re.sub(r'//.*', '', json_str)
+def _loads(json_str):
+    """Parse the model's JSON, dropping JS-style comments only when they keep it from parsing"""
+    try:
+        return json.loads(json_str)
+    except ValueError:
+        # Schema-constrained output never holds comments, so there is nothing to repair
+        if OLLAMA_STRUCTURED_OUTPUT:
+            raise
+        return json.loads(_strip_comments(json_str))
 
-        # Normalize and enforce scheduling when date and time exist
-        try:
-            data = json.loads(json_str)
-
-            # If model explicitly says no scheduling info, return as-is
-            if isinstance(data, dict) and data.get("action"):
-                return json.dumps(data)
-
-            if not isinstance(data, dict):
-                raise ValueError("Parsed JSON is not an object")
-
-            # Map alternative keys
-            if "time" in data and not data.get("start_time"):
-                data["start_time"] = data.get("time")
-
-            # Minimal requirement: date and start_time -> schedule
-            has_date = bool(str(data.get("date", "")).strip())
-            has_start = bool(str(data.get("start_time", "")).strip())
-
-            if has_date and has_start:
-                # Default title if missing
-                if not str(data.get("title", "")).strip():
-                    data["title"] = "Meeting"
-
-                # Ensure location is a string
-                if data.get("location") is None:
-                    data["location"] = ""
-
-                # Ensure participants is a list
-                participants = data.get("participants")
-                if participants is None:
-                    data["participants"] = []
-                elif not isinstance(participants, list):
-                    data["participants"] = [str(participants)]
-
-                # Auto-fill end_time (+30 minutes) if missing or empty
-                end_time_raw = str(data.get("end_time", "")).strip()
-                if not end_time_raw or end_time_raw.lower() in ["null", "none", ""]:
-                    start_raw = str(data.get("start_time", "")).strip().lower().replace(" ", "")
-                    end_time_val = None
-                    # Try common formats: 3:00pm, 03:00PM, 15:00, 15:00:00
-                    for fmt in ("%I:%M%p", "%I%p", "%H:%M", "%H:%M:%S"):
-                        try:
-                            t = datetime.strptime(start_raw, fmt)
-                            dt = datetime(2000, 1, 1, t.hour, t.minute) + timedelta(minutes=30)
-                            end_time_val = dt.strftime("%H:%M")
-                            break
-                        except Exception:
-                            continue
-                    # Fallback: keep same start time
-                    data["end_time"] = end_time_val or start_raw
-
-                print(f"✅ Valid scheduling data found: date={data.get('date')}, start_time={data.get('start_time')}")
-                return json.dumps(data)
-            else:
-                # If minimal fields not found, mark as no scheduling
-                print(f"⚠️ Missing required fields: date={bool(has_date)}, start_time={bool(has_start)}")
-                # Return the "no scheduling" format
-                return json.dumps({"action": "No scheduling info found."})
-        except Exception:
-            # If normalization fails, return cleaned string to avoid breaking flow
-            return json_str.strip()
+def _strip_comments(json_str):
+    # Only outside strings, so values like "https://zoom.us/j/1" survive
+    out = []
+    in_string = escaped = False
+    i = 0
+    while i < len(json_str):
+        char = json_str[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == '\\':
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif json_str.startswith('//', i):
+            end = json_str.find('\n', i)
+            i = len(json_str) if end == -1 else end
+            continue
+        out.append(char)
+        i += 1
+    return ''.join(out)
+
+# What must come next (after whitespace) for an opening bracket to start the answer,
+# so prose like "results [1-3]:" before the JSON isn't mistaken for it
+_JSON_START_FOLLOWERS = {'{': '"', '[': '{'}
+
+class _JsonObjectScanner:
+    """Tracks bracket depth over streamed text to spot where the first top-level JSON object
+    (or, with ``opener='['``, array of objects) closes"""
+
+    def __init__(self, opener='{'):
+        self.opener = opener
+        self.follower = _JSON_START_FOLLOWERS[opener]
+        self.text = []
+        self.length = 0
+        self.candidate = None
+        self.start = None
+        self.end = None
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+
+    def feed(self, chunk):
+        """Consume more text; returns True once the first object has closed"""
+        if self.end is not None:
+            return True
+        for i, ch in enumerate(chunk):
+            if self.start is None:
+                if self.candidate is not None:
+                    if ch.isspace():
+                        continue
+                    if ch == self.follower:
+                        self.start, self.depth = self.candidate, 1
+                    self.candidate = None
+                if self.start is None:
+                    if ch == self.opener:
+                        self.candidate = self.length + i
+                    continue
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif ch == '\\':
+                    self.escaped = True
+                elif ch == '"':
+                    self.in_string = False
+            elif ch == '"':
+                self.in_string = True
+            elif ch in '{[':
+                self.depth += 1
+            elif ch in '}]':
+                self.depth -= 1
+                if self.depth == 0:
+                    self.end = self.length + i + 1
+                    break
+        self.text.append(chunk)
+        self.length += len(chunk)
+        return self.end is not None
+
+    def json_text(self):
+        if self.end is None:
+            return None
+        return ''.join(self.text)[self.start:self.end]
+
+def _first_json_object(text, opener='{'):
+    scanner = _JsonObjectScanner(opener)
+    scanner.feed(text)
+    return scanner.json_text()
+
+_generation_stats_lock = threading.Lock()
+_generation_stats = {
+    "requests": 0,
+    "streamed": 0,
+    "stopped_early": 0,
+    "tokens": 0,
+    "emails": 0,
+    "batch_splits": 0,
+    "total_ttft": 0.0,
+    "total_seconds": 0.0
+}
+
+def _record_generation(streamed, stopped_early, tokens, ttft, seconds, emails=1):
+    with _generation_stats_lock:
+        _generation_stats["requests"] += 1
+        _generation_stats["tokens"] += tokens
+        _generation_stats["emails"] += emails
+        _generation_stats["total_seconds"] += seconds
+        if streamed:
+            _generation_stats["streamed"] += 1
+            _generation_stats["total_ttft"] += ttft or 0.0
+        if stopped_early:
+            _generation_stats["stopped_early"] += 1
+    if logger.isEnabledFor(logging.DEBUG):
+        ttft_text = f"{ttft:.2f}s" if ttft is not None else "n/a"
+        logger.debug("⏱️ LLM generation: %d tokens, first token after %s, total %.2fs%s",
+                     tokens, ttft_text, seconds, " (stopped at closed JSON)" if stopped_early else "")
+
+def _record_split():
+    with _generation_stats_lock:
+        _generation_stats["batch_splits"] += 1
+
+def generation_stats():
+    """Aggregate time-to-first-token and token counts across all generations"""
+    with _generation_stats_lock:
+        stats = dict(_generation_stats)
+    requests_made, streamed = stats["requests"], stats["streamed"]
+    return {
+        "requests": requests_made,
+        "streamed": streamed,
+        "stopped_early": stats["stopped_early"],
+        "tokens": stats["tokens"],
+        "emails": stats["emails"],
+        "batch_splits": stats["batch_splits"],
+        "avg_tokens": stats["tokens"] / requests_made if requests_made else None,
+        "avg_tokens_per_email": stats["tokens"] / stats["emails"] if stats["emails"] else None,
+        "avg_ttft_seconds": stats["total_ttft"] / streamed if streamed else None,
+        "avg_seconds": stats["total_seconds"] / requests_made if requests_made else None
+    }
+
+def _payload(prompt, opener, stream):
+    payload = {"model": OLLAMA_MODEL, "prompt": prompt, "stream": stream}
+    if OLLAMA_STRUCTURED_OUTPUT:
+        payload["format"] = BATCH_EXTRACTION_SCHEMA if opener == '[' else EXTRACTION_SCHEMA
+    return payload
+
+def _generate(prompt, opener='{', emails=1):
+    """Run one Ollama generation and return the raw text output.
+
+    ``opener`` is the bracket the expected JSON answer starts with and
+    ``emails`` how many emails the prompt covers (for the per-email stats).
+    """
+    if OLLAMA_STREAM:
+        return _generate_streaming(prompt, opener, emails)
+
+    started = time.perf_counter()
+    with ollama_client.generate(_payload(prompt, opener, False)) as response:
+        result = response.json()
+        logger.debug("🔍 Result: %s", result)
+
+        if "error" in result:
+            raise ValueError(result["error"])
+
+    _record_generation(False, False, result.get("eval_count", 0), None, time.perf_counter() - started, emails)
+    return result["response"]
+
+def _generate_streaming(prompt, opener='{', emails=1):
+    """Stream tokens from Ollama and hang up as soon as the first JSON object (or array) is complete.
+
+    Closing the connection makes Ollama abort the generation, so the
+    explanations small models like to add after the JSON are never produced.
+    """
+    started = time.perf_counter()
+    ttft = None
+    tokens = 0
+    scanner = _JsonObjectScanner(opener)
+    stopped_early = False
+
+    # Hanging up early costs the pooled connection, but that's cheaper than the extra tokens
+    with ollama_client.generate(_payload(prompt, opener, True), stream=True) as response:
+        for line in response.iter_lines():
+            if not line:
+                continue
+            chunk = json.loads(line)
+            if "error" in chunk:
+                raise ValueError(chunk["error"])
+
+            token = chunk.get("response", "")
+            if token:
+                if ttft is None:
+                    ttft = time.perf_counter() - started
+                tokens += 1
+                if scanner.feed(token):
+                    stopped_early = not chunk.get("done", False)
+                    break
+            if chunk.get("done"):
+                break
+
+    _record_generation(True, stopped_early, tokens, ttft, time.perf_counter() - started, emails)
+    return ''.join(scanner.text)
+
+# asyncio path: the same prompts, batching and parsing, without a thread per request
+
+_async_slots = None
+
+def _get_async_slots():
+    # Created on first use, inside the running event loop
+    global _async_slots
+    if _async_slots is None:
+        _async_slots = asyncio.Semaphore(LLM_CONCURRENCY)
+    return _async_slots
+
+async def _agenerate(prompt, opener='{', emails=1):
+    """Async version of ``_generate``"""
+    started = time.perf_counter()
+    client = get_async_client()
+    if not OLLAMA_STREAM:
+        async with client.generate(_payload(prompt, opener, False)) as response:
+            result = response.json()
+        if "error" in result:
+            raise ValueError(result["error"])
+        _record_generation(False, False, result.get("eval_count", 0), None, time.perf_counter() - started, emails)
+        return result["response"]
+
+    ttft = None
+    tokens = 0
+    scanner = _JsonObjectScanner(opener)
+    stopped_early = False
+    async with client.generate(_payload(prompt, opener, True), stream=True) as response:
+        async for line in response.aiter_lines():
+            if not line:
+                continue
+            chunk = json.loads(line)
+            if "error" in chunk:
+                raise ValueError(chunk["error"])
+
+            token = chunk.get("response", "")
+            if token:
+                if ttft is None:
+                    ttft = time.perf_counter() - started
+                tokens += 1
+                if scanner.feed(token):
+                    stopped_early = not chunk.get("done", False)
+                    break
+            if chunk.get("done"):
+                break
+
+    _record_generation(True, stopped_early, tokens, ttft, time.perf_counter() - started, emails)
+    return ''.join(scanner.text)
+
+async def extract_schedule_batch_async(email_texts, timeout=None):
+    """Async version of ``extract_schedule_batch``; ``timeout`` bounds each generation"""
+    if len(email_texts) == 1:
+        prompt, opener = _single_prompt(email_texts[0]), '{'
     else:
-        raise ValueError("No valid JSON found in LLM output")
+        prompt, opener = _batch_prompt(email_texts), '['
+
+    try:
+        async with _get_async_slots():
+            async with asyncio.timeout(timeout):
+                with timed('llm_request'):
+                    raw_output = await _agenerate(prompt, opener=opener, emails=len(email_texts))
+        logger.debug("🔍 Raw LLM output: %s", raw_output)
+        with timed('json_extraction'):
+            if len(email_texts) == 1:
+                return [_parse_extraction(raw_output)]
+            parsed = _parse_batch(raw_output, len(email_texts))
+    except TimeoutError as e:
+        # Smaller prompts wouldn't beat the timeout by enough to be worth retrying
+        return [e] * len(email_texts)
+    except Exception as e:
+        if len(email_texts) == 1:
+            return [e]
+        logger.debug("⚠️ Batch of %d failed (%s), splitting", len(email_texts), e)
+        parsed = {}
+
+    missing = [i for i in range(len(email_texts)) if i not in parsed]
+    if missing:
+        _record_split()
+        if len(missing) == len(email_texts):
+            half = len(missing) // 2
+            groups = [missing[:half], missing[half:]]
+        else:
+            groups = [missing]
+        async with asyncio.TaskGroup() as group_tasks:
+            tasks = [(group, group_tasks.create_task(
+                extract_schedule_batch_async([email_texts[i] for i in group], timeout))) for group in groups]
+        for group, task in tasks:
+            for i, structured in zip(group, task.result()):
+                parsed[i] = structured
+    return [parsed[i] for i in range(len(email_texts))]
+
+async def extract_schedules_async(email_texts, timeout=None):
+    """Async version of ``extract_schedules``: every batch runs concurrently, up to LLM_CONCURRENCY generations at once.
+
+    Results come back in input order, with the exception in the slot of a
+    failed extraction. Cancelling the caller cancels every batch.
+    """
+    results = [None] * len(email_texts)
+    keys = [make_key(OLLAMA_MODEL, PROMPT_VERSION, text) for text in email_texts]
+    misses = []
+    for i, key in enumerate(keys):
+        cached = extraction_cache.get(key)
+        if cached is None:
+            misses.append(i)
+        else:
+            results[i] = cached
+
+    batches = [[misses[j] for j in batch] for batch in plan_batches([email_texts[i] for i in misses])]
+    async with asyncio.TaskGroup() as group:
+        tasks = [(indexes, group.create_task(extract_schedule_batch_async([email_texts[i] for i in indexes], timeout)))
+                 for indexes in batches]
+    for indexes, task in tasks:
+        for i, extraction in zip(indexes, task.result()):
+            results[i] = extraction
+            _cache_result(keys[i], extraction)
+    return results
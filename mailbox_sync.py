@@ -0,0 +1,190 @@
+import os
+import json
+import logging
+import time
+import tempfile
+import threading
+from contextlib import contextmanager
+from metrics import timed
+from rate_limiter import GMAIL_QUOTA_UNITS, execute
+from data_dir import data_path
+
+# Where the last seen historyId for each mailbox/consumer pair is kept
+SYNC_STATE_FILE = os.getenv('SYNC_STATE_FILE', data_path('sync_state.json'))
+# Polls a message that failed to fetch or process is retried in before it is given up on
+SYNC_MAX_ATTEMPTS = int(os.getenv('SYNC_MAX_ATTEMPTS', '5'))
+
+logger = logging.getLogger(__name__)
+
+_state_lock = threading.Lock()
+
+# fcntl is POSIX-only; elsewhere the state file is only guarded within one process
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+def _load_state(path):
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning("⚠️ Couldn't read sync state from %s: %s", path, e)
+        return {}
+
+
+@contextmanager
+def _locked(path):
+    """Hold the state file's lock across threads and, where supported, processes"""
+    with _state_lock:
+        if fcntl is None:
+            yield
+            return
+        with open(f"{path}.lock", 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _save_state(path, key, entry):
+    # The API server, the agent and job workers may all commit to one file:
+    # re-read it under the lock so no one's entry is lost, and write through a
+    # temp file of our own so a reader never sees half of it
+    with _locked(path):
+        state = _load_state(path)
+        state[key] = entry
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', prefix=f"{os.path.basename(path)}.", suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(state, f, indent=2)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+
+class MailboxSync:
+    """Incremental UNREAD sync for one mailbox based on Gmail's historyId.
+
+    The first poll (or a poll after the stored history has expired) does a
+    full resync: it lists the current UNREAD messages and remembers the
+    mailbox historyId. Later polls only ask ``users.history.list`` for what
+    changed since then, so their cost follows the amount of new mail.
+
+    Each ``consumer`` keeps its own position, so the polling agent and the
+    API routes don't steal each other's deltas. A poll's position is only
+    saved by ``commit``, once its messages have been handled; messages that
+    failed are kept and returned again by the next polls.
+    """
+
+    def __init__(self, mailbox='default', consumer='agent', state_file=SYNC_STATE_FILE):
+        self.mailbox = mailbox
+        self.consumer = consumer
+        self.state_file = state_file
+        self.key = f"{mailbox}:{consumer}"
+        self._lock = threading.Lock()
+        entry = _load_state(state_file).get(self.key, {})
+        self.history_id = entry.get('history_id')
+        # Message id -> polls it has failed in so far
+        self.retry = dict(entry.get('retry', {}))
+
+    def commit(self, history_id, failed_ids=()):
+        """Save the position returned by ``get_new_message_ids`` once its messages are handled.
+
+        ``failed_ids`` are returned again by the next poll, up to
+        SYNC_MAX_ATTEMPTS times each.
+        """
+        with self._lock:
+            retry = {}
+            for msg_id in dict.fromkeys(failed_ids):
+                attempts = self.retry.get(msg_id, 0) + 1
+                if attempts >= SYNC_MAX_ATTEMPTS:
+                    logger.warning("⚠️ Giving up on message %s for %s after %d attempts", msg_id, self.key, attempts)
+                else:
+                    retry[msg_id] = attempts
+            self.history_id = str(history_id)
+            self.retry = retry
+            _save_state(self.state_file, self.key, {
+                'history_id': self.history_id,
+                'retry': self.retry,
+                'updated_at': time.time()
+            })
+
+    def reset(self):
+        """Forget the stored historyId so the next poll does a full resync"""
+        with self._lock:
+            self.history_id = None
+
+    def full_resync(self, service, max_results=100):
+        """List current UNREAD messages; returns their ids and the historyId to commit"""
+        # Read the historyId before listing so nothing that arrives in between is lost
+        with timed('gmail_list'):
+            profile = execute(service.users().getProfile(userId='me'),
+                              'gmail', self.mailbox, cost=GMAIL_QUOTA_UNITS['getProfile'])
+            results = execute(service.users().messages().list(
+                userId='me', labelIds=['UNREAD'], maxResults=max_results
+            ), 'gmail', self.mailbox, cost=GMAIL_QUOTA_UNITS['messages.list'])
+        message_ids = [msg['id'] for msg in results.get('messages', [])]
+        logger.info("🔄 Full resync for %s: %d unread message(s)", self.key, len(message_ids))
+        return message_ids, str(profile['historyId'])
+
+    def _history_deltas(self, service):
+        message_ids = []
+        seen = set()
+        latest_history_id = self.history_id
+        page_token = None
+
+        while True:
+            with timed('gmail_history'):
+                response = execute(service.users().history().list(
+                    userId='me',
+                    startHistoryId=self.history_id,
+                    labelId='UNREAD',
+                    historyTypes=['messageAdded', 'labelAdded'],
+                    pageToken=page_token
+                ), 'gmail', self.mailbox, cost=GMAIL_QUOTA_UNITS['history.list'])
+
+            for record in response.get('history', []):
+                changes = record.get('messagesAdded', []) + record.get('labelsAdded', [])
+                for change in changes:
+                    message = change.get('message', {})
+                    msg_id = message.get('id')
+                    if msg_id and msg_id not in seen and 'UNREAD' in message.get('labelIds', []):
+                        seen.add(msg_id)
+                        message_ids.append(msg_id)
+
+            latest_history_id = response.get('historyId', latest_history_id)
+            page_token = response.get('nextPageToken')
+            if not page_token:
+                break
+
+        return message_ids, latest_history_id
+
+    def get_new_message_ids(self, service, max_results=100):
+        """Return ids of UNREAD messages that are new since the last commit, and the historyId to commit.
+
+        Messages that failed in earlier polls come first. ``max_results``
+        only bounds a full resync; deltas are always returned in full since
+        committing the historyId moves past them.
+        """
+        from googleapiclient.errors import HttpError
+
+        with self._lock:
+            retry_ids = list(self.retry)
+            if not self.history_id:
+                message_ids, history_id = self.full_resync(service, max_results)
+            else:
+                try:
+                    message_ids, history_id = self._history_deltas(service)
+                except HttpError as e:
+                    # Gmail returns 404 once the startHistoryId is too old to replay
+                    if e.resp.status != 404:
+                        raise
+                    logger.warning("⚠️ History for %s expired, doing a full resync", self.key)
+                    message_ids, history_id = self.full_resync(service, max_results)
+        return list(dict.fromkeys(retry_ids + message_ids)), history_id
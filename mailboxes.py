@@ -0,0 +1,117 @@
+import os
+import sys
+import logging
+import threading
+from collections import OrderedDict
+from google_clients import (
+    DEFAULT_MAILBOX, MAILBOXES_DIR, TOKEN_FILE, get_credentials, get_gmail_service, token_file
+)
+from mailbox_sync import MailboxSync
+
+logger = logging.getLogger(__name__)
+
+
+class Mailbox:
+    """One authorized Gmail account: its credentials plus its own sync positions"""
+
+    def __init__(self, mailbox_id):
+        self.id = mailbox_id
+        self.fetch_sync = MailboxSync(mailbox=mailbox_id, consumer='api-fetch')
+        self.check_sync = MailboxSync(mailbox=mailbox_id, consumer='api-check')
+        self.agent_sync = MailboxSync(mailbox=mailbox_id, consumer='agent')
+        self.ready = False
+        self.error = None
+
+    def initialize(self):
+        """Load credentials and build this thread's Gmail client; returns True on success"""
+        try:
+            get_credentials(self.id)
+            get_gmail_service(self.id)
+            self.ready, self.error = True, None
+        except Exception as e:
+            logger.error("❌ Failed to initialize mailbox %s: %s", self.id, e)
+            self.ready, self.error = False, str(e)
+        return self.ready
+
+    def to_dict(self):
+        return {"mailbox": self.id, "ready": self.ready, "error": self.error}
+
+
+class MailboxRegistry:
+    """The mailboxes this process serves.
+
+    ``default`` is backed by TOKEN_FILE; every directory under MAILBOXES_DIR
+    holding a token.json is another mailbox. A mailbox added while the
+    server runs is picked up the first time it is asked for.
+    """
+
+    def __init__(self, directory=MAILBOXES_DIR):
+        self.directory = directory
+        self._mailboxes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _discover_ids(self):
+        ids = []
+        if os.path.isdir(self.directory):
+            for name in sorted(os.listdir(self.directory)):
+                try:
+                    if os.path.exists(token_file(name)):
+                        ids.append(name)
+                except ValueError:
+                    continue
+        # With no token anywhere, the default mailbox goes through the consent flow as before
+        if os.path.exists(TOKEN_FILE) or not ids:
+            ids.insert(0, DEFAULT_MAILBOX)
+        return ids
+
+    def discover(self):
+        """Register mailboxes found on disk; returns the ones that are new"""
+        added = []
+        with self._lock:
+            for mailbox_id in self._discover_ids():
+                if mailbox_id not in self._mailboxes:
+                    self._mailboxes[mailbox_id] = Mailbox(mailbox_id)
+                    added.append(self._mailboxes[mailbox_id])
+        return added
+
+    def add(self, mailbox):
+        """Register an already set up Mailbox"""
+        with self._lock:
+            self._mailboxes[mailbox.id] = mailbox
+
+    def initialize(self):
+        """Discover mailboxes and (re)try any that aren't ready yet; returns how many are ready"""
+        self.discover()
+        for mailbox in self.all():
+            if not mailbox.ready:
+                mailbox.initialize()
+        return sum(1 for mailbox in self.all() if mailbox.ready)
+
+    def get(self, mailbox_id=DEFAULT_MAILBOX):
+        """The Mailbox for an id, or None if it isn't authorized. Raises ValueError for a malformed id."""
+        token_file(mailbox_id)
+        with self._lock:
+            mailbox = self._mailboxes.get(mailbox_id)
+        if mailbox is None and os.path.exists(token_file(mailbox_id)):
+            for added in self.discover():
+                added.initialize()
+            with self._lock:
+                mailbox = self._mailboxes.get(mailbox_id)
+        return mailbox
+
+    def all(self):
+        with self._lock:
+            return list(self._mailboxes.values())
+
+
+# Shared registry used by the API and the polling agent
+mailbox_registry = MailboxRegistry()
+
+
+if __name__ == '__main__':
+    # python mailboxes.py add <mailbox>: run the consent flow and store the token
+    if len(sys.argv) != 3 or sys.argv[1] != 'add':
+        print("Usage: python mailboxes.py add <mailbox>")
+        sys.exit(2)
+    get_credentials(sys.argv[2])
+    print(f"✅ Mailbox {sys.argv[2]} authorized; token saved to {token_file(sys.argv[2])}")
@@ -1,23 +1,179 @@
-import chromadb
-from chromadb.utils import embedding_functions
+import os
+import re
+import hashlib
+import threading
+from array import array
 from uuid import uuid4
+from data_dir import data_path
 
+# simhash:   64-bit SimHash fingerprints in a flat array with banded lookup (default, no model to load)
+# embedding: Chroma + SentenceTransformer all-MiniLM-L6-v2, the original semantic backend
+MEMORY_BACKEND = os.getenv('MEMORY_BACKEND', 'simhash').lower()
+# Where the simhash backend persists its fingerprints; empty keeps them in memory only
+MEMORY_FILE = os.getenv('MEMORY_FILE', data_path('email_memory.simhash'))
+# Max differing bits for two fingerprints to count as near-duplicates
+SIMHASH_MAX_DISTANCE = int(os.getenv('SIMHASH_MAX_DISTANCE', '3'))
 
-chroma_client = chromadb.Client()
-collection = chroma_client.get_or_create_collection(
-name="email_memory",
-embedding_function=embedding_functions.SentenceTransformerEmbeddingFunction(model_name="all-MiniLM-L6-v2")
-)
+_word = re.compile(r'\w+')
+
+
+def _feature_hash(feature):
+    return int.from_bytes(hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def simhash(text, shingle_size=3):
+    """64-bit SimHash of the word shingles in ``text``"""
+    words = _word.findall((text or '').lower())
+    if len(words) < shingle_size:
+        features = [' '.join(words)] if words else ['']
+    else:
+        features = [' '.join(words[i:i + shingle_size]) for i in range(len(words) - shingle_size + 1)]
+
+    counts = [0] * 64
+    for feature in features:
+        h = _feature_hash(feature)
+        for bit in range(64):
+            counts[bit] += 1 if (h >> bit) & 1 else -1
+
+    fingerprint = 0
+    for bit in range(64):
+        if counts[bit] > 0:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+class SimHashIndex:
+    """Near-duplicate index over 64-bit SimHash fingerprints.
+
+    Fingerprints live in one ``array('Q')`` and are appended to a flat
+    binary file, 8 bytes each. Lookups split a fingerprint into
+    ``max_distance + 1`` bands: two fingerprints within ``max_distance``
+    bits must agree exactly on at least one band, so only fingerprints
+    sharing a band are compared.
+    """
+
+    def __init__(self, path=MEMORY_FILE, max_distance=SIMHASH_MAX_DISTANCE):
+        self.path = path
+        self.max_distance = max_distance
+        self.bands = max_distance + 1
+        self.band_bits = 64 // self.bands
+        self._fingerprints = array('Q')
+        self._buckets = [{} for _ in range(self.bands)]
+        self._lock = threading.Lock()
+        self._loaded = False
+
+    def _band_keys(self, fingerprint):
+        mask = (1 << self.band_bits) - 1
+        return [(fingerprint >> (band * self.band_bits)) & mask for band in range(self.bands)]
+
+    def _index(self, position, fingerprint):
+        for band, key in enumerate(self._band_keys(fingerprint)):
+            self._buckets[band].setdefault(key, []).append(position)
+
+    def _load(self):
+        # Loaded on first use so importing the module costs nothing
+        if self._loaded:
+            return
+        self._loaded = True
+        if self.path and os.path.exists(self.path):
+            with open(self.path, 'rb') as f:
+                data = f.read()
+            self._fingerprints.frombytes(data[:len(data) - len(data) % 8])
+            for position, fingerprint in enumerate(self._fingerprints):
+                self._index(position, fingerprint)
+
+    def _find(self, fingerprint):
+        for band, key in enumerate(self._band_keys(fingerprint)):
+            for position in self._buckets[band].get(key, ()):
+                if bin(self._fingerprints[position] ^ fingerprint).count('1') <= self.max_distance:
+                    return True
+        return False
+
+    def add_many(self, texts):
+        fingerprints = [simhash(text) for text in texts]
+        with self._lock:
+            self._load()
+            start = len(self._fingerprints)
+            new = array('Q', fingerprints)
+            self._fingerprints.extend(new)
+            for offset, fingerprint in enumerate(fingerprints):
+                self._index(start + offset, fingerprint)
+            if self.path:
+                with open(self.path, 'ab') as f:
+                    new.tofile(f)
+        return [f"{fingerprint:016x}" for fingerprint in fingerprints]
+
+    def contains_many(self, texts):
+        fingerprints = [simhash(text) for text in texts]
+        with self._lock:
+            self._load()
+            return [self._find(fingerprint) for fingerprint in fingerprints]
+
+    def __len__(self):
+        with self._lock:
+            self._load()
+            return len(self._fingerprints)
+
+
+class EmbeddingIndex:
+    """Semantic duplicate check with Chroma and a SentenceTransformer model"""
+
+    def __init__(self, model_name="all-MiniLM-L6-v2", max_distance=0.1):
+        # chromadb and the model are heavy, so they're only imported when this backend is used
+        import chromadb
+        from chromadb.utils import embedding_functions
+
+        self.max_distance = max_distance
+        self._client = chromadb.Client()
+        self._collection = self._client.get_or_create_collection(
+            name="email_memory",
+            embedding_function=embedding_functions.SentenceTransformerEmbeddingFunction(model_name=model_name)
+        )
+
+    def add_many(self, texts):
+        ids = [str(uuid4()) for _ in texts]
+        self._collection.add(documents=list(texts), ids=ids)
+        return ids
+
+    def contains_many(self, texts):
+        if self._collection.count() == 0:
+            return [False] * len(texts)
+        results = self._collection.query(query_texts=list(texts), n_results=1)
+        return [bool(distances) and distances[0] < self.max_distance for distances in results["distances"]]
+
+    def __len__(self):
+        return self._collection.count()
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            if MEMORY_BACKEND == 'embedding':
+                _backend = EmbeddingIndex()
+            elif MEMORY_BACKEND == 'simhash':
+                _backend = SimHashIndex()
+            else:
+                raise ValueError(f"Unknown memory backend: {MEMORY_BACKEND}")
+        return _backend
 
 
 def add_to_memory(email_text):
-uid = str(uuid4())
-collection.add(documents=[email_text], ids=[uid])
-return uid
+    return get_backend().add_many([email_text])[0]
+
+
+def add_many_to_memory(email_texts):
+    return get_backend().add_many(email_texts)
 
 
 def check_duplicate(email_text):
-results = collection.query(query_texts=[email_text], n_results=1)
-if results["documents"] and results["distances"][0][0] < 0.1:
-return True # Similar email already exists
-return False
\ No newline at end of file
+    return get_backend().contains_many([email_text])[0]
+
+
+def check_duplicates(email_texts):
+    """Batch version of check_duplicate; one bool per text, in order"""
+    return get_backend().contains_many(email_texts)
@@ -0,0 +1,170 @@
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+
+# Upper bounds (seconds) of the latency histogram buckets; spans a cached
+# lookup up to a slow CPU-only LLM generation
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+NAMESPACE = 'email_scheduler'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels) + '}'
+
+
+class Counter:
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts..., +Inf count, sum]
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * (len(self.buckets) + 2)
+            state[index] += 1
+            state[-1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = [(key, list(state)) for key, state in sorted(self._values.items())]
+        for key, state in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(key + (('le', repr(bound)),))} {cumulative}")
+            cumulative += state[len(self.buckets)]
+            lines.append(f"{self.name}_bucket{_format_labels(key + (('le', '+Inf'),))} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {state[-1]}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    """Holds all metrics and renders them in the Prometheus text format"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._gauge_callbacks = []
+        self._lock = threading.Lock()
+
+    def counter(self, name, help_text):
+        return self._get_or_create(Counter, f"{NAMESPACE}_{name}", help_text)
+
+    def histogram(self, name, help_text, buckets=LATENCY_BUCKETS):
+        return self._get_or_create(lambda n, h: Histogram(n, h, buckets), f"{NAMESPACE}_{name}", help_text)
+
+    def _get_or_create(self, factory, name, help_text):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = factory(name, help_text)
+            return metric
+
+    def register_gauges(self, prefix, callback, help_text=''):
+        """Expose a stats() style dict as gauges; numeric values only, read at scrape time"""
+        with self._lock:
+            self._gauge_callbacks.append((f"{NAMESPACE}_{prefix}", callback, help_text))
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+            callbacks = list(self._gauge_callbacks)
+
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        for prefix, callback, help_text in callbacks:
+            try:
+                stats = callback()
+            except Exception:
+                continue
+            for key, value in stats.items():
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                name = f"{prefix}_{key}"
+                if help_text:
+                    lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} gauge")
+                lines.append(f"{name} {value}")
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+stage_seconds = registry.histogram('stage_seconds', 'Latency of each pipeline stage in seconds')
+stage_errors = registry.counter('stage_errors_total', 'Pipeline stage calls that raised')
+
+# Callbacks invoked as listener(stage, seconds, failed) after every timed block.
+# Replaced rather than mutated so timed() can iterate without a lock.
+_listeners = ()
+_listeners_lock = threading.Lock()
+
+
+def add_listener(listener):
+    global _listeners
+    with _listeners_lock:
+        _listeners = _listeners + (listener,)
+
+
+def remove_listener(listener):
+    global _listeners
+    with _listeners_lock:
+        _listeners = tuple(existing for existing in _listeners if existing != listener)
+
+
+@contextmanager
+def timed(stage):
+    """Record the duration of a block under ``stage``, counting it as an error if it raises"""
+    started = time.perf_counter()
+    failed = False
+    try:
+        yield
+    except BaseException:
+        failed = True
+        stage_errors.inc(stage=stage)
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        stage_seconds.observe(elapsed, stage=stage)
+        for listener in _listeners:
+            listener(stage, elapsed, failed)
+
+
+def render():
+    return registry.render()
@@ -0,0 +1,296 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+from contextlib import asynccontextmanager, contextmanager
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# Comma-separated Ollama servers; requests go to the least loaded healthy one
+OLLAMA_URLS = [url.strip().rstrip('/') for url in
+               os.getenv('OLLAMA_URLS', os.getenv('OLLAMA_URL', 'http://localhost:11434')).split(',') if url.strip()]
+# How long Ollama keeps the model loaded after a request (Ollama duration, or -1 for forever)
+OLLAMA_KEEP_ALIVE = os.getenv('OLLAMA_KEEP_ALIVE', '30m')
+# Seconds to wait for a connection or the next bytes of a response
+OLLAMA_TIMEOUT = float(os.getenv('OLLAMA_TIMEOUT', '60'))
+# Load the model on every server at startup
+OLLAMA_WARMUP = os.getenv('OLLAMA_WARMUP', 'true').lower() == 'true'
+# Seconds a warm-up may take; loading a model from disk is slow on CPU boxes
+OLLAMA_WARMUP_TIMEOUT = float(os.getenv('OLLAMA_WARMUP_TIMEOUT', '300'))
+# Kept-alive connections per server
+OLLAMA_POOL_SIZE = int(os.getenv('OLLAMA_POOL_SIZE', '8'))
+# Consecutive failures that take a server out of rotation, and for how many seconds
+OLLAMA_BREAKER_FAILURES = int(os.getenv('OLLAMA_BREAKER_FAILURES', '3'))
+OLLAMA_BREAKER_COOLDOWN = float(os.getenv('OLLAMA_BREAKER_COOLDOWN', '30'))
+
+# Weight of the latest request in each server's latency average
+_LATENCY_ALPHA = 0.2
+
+
+class OllamaUnavailable(requests.ConnectionError):
+    """No Ollama server is accepting requests right now"""
+
+
+class Endpoint:
+    """One Ollama server: requests in flight, latency average and circuit breaker.
+
+    After OLLAMA_BREAKER_FAILURES failures in a row the breaker opens and
+    the server gets no requests for the cooldown; then a single trial
+    request is let through, and its outcome closes or reopens the breaker.
+    """
+
+    def __init__(self, url):
+        self.url = url
+        self.in_flight = 0
+        self.latency = None
+        self.failures = 0
+        self.open_until = 0.0
+        self.trial = False
+        self.requests = 0
+        self.errors = 0
+
+    @property
+    def state(self):
+        if self.failures < OLLAMA_BREAKER_FAILURES:
+            return 'closed'
+        return 'open' if time.monotonic() < self.open_until or self.trial else 'half-open'
+
+    def available(self):
+        return self.state != 'open'
+
+    def load(self):
+        # Requests in flight weighted by how slow the server has been; unknown latency counts as fast
+        return (self.in_flight + 1) * (self.latency or 0.0), self.in_flight
+
+    def to_dict(self):
+        return {
+            "url": self.url,
+            "state": self.state,
+            "in_flight": self.in_flight,
+            "latency_seconds": round(self.latency, 3) if self.latency is not None else None,
+            "requests": self.requests,
+            "errors": self.errors
+        }
+
+
+class OllamaClient:
+    """Pooled, keep-alive HTTP client for one or more Ollama servers.
+
+    One ``requests.Session`` holds up to OLLAMA_POOL_SIZE persistent
+    connections per server. Every request carries ``keep_alive`` so the
+    model stays loaded between polls. A request that can't connect is
+    retried once on each other healthy server.
+    """
+
+    def __init__(self, urls=None, keep_alive=OLLAMA_KEEP_ALIVE, timeout=OLLAMA_TIMEOUT, pool_size=OLLAMA_POOL_SIZE):
+        self.endpoints = [Endpoint(url) for url in (urls or OLLAMA_URLS)]
+        self.keep_alive = keep_alive
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=len(self.endpoints), pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._lock = threading.Lock()
+
+    def _acquire(self, exclude=()):
+        with self._lock:
+            candidates = [endpoint for endpoint in self.endpoints if endpoint not in exclude and endpoint.available()]
+            if not candidates:
+                return None
+            endpoint = min(candidates, key=Endpoint.load)
+            if endpoint.state == 'half-open':
+                endpoint.trial = True
+            endpoint.in_flight += 1
+            endpoint.requests += 1
+            return endpoint
+
+    def _release(self, endpoint, seconds=None, failed=False):
+        # failed=None: the caller gave up (cancelled), which says nothing about the server
+        with self._lock:
+            endpoint.in_flight -= 1
+            endpoint.trial = False
+            if failed is None:
+                return
+            if failed:
+                endpoint.errors += 1
+                endpoint.failures += 1
+                if endpoint.failures >= OLLAMA_BREAKER_FAILURES:
+                    endpoint.open_until = time.monotonic() + OLLAMA_BREAKER_COOLDOWN
+                    logger.warning("⚠️ Ollama at %s failed %d times in a row, pausing it for %.0fs",
+                                   endpoint.url, endpoint.failures, OLLAMA_BREAKER_COOLDOWN)
+                return
+            if endpoint.failures >= OLLAMA_BREAKER_FAILURES:
+                logger.info("✅ Ollama at %s is back", endpoint.url)
+            endpoint.failures = 0
+            if seconds is not None:
+                endpoint.latency = seconds if endpoint.latency is None else (
+                    endpoint.latency + _LATENCY_ALPHA * (seconds - endpoint.latency))
+
+    @contextmanager
+    def post(self, path, payload, stream=False, timeout=None):
+        """POST to the least loaded healthy server and yield the response.
+
+        Connection failures, 5xx responses and errors raised inside the block
+        count against the server's breaker; leaving the block normally
+        records its latency.
+        """
+        tried = []
+        while True:
+            endpoint = self._acquire(exclude=tried)
+            if endpoint is None:
+                raise OllamaUnavailable(f"No Ollama server available (tried {', '.join(e.url for e in tried) or 'none'})")
+            tried.append(endpoint)
+            started = time.perf_counter()
+            try:
+                response = self.session.post(f"{endpoint.url}{path}", json=payload, stream=stream,
+                                             timeout=timeout or self.timeout)
+            except requests.ConnectionError as e:
+                self._release(endpoint, failed=True)
+                logger.warning("⚠️ Couldn't reach Ollama at %s: %s", endpoint.url, e)
+                continue
+            except BaseException:
+                self._release(endpoint, failed=True)
+                raise
+            break
+
+        failed = True
+        try:
+            if response.status_code >= 500:
+                raise requests.HTTPError(f"Ollama at {endpoint.url} returned {response.status_code}: {response.text[:200]}",
+                                         response=response)
+            yield response
+            failed = False
+        finally:
+            response.close()
+            self._release(endpoint, time.perf_counter() - started, failed)
+
+    def generate(self, payload, stream=False):
+        """Context manager for an /api/generate call with the model kept loaded"""
+        return self.post('/api/generate', dict(payload, keep_alive=self.keep_alive), stream=stream)
+
+    def warm_up(self, model):
+        """Load ``model`` on every server in parallel; returns the urls that are ready"""
+        ready = []
+
+        def load(endpoint):
+            started = time.perf_counter()
+            try:
+                # A generate request without a prompt only loads the model
+                response = self.session.post(f"{endpoint.url}/api/generate",
+                                             json={"model": model, "keep_alive": self.keep_alive},
+                                             timeout=OLLAMA_WARMUP_TIMEOUT)
+                response.raise_for_status()
+            except Exception as e:
+                logger.warning("⚠️ Couldn't preload %s on %s: %s", model, endpoint.url, e)
+                return
+            ready.append(endpoint.url)
+            logger.info("🔥 %s loaded on %s in %.1fs", model, endpoint.url, time.perf_counter() - started)
+
+        threads = [threading.Thread(target=load, args=(endpoint,), name='ollama-warmup') for endpoint in self.endpoints]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return ready
+
+    def endpoint_stats(self):
+        with self._lock:
+            return [endpoint.to_dict() for endpoint in self.endpoints]
+
+    def stats(self):
+        endpoints = self.endpoint_stats()
+        return {
+            "endpoints": len(endpoints),
+            "healthy": sum(1 for endpoint in endpoints if endpoint["state"] != 'open'),
+            "in_flight": sum(endpoint["in_flight"] for endpoint in endpoints)
+        }
+
+
+class AsyncOllamaClient:
+    """asyncio twin of OllamaClient built on ``httpx.AsyncClient``.
+
+    It shares the servers, their breakers and their load figures with a
+    sync client, so both paths balance against the same numbers.
+    """
+
+    def __init__(self, client):
+        # httpx is only needed by the async pipeline
+        import httpx
+
+        self.client = client
+        self.http = httpx.AsyncClient(
+            timeout=httpx.Timeout(client.timeout),
+            limits=httpx.Limits(max_connections=OLLAMA_POOL_SIZE * len(client.endpoints),
+                                max_keepalive_connections=OLLAMA_POOL_SIZE * len(client.endpoints))
+        )
+
+    @asynccontextmanager
+    async def post(self, path, payload, stream=False):
+        """Async version of ``OllamaClient.post``; yields an httpx response"""
+        import httpx
+
+        tried = []
+        while True:
+            endpoint = self.client._acquire(exclude=tried)
+            if endpoint is None:
+                raise OllamaUnavailable(f"No Ollama server available (tried {', '.join(e.url for e in tried) or 'none'})")
+            tried.append(endpoint)
+            started = time.perf_counter()
+            try:
+                request = self.http.build_request('POST', f"{endpoint.url}{path}", json=payload)
+                response = await self.http.send(request, stream=stream)
+            except httpx.ConnectError as e:
+                self.client._release(endpoint, failed=True)
+                logger.warning("⚠️ Couldn't reach Ollama at %s: %s", endpoint.url, e)
+                continue
+            except asyncio.CancelledError:
+                self.client._release(endpoint, failed=None)
+                raise
+            except BaseException:
+                self.client._release(endpoint, failed=True)
+                raise
+            break
+
+        failed = True
+        try:
+            if response.status_code >= 500:
+                await response.aread()
+                raise requests.HTTPError(f"Ollama at {endpoint.url} returned {response.status_code}: {response.text[:200]}")
+            yield response
+            failed = False
+        except asyncio.CancelledError:
+            failed = None
+            raise
+        finally:
+            await response.aclose()
+            self.client._release(endpoint, time.perf_counter() - started, failed)
+
+    def generate(self, payload, stream=False):
+        return self.post('/api/generate', dict(payload, keep_alive=self.client.keep_alive), stream=stream)
+
+    async def aclose(self):
+        await self.http.aclose()
+
+
+# Shared client used for every generation in the process
+ollama_client = OllamaClient()
+
+_async_client = None
+
+
+def get_async_client():
+    """The shared AsyncOllamaClient, created inside the running event loop on first use"""
+    global _async_client
+    if _async_client is None:
+        _async_client = AsyncOllamaClient(ollama_client)
+    return _async_client
+
+
+async def close_async_client():
+    global _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
@@ -0,0 +1,240 @@
+import os
+import json
+import time
+import random
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+logger = logging.getLogger(__name__)
+
+# Bounds on the seconds between two polls of one mailbox
+POLL_MIN_INTERVAL = float(os.getenv('POLL_MIN_INTERVAL', '15'))
+POLL_MAX_INTERVAL = float(os.getenv('POLL_MAX_INTERVAL', '600'))
+# New emails a poll should find on average; the interval is this over the arrival rate
+POLL_TARGET_EMAILS = float(os.getenv('POLL_TARGET_EMAILS', '1'))
+# Weight of the latest poll in the arrival rate average (0-1)
+POLL_RATE_ALPHA = float(os.getenv('POLL_RATE_ALPHA', '0.3'))
+# Factor the interval grows by after a poll that found nothing
+POLL_IDLE_BACKOFF = float(os.getenv('POLL_IDLE_BACKOFF', '1.5'))
+# Local port for POST /trigger; 0 turns the trigger server off
+POLL_TRIGGER_PORT = int(os.getenv('POLL_TRIGGER_PORT', '8765'))
+POLL_TRIGGER_HOST = os.getenv('POLL_TRIGGER_HOST', '127.0.0.1')
+
+
+def _clamp(value, low, high):
+    return max(low, min(high, value))
+
+
+class MailboxSchedule:
+    """Arrival rate and next poll time of one mailbox.
+
+    The arrival rate is an exponentially weighted moving average of new
+    emails per second. After activity the interval is set so a poll finds
+    about POLL_TARGET_EMAILS emails; a poll that finds nothing stretches it
+    by POLL_IDLE_BACKOFF, and consecutive errors double it each time.
+    """
+
+    def __init__(self, mailbox_id, min_interval=POLL_MIN_INTERVAL, max_interval=POLL_MAX_INTERVAL):
+        self.mailbox_id = mailbox_id
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.rate = 0.0
+        self.interval = min_interval
+        self.errors = 0
+        self.polls = 0
+        self.last_poll = None
+        self.due = time.monotonic()
+
+    def record(self, new_emails, saturated=False, now=None):
+        """Update the rate after a successful poll that found ``new_emails``.
+
+        ``saturated`` means the poll hit its page limit, so more mail is
+        already waiting and the next poll comes as soon as allowed.
+        """
+        now = time.monotonic() if now is None else now
+        elapsed = now - self.last_poll if self.last_poll is not None else self.interval
+        self.rate += POLL_RATE_ALPHA * (new_emails / max(elapsed, 1e-3) - self.rate)
+        self.errors = 0
+        self.polls += 1
+        self.last_poll = now
+
+        if saturated:
+            interval = self.min_interval
+        elif new_emails:
+            interval = POLL_TARGET_EMAILS / self.rate
+        else:
+            expected = POLL_TARGET_EMAILS / self.rate if self.rate > 0 else self.max_interval
+            interval = max(expected, self.interval * POLL_IDLE_BACKOFF)
+        self._schedule(interval, now)
+
+    def record_error(self, now=None):
+        now = time.monotonic() if now is None else now
+        self.errors += 1
+        self.polls += 1
+        self._schedule(self.interval * 2 ** self.errors, now)
+
+    def _schedule(self, interval, now):
+        # Errors stretch the delay without changing the interval the rate calls for
+        if self.errors:
+            delay = _clamp(interval, self.min_interval, self.max_interval)
+        else:
+            self.interval = delay = _clamp(interval, self.min_interval, self.max_interval)
+        # A little jitter keeps mailboxes that started together from polling in lockstep
+        self.due = now + delay * random.uniform(0.9, 1.1)
+
+    def to_dict(self):
+        return {
+            "mailbox": self.mailbox_id,
+            "rate_per_min": round(self.rate * 60, 3),
+            "interval_seconds": round(self.interval, 1),
+            "next_poll_in": round(max(0.0, self.due - time.monotonic()), 1),
+            "errors": self.errors,
+            "polls": self.polls
+        }
+
+
+class PollScheduler:
+    """Polls each mailbox when it is due, on a shared FairPool.
+
+    ``poll(mailbox)`` returns ``(new_emails, saturated)``. A mailbox is never
+    polled twice at once. ``trigger`` makes a mailbox (or every mailbox)
+    due now; ``stop`` ends ``run`` after the polls in flight finish.
+    """
+
+    def __init__(self, registry, pool, poll, rescan_interval=POLL_MIN_INTERVAL):
+        self.registry = registry
+        self.pool = pool
+        self.poll = poll
+        self.rescan_interval = rescan_interval
+        self._schedules = {}
+        self._running = {}
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._rescanned = None
+
+    def _rescan(self, now):
+        # Pick up mailboxes added since the last scan and retry the broken ones
+        if self._rescanned is not None and now - self._rescanned < self.rescan_interval:
+            return
+        self._rescanned = now
+        self.registry.initialize()
+        with self._lock:
+            for mailbox in self.registry.all():
+                if mailbox.ready and mailbox.id not in self._schedules:
+                    self._schedules[mailbox.id] = MailboxSchedule(mailbox.id)
+
+    def _poll(self, mailbox):
+        try:
+            new_emails, saturated = self.poll(mailbox)
+        except Exception as e:
+            logger.error("❌ Error during agent run for mailbox %s: %s", mailbox.id, e)
+            with self._lock:
+                self._schedules[mailbox.id].record_error()
+        else:
+            with self._lock:
+                self._schedules[mailbox.id].record(new_emails, saturated)
+        finally:
+            with self._lock:
+                self._running.pop(mailbox.id, None)
+                schedule = self._schedules[mailbox.id]
+            logger.info("⏳ Next poll of %s in %.0fs", mailbox.id, max(0.0, schedule.due - time.monotonic()))
+            self._wake.set()
+
+    def run(self):
+        """Poll due mailboxes until ``stop`` is called"""
+        while not self._stop.is_set():
+            now = time.monotonic()
+            try:
+                self._rescan(now)
+            except Exception as e:
+                logger.error("❌ Error discovering mailboxes: %s", e)
+
+            with self._lock:
+                due = [mailbox_id for mailbox_id, schedule in self._schedules.items()
+                       if schedule.due <= now and mailbox_id not in self._running]
+                for mailbox_id in due:
+                    self._running[mailbox_id] = True
+                waiting = [schedule.due for mailbox_id, schedule in self._schedules.items()
+                           if mailbox_id not in self._running]
+            for mailbox_id in due:
+                logger.info("🔁 Checking %s for unread emails...", mailbox_id)
+                self.pool.submit(mailbox_id, self._poll, self.registry.get(mailbox_id))
+
+            timeout = min(waiting, default=now + self.rescan_interval) - now
+            self._wake.wait(_clamp(timeout, 0.0, self.rescan_interval))
+            self._wake.clear()
+
+        self._drain()
+
+    def _drain(self):
+        while True:
+            with self._lock:
+                if not self._running:
+                    return
+            logger.info("⏳ Waiting for %d poll(s) to finish...", len(self._running))
+            self._wake.wait(1)
+            self._wake.clear()
+
+    def trigger(self, mailbox_id=None):
+        """Make one mailbox, or all of them, due now; returns the ids triggered"""
+        with self._lock:
+            if mailbox_id is None:
+                targets = list(self._schedules.values())
+            else:
+                targets = [self._schedules[mailbox_id]] if mailbox_id in self._schedules else []
+            for schedule in targets:
+                schedule.due = time.monotonic()
+        self._wake.set()
+        return [schedule.mailbox_id for schedule in targets]
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def stats(self):
+        with self._lock:
+            return {"mailboxes": [schedule.to_dict() for schedule in self._schedules.values()],
+                    "running": sorted(self._running)}
+
+
+class _TriggerHandler(BaseHTTPRequestHandler):
+    scheduler = None
+
+    def _reply(self, status, body):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path != '/trigger':
+            return self._reply(404, {"error": "Not found"})
+        mailbox_id = parse_qs(url.query).get('mailbox', [None])[0]
+        triggered = self.scheduler.trigger(mailbox_id)
+        if mailbox_id is not None and not triggered:
+            return self._reply(404, {"error": f"Unknown mailbox: {mailbox_id}"})
+        return self._reply(202, {"triggered": triggered})
+
+    def do_GET(self):
+        if urlparse(self.path).path != '/status':
+            return self._reply(404, {"error": "Not found"})
+        return self._reply(200, self.scheduler.stats())
+
+    def log_message(self, format, *args):
+        logger.debug("trigger: " + format, *args)
+
+
+def start_trigger_server(scheduler, host=POLL_TRIGGER_HOST, port=POLL_TRIGGER_PORT):
+    """Serve POST /trigger[?mailbox=<id>] and GET /status on a background thread"""
+    handler = type('TriggerHandler', (_TriggerHandler,), {'scheduler': scheduler})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='poll-trigger', daemon=True).start()
+    logger.info("📡 Poll trigger listening on http://%s:%d/trigger", host, server.server_address[1])
+    return server
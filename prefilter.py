@@ -0,0 +1,163 @@
+import os
+import re
+import json
+import time
+import threading
+from email_body import email_text
+from extraction import NO_EVENT
+from data_dir import data_path
+
+# enforce: skip the LLM for emails below the threshold
+# shadow:  score every email but still send it to the LLM, logging what would have been skipped
+# off:     send everything to the LLM
+PREFILTER_MODE = os.getenv('PREFILTER_MODE', 'enforce').lower()
+# Minimum score an email needs to be sent to the LLM
+PREFILTER_THRESHOLD = float(os.getenv('PREFILTER_THRESHOLD', '2.0'))
+# Where shadow mode appends its would-be skips together with the LLM's verdict
+PREFILTER_LOG = os.getenv('PREFILTER_LOG', data_path('prefilter_skips.jsonl'))
+
+# The LLM's own "no event" result, so callers can't tell a skip apart
+NO_SCHEDULING_RESULT = NO_EVENT
+
+_MONTHS = r'(?:jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)'
+_WEEKDAYS = r'(?:mon|tue|tues|wed|thu|thur|thurs|fri|sat|sun)(?:day|nesday|sday|urday)?'
+
+DATE_PATTERN = re.compile(
+    r'\b(?:'
+    r'\d{4}-\d{1,2}-\d{1,2}'                               # 2025-10-23
+    r'|\d{1,2}[/.]\d{1,2}(?:[/.]\d{2,4})?'                 # 10/23, 23.10.2025
+    r'|' + _MONTHS + r'\.?\s+\d{1,2}(?:st|nd|rd|th)?'      # October 23rd
+    r'|\d{1,2}(?:st|nd|rd|th)?\s+(?:of\s+)?' + _MONTHS +   # 23rd of October
+    r'|' + _WEEKDAYS +                                     # Monday
+    r'|today|tonight|tomorrow|next\s+week'
+    r')\b',
+    re.IGNORECASE
+)
+
+TIME_PATTERN = re.compile(
+    r'\b(?:'
+    r'\d{1,2}(?::\d{2})?\s*(?:a\.?m\.?|p\.?m\.?)'          # 3pm, 3:30 PM
+    r'|(?:[01]?\d|2[0-3]):[0-5]\d'                         # 15:00
+    r'|noon|midnight'
+    r')',
+    re.IGNORECASE
+)
+
+KEYWORD_PATTERN = re.compile(
+    r'\b(?:meet(?:ing)?s?|call|appointment|interview|schedul(?:e|ed|ing)|reschedul(?:e|ed)'
+    r'|invit(?:e|ation)|calendar|sync|catch\s+up|zoom|teams|webex|hangout|webinar'
+    r'|conference|lunch|dinner|coffee|demo|standup|stand-up|session|event)\b',
+    re.IGNORECASE
+)
+
+BULK_SENDER_PATTERN = re.compile(
+    r'(?:no-?reply|do-?not-?reply|newsletter|notifications?|marketing|mailer|digest|promo|billing|receipts?)@',
+    re.IGNORECASE
+)
+
+# Gmail's automatic categories that almost never hold a meeting request
+BULK_LABELS = {'CATEGORY_PROMOTIONS', 'CATEGORY_SOCIAL', 'CATEGORY_UPDATES', 'CATEGORY_FORUMS', 'SPAM'}
+
+WEIGHTS = {
+    'date': 1.5,
+    'time': 1.5,
+    'keyword': 1.0,
+    'bulk_sender': -1.0,
+    'bulk_label': -1.0,
+}
+
+
+def score_email(text, sender='', labels=()):
+    """Score how likely an email is to hold scheduling info. Returns (score, reasons)."""
+    reasons = []
+    text = text or ''
+    if DATE_PATTERN.search(text):
+        reasons.append('date')
+    if TIME_PATTERN.search(text):
+        reasons.append('time')
+    if KEYWORD_PATTERN.search(text):
+        reasons.append('keyword')
+    if sender and BULK_SENDER_PATTERN.search(sender):
+        reasons.append('bulk_sender')
+    if BULK_LABELS.intersection(labels or ()):
+        reasons.append('bulk_label')
+    return sum(WEIGHTS[reason] for reason in reasons), reasons
+
+
+class Prefilter:
+    """Rule-based gate in front of the LLM extractor"""
+
+    def __init__(self, mode=PREFILTER_MODE, threshold=PREFILTER_THRESHOLD, log_path=PREFILTER_LOG):
+        if mode not in ('enforce', 'shadow', 'off'):
+            raise ValueError(f"Unknown prefilter mode: {mode}")
+        self.mode = mode
+        self.threshold = threshold
+        self.log_path = log_path
+        self._lock = threading.Lock()
+        self.checked = 0
+        self.skipped = 0
+        self.shadow_skips = 0
+        self.shadow_misses = 0
+        self.llm_positives = 0
+
+    def check(self, email):
+        """Decide whether an email dict (id/from/subject/snippet/body/labels) should go to the LLM"""
+        # Score the same text the LLM would get
+        score, reasons = score_email(email_text(email), email.get('from', ''), email.get('labels', ()))
+        candidate = score >= self.threshold
+        with self._lock:
+            self.checked += 1
+            if not candidate:
+                self.skipped += 1
+        return {
+            'candidate': candidate,
+            'score': score,
+            'reasons': reasons,
+            'call_llm': candidate or self.mode != 'enforce'
+        }
+
+    def record_outcome(self, email, decision, extraction):
+        """In shadow mode, compare the filter's decision with what the LLM found.
+
+        Would-be skips are appended to the log so misses can be inspected.
+        """
+        if self.mode != 'shadow':
+            return
+
+        found = extraction.has_event
+
+        with self._lock:
+            if found:
+                self.llm_positives += 1
+            if decision['candidate']:
+                return
+            self.shadow_skips += 1
+            if found:
+                self.shadow_misses += 1
+            if self.log_path:
+                with open(self.log_path, 'a') as f:
+                    f.write(json.dumps({
+                        'time': time.time(),
+                        'email_id': email.get('id'),
+                        'subject': email.get('subject', ''),
+                        'score': decision['score'],
+                        'reasons': decision['reasons'],
+                        'llm_found_scheduling': found
+                    }) + '\n')
+
+    def stats(self):
+        with self._lock:
+            return {
+                'mode': self.mode,
+                'threshold': self.threshold,
+                'checked': self.checked,
+                'below_threshold': self.skipped,
+                'shadow_skips': self.shadow_skips,
+                'shadow_misses': self.shadow_misses,
+                # Share of the LLM's scheduling emails that the filter would have let through
+                'shadow_recall': 1 - self.shadow_misses / self.llm_positives if self.llm_positives else None
+            }
+
+
+# Shared prefilter used by email_reader
+prefilter = Prefilter()
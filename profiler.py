@@ -0,0 +1,175 @@
+import os
+import sys
+import json
+import time
+import uuid
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+import metrics
+
+# Where finished profiles are written as JSON
+PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')
+# Milliseconds between stack samples while a profile is running
+PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv('PROFILE_SAMPLE_INTERVAL_MS', '5'))
+# Functions listed in a saved profile (the folded stacks are always complete)
+PROFILE_TOP_FUNCTIONS = int(os.getenv('PROFILE_TOP_FUNCTIONS', '50'))
+# Set to false to ignore profiling flags entirely
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'true').lower() == 'true'
+
+_PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+_PROFILE_ID = set('0123456789abcdefghijklmnopqrstuvwxyz-_')
+
+
+def _is_project_file(filename):
+    return filename.startswith(_PROJECT_DIR) and 'site-packages' not in filename
+
+
+def _frame_label(code):
+    filename = code.co_filename
+    if _is_project_file(filename):
+        filename = os.path.relpath(filename, _PROJECT_DIR)
+    else:
+        # Keep the package name so e.g. flask/app.py isn't confused with our app.py
+        filename = os.path.join(*filename.split(os.sep)[-2:])
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+
+class Profile:
+    """Sampled wall-clock profile of one request or polling cycle.
+
+    A sampler thread reads ``sys._current_frames()`` every interval. The
+    thread that started the profile is always sampled; other threads (the
+    LLM extraction pool, job workers) only while they are running this
+    project's code, so idle workers don't show up. External calls are taken
+    from the ``metrics.timed`` stages and are recorded process-wide while
+    the profile runs.
+
+    Nothing is sampled or recorded outside a profile.
+    """
+
+    def __init__(self, name, interval_ms=PROFILE_SAMPLE_INTERVAL_MS):
+        self.id = uuid.uuid4().hex
+        self.name = name
+        self.interval = max(0.001, interval_ms / 1000)
+        self.thread_id = threading.get_ident()
+        self.started_at = None
+        self.duration = None
+        self.samples = 0
+        # stack -> wall seconds attributed to it
+        self._stacks = Counter()
+        self._calls = {}
+        self._calls_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler = None
+
+    def start(self):
+        self.started_at = time.time()
+        self._started = time.perf_counter()
+        metrics.add_listener(self._record_call)
+        self._sampler = threading.Thread(target=self._sample_loop, name=f'profiler-{self.id[:8]}', daemon=True)
+        self._sampler.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._sampler.join()
+        metrics.remove_listener(self._record_call)
+        self.duration = time.perf_counter() - self._started
+
+    def _record_call(self, stage, seconds, failed):
+        with self._calls_lock:
+            call = self._calls.get(stage)
+            if call is None:
+                call = self._calls[stage] = {"count": 0, "errors": 0, "total_seconds": 0.0, "max_seconds": 0.0}
+            call["count"] += 1
+            call["errors"] += int(failed)
+            call["total_seconds"] += seconds
+            call["max_seconds"] = max(call["max_seconds"], seconds)
+
+    def _sample_loop(self):
+        own_id = threading.get_ident()
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            # Weight each sample by the real time since the previous one, so
+            # a late wake-up doesn't undercount wall time
+            now = time.perf_counter()
+            elapsed, last = now - last, now
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                in_project = False
+                while frame is not None:
+                    code = frame.f_code
+                    in_project = in_project or _is_project_file(code.co_filename)
+                    stack.append(code)
+                    frame = frame.f_back
+                if thread_id != self.thread_id and not in_project:
+                    continue
+                # Outermost call first, as in the folded flame graph format
+                self._stacks[tuple(reversed(stack))] += elapsed
+            self.samples += 1
+
+    def report(self):
+        """Wall time per function (self and inclusive), per external call, and folded stacks"""
+        self_seconds = Counter()
+        total_seconds = Counter()
+        folded = Counter()
+        for stack, seconds in self._stacks.items():
+            labels = [_frame_label(code) for code in stack]
+            self_seconds[labels[-1]] += seconds
+            for label in set(labels):
+                total_seconds[label] += seconds
+            # Folded stacks count milliseconds, ready for flamegraph.pl / speedscope
+            folded[';'.join(labels)] += round(seconds * 1000)
+
+        functions = [
+            {
+                "function": label,
+                "total_seconds": round(seconds, 4),
+                "self_seconds": round(self_seconds[label], 4)
+            }
+            for label, seconds in total_seconds.most_common(PROFILE_TOP_FUNCTIONS)
+        ]
+        with self._calls_lock:
+            external_calls = {stage: dict(call) for stage, call in self._calls.items()}
+        return {
+            "id": self.id,
+            "name": self.name,
+            "started_at": self.started_at,
+            "duration_seconds": self.duration,
+            "sample_interval_ms": self.interval * 1000,
+            "samples": self.samples,
+            "functions": functions,
+            "external_calls": external_calls,
+            "folded_stacks": dict(folded.most_common())
+        }
+
+    def save(self, directory=PROFILE_DIR):
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{self.id}.json")
+        with open(path, 'w') as f:
+            json.dump(self.report(), f, indent=2)
+        return path
+
+
+@contextmanager
+def profile(name):
+    """Profile the enclosed block and save the result to PROFILE_DIR, even if the block raises"""
+    prof = Profile(name).start()
+    try:
+        yield prof
+    finally:
+        prof.stop()
+        prof.save()
+
+
+def profile_path(profile_id):
+    """Path of a saved profile, or None if the id is malformed or unknown"""
+    if not profile_id or not set(profile_id) <= _PROFILE_ID:
+        return None
+    path = os.path.join(PROFILE_DIR, f"{profile_id}.json")
+    return path if os.path.exists(path) else None
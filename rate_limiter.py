@@ -0,0 +1,201 @@
+import os
+import time
+import asyncio
+import random
+import logging
+import threading
+from metrics import registry
+
+logger = logging.getLogger(__name__)
+
+# Gmail allows 250 quota units per user per second; each method has its own cost
+GMAIL_QUOTA_UNITS_PER_SEC = float(os.getenv('GMAIL_QUOTA_UNITS_PER_SEC', '250'))
+GMAIL_QUOTA_UNITS = {'messages.list': 5, 'messages.get': 5, 'history.list': 2, 'getProfile': 1}
+# Calendar's default per-user quota is 600 requests a minute
+CALENDAR_REQUESTS_PER_SEC = float(os.getenv('CALENDAR_REQUESTS_PER_SEC', '10'))
+
+# Attempts after the first one for retryable failures
+GOOGLE_MAX_RETRIES = int(os.getenv('GOOGLE_MAX_RETRIES', '5'))
+# Exponential backoff: a random delay up to BASE * 2**attempt, capped at MAX (seconds)
+GOOGLE_BACKOFF_BASE = float(os.getenv('GOOGLE_BACKOFF_BASE', '0.5'))
+GOOGLE_BACKOFF_MAX = float(os.getenv('GOOGLE_BACKOFF_MAX', '32'))
+
+RATES = {'gmail': GMAIL_QUOTA_UNITS_PER_SEC, 'calendar': CALENDAR_REQUESTS_PER_SEC}
+
+# 403s with these reasons are quota errors, not permission errors
+_RATE_LIMIT_REASONS = ('rateLimitExceeded', 'userRateLimitExceeded')
+
+retries = registry.counter('google_api_retries_total', 'Google API calls retried, by API and reason')
+
+
+class TokenBucket:
+    """Token bucket whose rate adapts to throttling (AIMD).
+
+    Starts at the configured quota. A quota error halves the rate and
+    blocks every caller for the backoff delay; each success adds back 1% of
+    the quota, so the rate settles just under what the API accepts.
+    """
+
+    def __init__(self, rate, burst=None, min_fraction=0.05):
+        self.max_rate = rate
+        self.rate = rate
+        self.min_rate = rate * min_fraction
+        self.burst = burst or rate
+        self.tokens = self.burst
+        self.blocked_until = 0.0
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, cost=1):
+        """Take ``cost`` tokens and return 0, or return the seconds to wait before trying again"""
+        cost = min(cost, self.burst)
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            wait = self.blocked_until - now
+            if wait <= 0:
+                if self.tokens >= cost:
+                    self.tokens -= cost
+                    return 0
+                wait = (cost - self.tokens) / self.rate
+            return wait
+
+    def acquire(self, cost=1):
+        while True:
+            wait = self.try_acquire(cost)
+            if not wait:
+                return
+            time.sleep(wait)
+
+    async def acquire_async(self, cost=1):
+        while True:
+            wait = self.try_acquire(cost)
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+
+    def on_success(self):
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate * 0.01)
+
+    def on_throttle(self, delay):
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.tokens = 0
+            self.blocked_until = max(self.blocked_until, time.monotonic() + delay)
+
+
+def _status(error):
+    return getattr(getattr(error, 'resp', None), 'status', None)
+
+
+def _is_rate_limited(error):
+    status = _status(error)
+    if status == 429:
+        return True
+    if status == 403:
+        details = f"{error} {getattr(error, 'content', b'')!r}"
+        return any(reason in details for reason in _RATE_LIMIT_REASONS)
+    return False
+
+
+def retry_after(error):
+    """Seconds from a Retry-After header, or None"""
+    resp = getattr(error, 'resp', None)
+    try:
+        return max(0.0, float(resp.get('retry-after')))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt, error=None):
+    """Full-jitter exponential backoff, or the server's Retry-After plus a little jitter"""
+    server_delay = retry_after(error) if error is not None else None
+    if server_delay is not None:
+        return server_delay + random.uniform(0, GOOGLE_BACKOFF_BASE)
+    return random.uniform(0, min(GOOGLE_BACKOFF_MAX, GOOGLE_BACKOFF_BASE * (2 ** attempt)))
+
+
+def is_retryable(error, idempotent=True):
+    """Quota errors are always safe to retry (the call was rejected); server and
+    connection errors only when repeating the call can't do something twice."""
+    if _is_rate_limited(error):
+        return True
+    status = _status(error)
+    if status is not None:
+        return idempotent and status >= 500
+    return idempotent and isinstance(error, OSError)
+
+
+class RateLimiter:
+    """Token buckets shared across threads, one per (api, user)"""
+
+    def __init__(self, rates=None, max_retries=GOOGLE_MAX_RETRIES):
+        self.rates = dict(RATES, **(rates or {}))
+        self.max_retries = max_retries
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, api, user='default'):
+        with self._lock:
+            bucket = self._buckets.get((api, user))
+            if bucket is None:
+                bucket = self._buckets[(api, user)] = TokenBucket(self.rates[api])
+            return bucket
+
+    def throttled(self, api, user, error, attempt):
+        """Record a failed attempt and return how long to back off before the next one"""
+        delay = backoff_delay(attempt, error)
+        limited = _is_rate_limited(error)
+        if limited:
+            self.bucket(api, user).on_throttle(delay)
+        retries.inc(api=api, reason='rate_limited' if limited else 'server_error')
+        logger.warning("⚠️ %s call for %s failed (%s), retrying in %.2fs", api, user, error, delay)
+        return delay
+
+    def execute(self, request, api, user='default', cost=1, idempotent=True):
+        """Run ``request.execute()`` within the (api, user) quota, retrying retryable failures"""
+        bucket = self.bucket(api, user)
+        for attempt in range(self.max_retries + 1):
+            bucket.acquire(cost)
+            try:
+                result = request.execute()
+            except Exception as e:
+                if attempt >= self.max_retries or not is_retryable(e, idempotent):
+                    raise
+                time.sleep(self.throttled(api, user, e, attempt))
+                continue
+            bucket.on_success()
+            return result
+
+    async def execute_async(self, call, api, user='default', cost=1, idempotent=True):
+        """Like ``execute`` for a coroutine function ``call``, sleeping without blocking the event loop"""
+        bucket = self.bucket(api, user)
+        for attempt in range(self.max_retries + 1):
+            await bucket.acquire_async(cost)
+            try:
+                result = await call()
+            except Exception as e:
+                if attempt >= self.max_retries or not is_retryable(e, idempotent):
+                    raise
+                await asyncio.sleep(self.throttled(api, user, e, attempt))
+                continue
+            bucket.on_success()
+            return result
+
+    def stats(self):
+        with self._lock:
+            buckets = dict(self._buckets)
+        return {f"{api}:{user}": round(bucket.rate, 2) for (api, user), bucket in buckets.items()}
+
+
+# Shared limiter for every Google API call in the process
+rate_limiter = RateLimiter()
+
+
+def execute(request, api, user='default', cost=1, idempotent=True):
+    return rate_limiter.execute(request, api, user, cost, idempotent)
@@ -0,0 +1,83 @@
+import os
+import gzip
+import hashlib
+from flask import Response, request
+
+# Brotli is optional; without it responses are only gzip-compressed
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Responses smaller than this are sent uncompressed
+COMPRESS_MIN_BYTES = int(os.getenv('COMPRESS_MIN_BYTES', '1024'))
+# gzip level (1-9); low levels cost little CPU and already shrink JSON several times
+COMPRESS_LEVEL = int(os.getenv('COMPRESS_LEVEL', '5'))
+
+_COMPRESSIBLE = ('application/json', 'text/')
+
+
+def etag_for(*parts):
+    """Weak ETag value built from whatever the response depends on, plus the query string"""
+    key = '\x1f'.join([str(part) for part in parts] + [request.path, request.query_string.decode('latin-1')])
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()[:32]
+
+
+def not_modified(etag):
+    """A 304 response if the client already holds ``etag``, otherwise None"""
+    if not request.if_none_match.contains_weak(etag):
+        return None
+    response = Response(status=304)
+    return with_etag(response, etag)
+
+
+def with_etag(response, etag=None):
+    """Tag a response (with a hash of its body when no etag is given) and make clients revalidate it"""
+    if etag is None:
+        response.add_etag(weak=True)
+    else:
+        response.set_etag(etag, weak=True)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+def requested_fields():
+    """The ``fields=a,b,c`` query parameter as a list, or None to return everything"""
+    fields = request.args.get('fields')
+    if not fields:
+        return None
+    return [field.strip() for field in fields.split(',') if field.strip()]
+
+
+def project(items, fields):
+    """Keep only ``fields`` of each dict in ``items``; None keeps them whole"""
+    if fields is None:
+        return items
+    return [{field: item[field] for field in fields if field in item} for item in items]
+
+
+def _accepted_encodings():
+    accepted = request.accept_encodings
+    return [encoding for encoding in ('br', 'gzip') if accepted[encoding] > 0 and (encoding != 'br' or brotli)]
+
+
+def compress(response):
+    """after_request hook: brotli- or gzip-encode large JSON and text responses the client accepts"""
+    response.vary.add('Accept-Encoding')
+    if (response.status_code < 200 or response.status_code in (204, 206, 304)
+            or response.direct_passthrough or 'Content-Encoding' in response.headers
+            or not (response.mimetype or '').startswith(_COMPRESSIBLE)):
+        return response
+    data = response.get_data()
+    encodings = _accepted_encodings()
+    if len(data) < COMPRESS_MIN_BYTES or not encodings:
+        return response
+
+    if encodings[0] == 'br':
+        # Quality 4 is about as fast as gzip and compresses better
+        response.set_data(brotli.compress(data, quality=4))
+        response.headers['Content-Encoding'] = 'br'
+    else:
+        response.set_data(gzip.compress(data, COMPRESS_LEVEL))
+        response.headers['Content-Encoding'] = 'gzip'
+    return response
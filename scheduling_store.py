@@ -0,0 +1,202 @@
+import os
+import json
+import time
+import base64
+import sqlite3
+import threading
+from calendar_updater import parse_date
+from data_dir import data_path
+
+# SQLite file holding analyzed emails and their scheduling data
+SCHEDULING_DB_FILE = os.getenv('SCHEDULING_DB_FILE', data_path('scheduling.db'))
+
+_CREATE_TABLE = (
+    "CREATE TABLE IF NOT EXISTS scheduling_emails ("
+    " email_id TEXT NOT NULL,"
+    " mailbox TEXT NOT NULL DEFAULT 'default',"
+    " subject TEXT NOT NULL DEFAULT '',"
+    " sender TEXT NOT NULL DEFAULT '',"
+    " snippet TEXT NOT NULL DEFAULT '',"
+    " scheduling_data TEXT NOT NULL,"
+    " event_date TEXT,"
+    " analyzed_at REAL NOT NULL,"
+    " PRIMARY KEY (mailbox, email_id))"
+)
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+def _event_date(scheduling_data):
+    """ISO date of the event when the extracted date can be parsed, otherwise None"""
+    try:
+        return parse_date(scheduling_data.get('date')).date().isoformat()
+    except Exception:
+        return None
+
+
+def encode_cursor(analyzed_at, email_id):
+    raw = json.dumps([analyzed_at, email_id]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def decode_cursor(cursor):
+    try:
+        analyzed_at, email_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return float(analyzed_at), str(email_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+class SchedulingStore:
+    """Durable store for emails that were found to contain scheduling info.
+
+    Rows are keyed by mailbox and Gmail message id and upserted, so
+    re-analyzing an email updates it in place and mailboxes never touch each
+    other's rows. The file is opened in WAL mode so several worker processes
+    can share it.
+    """
+
+    def __init__(self, path=SCHEDULING_DB_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = None
+
+    def _connect(self):
+        if self._db is None:
+            self._db = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            self._db.row_factory = sqlite3.Row
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(_CREATE_TABLE)
+            self._migrate(self._db)
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_scheduling_event_date ON scheduling_emails (event_date)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_scheduling_analyzed_at ON scheduling_emails (analyzed_at, email_id)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_scheduling_mailbox ON scheduling_emails (mailbox, analyzed_at, email_id)")
+            # Bumped in the same transaction as every write; read APIs derive their ETags from it
+            self._db.execute("CREATE TABLE IF NOT EXISTS store_version (id INTEGER PRIMARY KEY CHECK (id = 0), version INTEGER NOT NULL)")
+            self._db.execute("INSERT OR IGNORE INTO store_version (id, version) VALUES (0, 0)")
+            self._db.commit()
+        return self._db
+
+    @staticmethod
+    def _migrate(db):
+        # Databases created before multi-mailbox support are keyed by email_id alone
+        columns = {row["name"]: row["pk"] for row in db.execute("PRAGMA table_info(scheduling_emails)")}
+        if columns.get("mailbox"):
+            return
+        mailbox = "mailbox" if "mailbox" in columns else "'default'"
+        db.execute("DROP TABLE IF EXISTS scheduling_emails_old")
+        db.execute("ALTER TABLE scheduling_emails RENAME TO scheduling_emails_old")
+        db.execute(_CREATE_TABLE)
+        db.execute(
+            "INSERT INTO scheduling_emails"
+            " (email_id, mailbox, subject, sender, snippet, scheduling_data, event_date, analyzed_at)"
+            f" SELECT email_id, {mailbox}, subject, sender, snippet, scheduling_data, event_date, analyzed_at"
+            " FROM scheduling_emails_old"
+        )
+        db.execute("DROP TABLE scheduling_emails_old")
+
+    def upsert(self, email, scheduling_data, mailbox='default'):
+        """Insert or update the scheduling result for an email dict (id/subject/from/snippet)"""
+        with self._lock:
+            db = self._connect()
+            db.execute(
+                "INSERT INTO scheduling_emails"
+                " (email_id, mailbox, subject, sender, snippet, scheduling_data, event_date, analyzed_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT(mailbox, email_id) DO UPDATE SET"
+                " subject = excluded.subject, sender = excluded.sender, snippet = excluded.snippet,"
+                " scheduling_data = excluded.scheduling_data, event_date = excluded.event_date,"
+                " analyzed_at = excluded.analyzed_at",
+                (
+                    email['id'],
+                    mailbox,
+                    email.get('subject', ''),
+                    email.get('from', ''),
+                    email.get('snippet', ''),
+                    json.dumps(scheduling_data),
+                    _event_date(scheduling_data),
+                    time.time()
+                )
+            )
+            self._bump_version(db)
+            db.commit()
+
+    def remove(self, email_id, mailbox='default'):
+        """Drop a mailbox's email that no longer holds scheduling info"""
+        with self._lock:
+            db = self._connect()
+            if db.execute("DELETE FROM scheduling_emails WHERE mailbox = ? AND email_id = ?", (mailbox, email_id)).rowcount:
+                self._bump_version(db)
+            db.commit()
+
+    @staticmethod
+    def _bump_version(db):
+        db.execute("UPDATE store_version SET version = version + 1 WHERE id = 0")
+
+    def version(self):
+        """Counter that changes whenever a row is written or removed, by any process sharing the file"""
+        with self._lock:
+            return self._connect().execute("SELECT version FROM store_version WHERE id = 0").fetchone()[0]
+
+    @staticmethod
+    def _filters(date_from, date_to, mailbox):
+        clauses, params = [], []
+        if mailbox:
+            clauses.append("mailbox = ?")
+            params.append(mailbox)
+        if date_from:
+            clauses.append("event_date >= ?")
+            params.append(date_from)
+        if date_to:
+            clauses.append("event_date <= ?")
+            params.append(date_to)
+        return clauses, params
+
+    def count(self, date_from=None, date_to=None, mailbox=None):
+        clauses, params = self._filters(date_from, date_to, mailbox)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            return self._connect().execute(f"SELECT COUNT(*) FROM scheduling_emails{where}", params).fetchone()[0]
+
+    def list(self, limit=DEFAULT_PAGE_SIZE, cursor=None, date_from=None, date_to=None, mailbox=None):
+        """Return (emails, next_cursor), newest analysis first.
+
+        ``cursor`` is the opaque value returned by the previous page;
+        ``date_from``/``date_to`` are inclusive YYYY-MM-DD bounds on the event date;
+        ``mailbox`` limits the page to one mailbox.
+        """
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        clauses, params = self._filters(date_from, date_to, mailbox)
+        if cursor:
+            analyzed_at, email_id = decode_cursor(cursor)
+            clauses.append("(analyzed_at < ? OR (analyzed_at = ? AND email_id < ?))")
+            params.extend([analyzed_at, analyzed_at, email_id])
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        with self._lock:
+            rows = self._connect().execute(
+                f"SELECT * FROM scheduling_emails{where}"
+                " ORDER BY analyzed_at DESC, email_id DESC LIMIT ?",
+                params + [limit + 1]
+            ).fetchall()
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        emails = [{
+            "email_id": row["email_id"],
+            "mailbox": row["mailbox"],
+            "subject": row["subject"],
+            "from": row["sender"],
+            "snippet": row["snippet"],
+            "scheduling_data": json.loads(row["scheduling_data"]),
+            "event_date": row["event_date"],
+            "analyzed_at": row["analyzed_at"],
+            "has_scheduling": True
+        } for row in rows]
+        next_cursor = encode_cursor(rows[-1]["analyzed_at"], rows[-1]["email_id"]) if has_more else None
+        return emails, next_cursor
+
+
+# Shared store used by the API
+scheduling_store = SchedulingStore()
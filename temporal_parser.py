@@ -0,0 +1,160 @@
+import re
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+
+# Every date/time string goes through one precompiled regex instead of a
+# chain of strptime attempts, and results are memoized since the same
+# strings ("tomorrow", "3:00 PM", "2025-10-23") come back over and over.
+
+MONTHS = {
+    'january': 1, 'jan': 1, 'february': 2, 'feb': 2, 'march': 3, 'mar': 3,
+    'april': 4, 'apr': 4, 'may': 5, 'june': 6, 'jun': 6, 'july': 7, 'jul': 7,
+    'august': 8, 'aug': 8, 'september': 9, 'sept': 9, 'sep': 9,
+    'october': 10, 'oct': 10, 'november': 11, 'nov': 11, 'december': 12, 'dec': 12,
+}
+
+WEEKDAYS = {
+    'monday': 0, 'mon': 0, 'tuesday': 1, 'tues': 1, 'tue': 1,
+    'wednesday': 2, 'wed': 2, 'thursday': 3, 'thurs': 3, 'thur': 3, 'thu': 3,
+    'friday': 4, 'fri': 4, 'saturday': 5, 'sat': 5, 'sunday': 6, 'sun': 6,
+}
+
+RELATIVE_DAYS = {'today': 0, 'tonight': 0, 'tomorrow': 1, 'day after tomorrow': 2}
+
+
+def _alternation(words):
+    # Longest first so "september" wins over "sep"
+    return '|'.join(sorted(words, key=len, reverse=True))
+
+
+_MONTH = _alternation(MONTHS)
+_WEEKDAY = _alternation(WEEKDAYS)
+_ORDINAL = r'(?:st|nd|rd|th)?'
+
+DATE_PATTERN = re.compile(
+    r'(?:'
+    r'(?P<iso_y>\d{4})-(?P<iso_m>\d{1,2})-(?P<iso_d>\d{1,2})(?:t[\d:.]+z?)?'
+    r'|(?P<us_m>\d{1,2})/(?P<us_d>\d{1,2})(?:/(?P<us_y>\d{2}|\d{4}))?'
+    r'|(?:(?:' + _WEEKDAY + r')\.?,?\s+)?(?:the\s+)?(?:'
+    r'(?P<md_m>' + _MONTH + r')\.?\s+(?P<md_d>\d{1,2})' + _ORDINAL +
+    r'|(?P<dm_d>\d{1,2})' + _ORDINAL + r'\s+(?:of\s+)?(?P<dm_m>' + _MONTH + r')\.?'
+    r')(?:,?\s+(?P<named_y>\d{4}))?'
+    r'|(?P<relative>' + _alternation(RELATIVE_DAYS) + r')'
+    r'|(?P<modifier>this|next)?\s*(?P<weekday>' + _WEEKDAY + r')'
+    r')'
+)
+
+TIME_PATTERN = re.compile(
+    r'(?:'
+    r'(?P<hour>\d{1,2})(?::(?P<minute>\d{2}))?(?::(?P<second>\d{2}))?\s*(?P<meridiem>[ap])\.?m\.?'
+    r'|(?P<h24>\d{1,2}):(?P<m24>\d{2})(?::(?P<s24>\d{2}))?'
+    r'|(?P<named>noon|midday|midnight)'
+    r')'
+)
+
+_whitespace = re.compile(r'\s+')
+
+
+def _normalize(text):
+    return _whitespace.sub(' ', str(text).strip().lower())
+
+
+def _year(value, default):
+    if not value:
+        return default
+    year = int(value)
+    return year + 2000 if year < 100 else year
+
+
+@lru_cache(maxsize=4096)
+def _parse_date(text, today):
+    match = DATE_PATTERN.fullmatch(text)
+    if not match:
+        return None
+    groups = match.groupdict()
+    try:
+        if groups['iso_y']:
+            return date(int(groups['iso_y']), int(groups['iso_m']), int(groups['iso_d']))
+        if groups['us_m']:
+            return date(_year(groups['us_y'], today.year), int(groups['us_m']), int(groups['us_d']))
+        if groups['md_m']:
+            return date(_year(groups['named_y'], today.year), MONTHS[groups['md_m']], int(groups['md_d']))
+        if groups['dm_m']:
+            return date(_year(groups['named_y'], today.year), MONTHS[groups['dm_m']], int(groups['dm_d']))
+    except ValueError:
+        # Right shape, impossible value (e.g. February 30th)
+        return None
+    if groups['relative']:
+        return today + timedelta(days=RELATIVE_DAYS[groups['relative']])
+    if groups['weekday']:
+        days_ahead = (WEEKDAYS[groups['weekday']] - today.weekday()) % 7
+        # "next friday" never means today
+        if groups['modifier'] == 'next' and days_ahead == 0:
+            days_ahead = 7
+        return today + timedelta(days=days_ahead)
+    return None
+
+
+@lru_cache(maxsize=4096)
+def _parse_time(text):
+    match = TIME_PATTERN.fullmatch(text)
+    if not match:
+        return None
+    groups = match.groupdict()
+    if groups['named']:
+        return time(0, 0) if groups['named'] == 'midnight' else time(12, 0)
+    if groups['meridiem']:
+        hour = int(groups['hour'])
+        if not 1 <= hour <= 12:
+            return None
+        hour = hour % 12 + (12 if groups['meridiem'] == 'p' else 0)
+        minute, second = int(groups['minute'] or 0), int(groups['second'] or 0)
+    else:
+        hour, minute, second = int(groups['h24']), int(groups['m24']), int(groups['s24'] or 0)
+    if hour > 23 or minute > 59 or second > 59:
+        return None
+    return time(hour, minute, second)
+
+
+def parse_date(text, today=None):
+    """Parse an ISO, US numeric, named-month, weekday or relative date into a ``date``.
+
+    Dates without a year fall in ``today``'s year. Raises ValueError when the
+    string is missing or not recognized.
+    """
+    if not text:
+        raise ValueError("Date is missing.")
+    parsed = _parse_date(_normalize(text), today or date.today())
+    if parsed is None:
+        raise ValueError(f"Date format not recognized: {text}")
+    return parsed
+
+
+def parse_time(text):
+    """Parse a 12h ("3pm", "3:30 PM") or 24h ("15:00", "15:00:00") time into a ``time``"""
+    if not text:
+        raise ValueError("Time is missing.")
+    parsed = _parse_time(_normalize(text))
+    if parsed is None:
+        raise ValueError(f"Time format not recognized: {text}")
+    return parsed
+
+
+def parse_dates(texts, today=None):
+    """Parse many date strings at once; unrecognized ones come back as None"""
+    today = today or date.today()
+    return [_parse_date(_normalize(text), today) if text else None for text in texts]
+
+
+def parse_times(texts):
+    """Parse many time strings at once; unrecognized ones come back as None"""
+    return [_parse_time(_normalize(text)) if text else None for text in texts]
+
+
+def add_minutes(start, minutes):
+    """Shift a ``time`` by some minutes, wrapping around midnight"""
+    return (datetime.combine(date(2000, 1, 1), start) + timedelta(minutes=minutes)).time()
+
+
+def cache_info():
+    return {"dates": _parse_date.cache_info()._asdict(), "times": _parse_time.cache_info()._asdict()}
@@ -0,0 +1,8 @@
+import os
+import sys
+import tempfile
+
+# The modules live at the repository root; keep their state files out of the working tree
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DATA_DIR', tempfile.mkdtemp(prefix='scheduler-tests-'))
+os.environ.setdefault('EXTRACTION_CACHE_FILE', '')
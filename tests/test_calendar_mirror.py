@@ -0,0 +1,51 @@
+import random
+
+from calendar_mirror import IntervalIndex, timestamp
+
+
+def _event(event_id, start, end):
+    return {'id': event_id, 'start_ts': float(start), 'end_ts': float(end)}
+
+
+def test_overlapping_matches_brute_force():
+    rng = random.Random(7)
+    index = IntervalIndex()
+    events = {}
+    for i in range(300):
+        start = rng.uniform(0, 10000)
+        event = _event(f'e{i}', start, start + rng.choice([60, 1800, 3600, 86400]))
+        index.add(event)
+        events[event['id']] = event
+    for event_id in rng.sample(sorted(events), 100):
+        index.remove(event_id)
+        del events[event_id]
+
+    assert len(index) == len(events)
+    for _ in range(200):
+        start = rng.uniform(-1000, 11000)
+        end = start + rng.uniform(1, 5000)
+        expected = {e['id'] for e in events.values() if e['start_ts'] < end and e['end_ts'] > start}
+        assert {e['id'] for e in index.overlapping(start, end)} == expected
+
+
+def test_touching_events_do_not_overlap():
+    index = IntervalIndex()
+    index.add(_event('a', 0, 100))
+    assert index.overlapping(100, 200) == []
+    assert [e['id'] for e in index.overlapping(99, 200)] == ['a']
+
+
+def test_add_replaces_an_event_with_the_same_id():
+    index = IntervalIndex()
+    index.add(_event('a', 0, 100))
+    index.add(_event('a', 500, 600))
+    assert len(index) == 1
+    assert index.overlapping(0, 100) == []
+    assert index.get('a')['start_ts'] == 500
+    index.remove('a')
+    index.remove('a')
+    assert 'a' not in index
+
+
+def test_timestamp_understands_utc_suffix():
+    assert timestamp('2025-10-23T15:00:00Z') == timestamp('2025-10-23T17:00:00+02:00')
@@ -0,0 +1,43 @@
+import base64
+
+from email_body import decode_base64url, email_text, pick_text_part, strip_quotes_and_signature
+
+
+def _data(text):
+    return base64.urlsafe_b64encode(text.encode('utf-8')).decode('ascii')
+
+
+def test_decode_stops_at_the_byte_cap():
+    assert decode_base64url(_data('hello world'), max_bytes=5) == 'hello'
+    # A character cut in half by the cap is dropped, not mangled
+    assert decode_base64url(_data('aé'), max_bytes=2) == 'a'
+
+
+def test_pick_text_part_prefers_plain_and_skips_attachments():
+    payload = {'parts': [
+        {'mimeType': 'text/plain', 'filename': 'notes.txt', 'body': {'data': _data('attachment')}},
+        {'mimeType': 'text/html', 'body': {'data': _data('<p>rich</p>')}},
+        {'mimeType': 'text/plain', 'body': {'data': _data('plain')}},
+    ]}
+    assert pick_text_part(payload)['body']['data'] == _data('plain')
+
+
+def test_strip_drops_quotes_signature_and_forwarded_original():
+    text = ("Can we meet Friday at 3pm?\n> old quoted line\nThanks\nBob\n-- \nBob's signature\n")
+    assert strip_quotes_and_signature(text) == "Can we meet Friday at 3pm?"
+
+    forwarded = "See you then.\n\nFrom: Alice <alice@example.com>\nSent: Monday\nold stuff"
+    assert strip_quotes_and_signature(forwarded) == "See you then."
+
+    header_block = "See you then.\nFrom: Alice\nDate: Monday\nold stuff"
+    assert strip_quotes_and_signature(header_block) == "See you then."
+
+
+def test_from_in_the_body_is_kept():
+    text = "The review is on Oct 30.\nFrom: 2pm to 4pm in room B\nBring slides."
+    assert strip_quotes_and_signature(text) == text
+
+
+def test_email_text_uses_subject_and_body_or_snippet():
+    assert email_text({'subject': 'Sync', 'body': 'At 3pm', 'snippet': 's'}) == "Subject: Sync\n\nAt 3pm"
+    assert email_text({'subject': 'Sync', 'body': '', 'snippet': 'snippet'}) == "snippet"
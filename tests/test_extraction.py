@@ -0,0 +1,76 @@
+import pytest
+
+from extraction import NO_EVENT, Extraction
+
+
+def test_from_dict_fills_in_defaults():
+    extraction = Extraction.from_dict({"date": "2025-10-23", "time": "3pm", "location": None})
+
+    assert extraction.has_event
+    assert extraction.title == "Meeting"
+    assert extraction.start_time == "3pm"
+    assert extraction.end_time == "15:30"
+    assert extraction.location == ""
+    assert extraction.participants == ()
+
+
+@pytest.mark.parametrize('data', [
+    {"action": "No scheduling info found."},
+    {"title": "Lunch"},
+    {"date": "2025-10-23"},
+    {"date": "null", "start_time": "3pm"},
+    {"date": "2025-10-23", "start_time": "None"},
+    {"date": None, "start_time": "3pm"},
+])
+def test_from_dict_without_date_and_start_time_is_no_event(data):
+    assert Extraction.from_dict(data) is NO_EVENT
+
+
+def test_from_dict_rejects_non_objects():
+    with pytest.raises(ValueError):
+        Extraction.from_dict(["not", "an", "object"])
+
+
+def test_end_time_falls_back_to_start_when_unparseable():
+    extraction = Extraction.from_dict({"date": "2025-10-23", "start_time": "after lunch", "end_time": "null"})
+    assert extraction.end_time == "afterlunch"
+
+
+def test_participants_keep_only_names_and_addresses():
+    extraction = Extraction.from_dict({
+        "date": "2025-10-23",
+        "start_time": "3pm",
+        "participants": [{"name": "Bob", "email": "bob@example.com"}, {"name": "Al"}, "cy@example.com", 3, None, ["x"]]
+    })
+    assert extraction.participants == ("bob@example.com", "Al", "cy@example.com")
+
+    single = Extraction.from_dict({"date": "2025-10-23", "start_time": "3pm", "participants": "bob"})
+    assert single.participants == ("bob",)
+
+
+def test_to_dict_and_json_round_trip():
+    extraction = Extraction.from_dict({"title": "Review", "date": "2025-10-23", "start_time": "10:00",
+                                       "end_time": "11:00", "location": "Room B", "participants": ["a@example.com"]})
+
+    assert extraction.to_dict() == {"title": "Review", "date": "2025-10-23", "start_time": "10:00",
+                                    "end_time": "11:00", "location": "Room B", "participants": ["a@example.com"]}
+    assert Extraction.from_json(extraction.to_json()) == extraction
+    assert NO_EVENT.to_dict() == {"action": "No scheduling info found."}
+
+
+def test_extraction_has_no_instance_dict():
+    with pytest.raises(AttributeError):
+        NO_EVENT.extra = 1
+
+
+def test_extraction_is_immutable():
+    extraction = Extraction(title="Sync", date="2025-10-23", start_time="10:00", participants=["a@example.com"])
+    with pytest.raises(AttributeError):
+        extraction.title = "Changed"
+    with pytest.raises(AttributeError):
+        del extraction.date
+    with pytest.raises(AttributeError):
+        NO_EVENT.date = "2025-10-23"
+    assert (extraction.title, NO_EVENT.has_event) == ("Sync", False)
+    assert hash(extraction) == hash(Extraction(title="Sync", date="2025-10-23", start_time="10:00",
+                                               participants=("a@example.com",)))
@@ -0,0 +1,75 @@
+import pytest
+
+import extraction_cache
+from extraction import NO_EVENT, Extraction
+from extraction_cache import ExtractionCache, make_key
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(extraction_cache.time, 'time', lambda: now[0])
+    return now
+
+
+def _event(title):
+    return Extraction(title=title, date='2030-01-01', start_time='10:00', end_time='10:30')
+
+
+def test_key_ignores_whitespace_but_not_model_or_prompt():
+    key = make_key('phi3', '2', 'Lunch  on\nFriday ')
+    assert key == make_key('phi3', '2', 'Lunch on Friday')
+    assert key != make_key('llama3', '2', 'Lunch on Friday')
+    assert key != make_key('phi3', '3', 'Lunch on Friday')
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = ExtractionCache(path='', ttl=60)
+    cache.put('k', _event('Sync'))
+    clock[0] += 60
+    assert cache.get('k') == _event('Sync')
+    clock[0] += 1
+    assert cache.get('k') is None
+
+
+def test_memory_tier_evicts_least_recently_used(clock):
+    cache = ExtractionCache(path='', max_entries=2)
+    cache.put('a', _event('A'))
+    cache.put('b', _event('B'))
+    cache.get('a')
+    cache.put('c', _event('C'))
+    assert cache.get('b') is None
+    assert cache.get('a') == _event('A')
+    assert cache.stats()['evictions'] == 1
+
+
+def test_disk_hits_survive_a_restart_and_are_promoted(tmp_path, clock):
+    path = str(tmp_path / 'cache.db')
+    ExtractionCache(path=path).put('k', _event('Sync'))
+    ExtractionCache(path=path).put('none', NO_EVENT)
+
+    cache = ExtractionCache(path=path)
+    assert cache.get('k') == _event('Sync')
+    assert cache.get('none') == NO_EVENT
+    assert cache.get('k') == _event('Sync')
+    stats = cache.stats()
+    assert (stats['disk_hits'], stats['memory_hits']) == (2, 1)
+
+
+def test_expired_disk_entries_are_dropped(tmp_path, clock):
+    path = str(tmp_path / 'cache.db')
+    ExtractionCache(path=path, ttl=60).put('k', _event('Sync'))
+    clock[0] += 61
+    cache = ExtractionCache(path=path, ttl=60)
+    assert cache.get('k') is None
+    assert cache._connect().execute("SELECT COUNT(*) FROM extractions").fetchone()[0] == 0
+
+
+def test_disk_tier_is_pruned_to_its_size_newest_first(tmp_path, clock):
+    cache = ExtractionCache(path=str(tmp_path / 'cache.db'), max_entries=1, max_disk_entries=10)
+    for i in range(100):
+        clock[0] += 1
+        cache.put(f'k{i}', _event(f'E{i}'))
+
+    keys = {row[0] for row in cache._connect().execute("SELECT key FROM extractions")}
+    assert keys == {f'k{i}' for i in range(90, 100)}
@@ -0,0 +1,44 @@
+import threading
+
+from fair_pool import FairPool
+
+
+def test_keys_take_turns_regardless_of_queue_length():
+    pool = FairPool(1, name='test-fair')
+    release = threading.Event()
+    order = []
+    blocker = pool.submit('x', release.wait)
+    futures = [pool.submit('busy', order.append, f'busy-{i}') for i in range(4)]
+    futures.append(pool.submit('quiet', order.append, 'quiet-0'))
+
+    release.set()
+    for future in [blocker] + futures:
+        future.result(timeout=5)
+
+    assert order == ['busy-0', 'quiet-0', 'busy-1', 'busy-2', 'busy-3']
+
+
+def test_per_key_limit_bounds_concurrency():
+    pool = FairPool(4, per_key_limit=1, name='test-limit')
+    lock = threading.Lock()
+    running = []
+    peak = []
+
+    def task():
+        with lock:
+            running.append(1)
+            peak.append(len(running))
+        threading.Event().wait(0.01)
+        with lock:
+            running.pop()
+
+    for future in [pool.submit('mailbox', task) for _ in range(6)]:
+        future.result(timeout=5)
+    assert max(peak) == 1
+
+
+def test_exceptions_end_up_in_the_future():
+    pool = FairPool(1, name='test-errors')
+    future = pool.submit('key', lambda: 1 / 0)
+    assert isinstance(future.exception(timeout=5), ZeroDivisionError)
+    assert pool.submit('key', lambda: 42).result(timeout=5) == 42
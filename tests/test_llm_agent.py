@@ -0,0 +1,95 @@
+import pytest
+
+import llm_agent
+from extraction import NO_EVENT
+from llm_agent import _JsonObjectScanner, _first_json_object, _parse_batch, _parse_extraction, plan_batches
+
+
+def test_scanner_finds_first_object_after_prose():
+    assert _first_json_object('Sure! {"title": "a{b}", "p": []} and more {"x": 1}') == '{"title": "a{b}", "p": []}'
+
+
+def test_scanner_handles_escaped_quotes_in_strings():
+    assert _first_json_object('{"a": "b\\"}"}') == '{"a": "b\\"}"}'
+
+
+def test_scanner_skips_brackets_that_cannot_start_the_answer():
+    assert _first_json_object('results [1-3]: [ {"index": 1} ] tail', opener='[') == '[ {"index": 1} ]'
+    assert _first_json_object('use {curly} here: {"k": 1}') == '{"k": 1}'
+
+
+def test_scanner_reports_close_while_streaming():
+    scanner = _JsonObjectScanner('[')
+    tokens = ['Here [1-2]', ': [', '\n ', '{"index"', ': 1}', ']', ' trailing']
+    closed_at = next(i for i, token in enumerate(tokens) if scanner.feed(token))
+
+    assert closed_at == 5
+    assert scanner.json_text() == '[\n {"index": 1}]'
+
+
+def test_scanner_without_a_complete_object():
+    scanner = _JsonObjectScanner()
+    assert not scanner.feed('{"title": "unfinished')
+    assert scanner.json_text() is None
+
+
+def test_plan_batches_respects_budget_cap_and_order():
+    texts = ['x' * 400] * 5
+    # Each text costs 400 // 4 + 10 + 80 = 190 tokens
+    assert plan_batches(texts, token_budget=400, max_emails=8) == [[0, 1], [2, 3], [4]]
+    assert plan_batches(texts, token_budget=10000, max_emails=2) == [[0, 1], [2, 3], [4]]
+    assert plan_batches(['x' * 10000], token_budget=100) == [[0]]
+    assert plan_batches([]) == []
+
+
+def test_parse_batch_maps_valid_items_by_index():
+    raw = ('[{"index": 2, "date": "2025-10-23", "start_time": "3pm"},'
+           ' {"index": "1", "action": "No scheduling info found."},'
+           ' {"index": 2, "date": "2025-10-24", "start_time": "4pm"},'
+           ' {"index": 9, "date": "2025-10-23", "start_time": "3pm"},'
+           ' "junk"]')
+    parsed = _parse_batch(raw, 3)
+
+    assert sorted(parsed) == [0, 1]
+    assert parsed[0] is NO_EVENT
+    assert parsed[1].date == "2025-10-23"
+
+
+def test_parse_batch_without_array_raises():
+    with pytest.raises(ValueError):
+        _parse_batch('no json here', 2)
+
+
+@pytest.fixture
+def free_form_output(monkeypatch):
+    monkeypatch.setattr(llm_agent, 'OLLAMA_STRUCTURED_OUTPUT', False)
+
+
+def test_parse_extraction_strips_comments_and_prose(free_form_output):
+    extraction = _parse_extraction('Answer:\n{"title": "Sync", "date": "2025-10-23", // the date\n "start_time": "10:00"}')
+    assert (extraction.title, extraction.date, extraction.start_time) == ("Sync", "2025-10-23", "10:00")
+
+
+def test_urls_in_strings_are_not_taken_for_comments():
+    raw = '{"date": "2025-10-23", "start_time": "3pm", "location": "https://zoom.us/j/1"}'
+    assert _parse_extraction(raw).location == "https://zoom.us/j/1"
+
+    batch = _parse_batch('[{"index": 1, "date": "2025-10-23", "start_time": "3pm", "location": "https://zoom.us/j/1"}]', 1)
+    assert batch[0].location == "https://zoom.us/j/1"
+
+
+def test_comments_are_stripped_around_urls(free_form_output):
+    raw = '{"date": "2025-10-23", // ISO\n "start_time": "3pm", "location": "https://zoom.us/j/1"} // done'
+    assert _parse_extraction(raw).location == "https://zoom.us/j/1"
+
+
+def test_structured_output_is_not_repaired(monkeypatch):
+    monkeypatch.setattr(llm_agent, 'OLLAMA_STRUCTURED_OUTPUT', True)
+    with pytest.raises(ValueError):
+        _parse_extraction('{"date": "2025-10-23", // ISO\n "start_time": "3pm"}')
+
+
+@pytest.mark.parametrize('raw', ['nothing to see', '{"title": broken}'])
+def test_parse_extraction_raises_on_malformed_output(raw):
+    with pytest.raises(ValueError):
+        _parse_extraction(raw)
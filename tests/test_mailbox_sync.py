@@ -0,0 +1,138 @@
+import multiprocessing
+
+import httplib2
+import pytest
+from googleapiclient.errors import HttpError
+
+import mailbox_sync
+from mailbox_sync import MailboxSync
+
+
+class _Request:
+    def __init__(self, result):
+        self.result = result
+
+    def execute(self, **kwargs):
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+
+class _Gmail:
+    """Just enough of the Gmail service for MailboxSync"""
+
+    def __init__(self):
+        self.profile_history_id = 100
+        self.unread = ['a', 'b']
+        self.deltas = []
+        self.delta_history_id = 200
+        self.history_error = None
+        self.full_lists = 0
+
+    def users(self):
+        return self
+
+    def getProfile(self, userId):
+        return _Request({'historyId': self.profile_history_id})
+
+    def messages(self):
+        return self
+
+    def history(self):
+        return _History(self)
+
+    def list(self, **kwargs):
+        self.full_lists += 1
+        return _Request({'messages': [{'id': msg_id} for msg_id in self.unread]})
+
+
+class _History:
+    def __init__(self, gmail):
+        self.gmail = gmail
+
+    def list(self, **kwargs):
+        if self.gmail.history_error is not None:
+            return _Request(self.gmail.history_error)
+        added = [{'message': {'id': msg_id, 'labelIds': ['UNREAD']}} for msg_id in self.gmail.deltas]
+        return _Request({'history': [{'messagesAdded': added}], 'historyId': self.gmail.delta_history_id})
+
+
+@pytest.fixture
+def gmail():
+    return _Gmail()
+
+
+@pytest.fixture
+def state_file(tmp_path):
+    return str(tmp_path / 'sync_state.json')
+
+
+def test_first_poll_is_a_full_resync_and_replays_until_committed(gmail, state_file):
+    sync = MailboxSync('m', 'agent', state_file)
+    assert sync.get_new_message_ids(gmail) == (['a', 'b'], '100')
+    assert sync.get_new_message_ids(gmail) == (['a', 'b'], '100')
+    assert gmail.full_lists == 2
+
+
+def test_commit_moves_to_deltas_and_survives_a_restart(gmail, state_file):
+    MailboxSync('m', 'agent', state_file).commit('100')
+    gmail.deltas = ['c']
+
+    sync = MailboxSync('m', 'agent', state_file)
+    assert sync.get_new_message_ids(gmail) == (['c'], 200)
+    assert gmail.full_lists == 0
+
+
+def test_consumers_keep_their_own_position(gmail, state_file):
+    MailboxSync('m', 'agent', state_file).commit('100')
+    assert MailboxSync('m', 'api', state_file).history_id is None
+    assert MailboxSync('m', 'agent', state_file).history_id == '100'
+
+
+def test_failed_ids_come_back_first_until_given_up(gmail, state_file, monkeypatch):
+    monkeypatch.setattr(mailbox_sync, 'SYNC_MAX_ATTEMPTS', 3)
+    sync = MailboxSync('m', 'agent', state_file)
+    ids, history_id = sync.get_new_message_ids(gmail)
+    sync.commit(history_id, ['b'])
+
+    gmail.deltas = ['c']
+    ids, history_id = MailboxSync('m', 'agent', state_file).get_new_message_ids(gmail)
+    assert ids == ['b', 'c']
+
+    sync.commit(history_id, ['b'])
+    assert sync.retry == {'b': 2}
+    sync.commit(history_id, ['b'])
+    assert sync.retry == {}
+    assert MailboxSync('m', 'agent', state_file).get_new_message_ids(gmail)[0] == ['c']
+
+
+def test_expired_history_falls_back_to_a_full_resync(gmail, state_file):
+    sync = MailboxSync('m', 'agent', state_file)
+    sync.commit('50')
+    gmail.history_error = HttpError(httplib2.Response({'status': 404}), b'{}')
+    assert sync.get_new_message_ids(gmail) == (['a', 'b'], '100')
+
+
+def test_other_history_errors_are_raised(gmail, state_file):
+    sync = MailboxSync('m', 'agent', state_file)
+    sync.commit('50')
+    gmail.history_error = HttpError(httplib2.Response({'status': 400}), b'{}')
+    with pytest.raises(HttpError):
+        sync.get_new_message_ids(gmail)
+
+
+def _commit_many(state_file, consumer):
+    sync = MailboxSync('m', consumer, state_file)
+    for history_id in range(1, 51):
+        sync.commit(str(history_id))
+
+
+@pytest.mark.skipif(mailbox_sync.fcntl is None, reason="state file is only locked across processes with fcntl")
+def test_processes_committing_at_once_keep_every_entry(state_file):
+    workers = [multiprocessing.Process(target=_commit_many, args=(state_file, f'c{i}')) for i in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    assert [MailboxSync('m', f'c{i}', state_file).history_id for i in range(4)] == ['50'] * 4
@@ -0,0 +1,117 @@
+import pytest
+import requests
+
+import ollama_client
+from ollama_client import OllamaClient, OllamaUnavailable
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(ollama_client.time, 'monotonic', lambda: now[0])
+    monkeypatch.setattr(ollama_client, 'OLLAMA_BREAKER_FAILURES', 3)
+    monkeypatch.setattr(ollama_client, 'OLLAMA_BREAKER_COOLDOWN', 30.0)
+    return now
+
+
+class _Response:
+    status_code = 200
+    text = ''
+
+    def close(self):
+        pass
+
+
+def _fail(client, endpoint, times):
+    for _ in range(times):
+        assert client._acquire() is endpoint
+        client._release(endpoint, failed=True)
+
+
+def test_breaker_opens_after_consecutive_failures(clock):
+    client = OllamaClient(['http://a'])
+    endpoint = client.endpoints[0]
+    _fail(client, endpoint, 2)
+    assert endpoint.state == 'closed'
+    _fail(client, endpoint, 1)
+    assert endpoint.state == 'open'
+    assert client._acquire() is None
+
+
+def test_half_open_lets_one_trial_through_and_success_closes(clock):
+    client = OllamaClient(['http://a'])
+    endpoint = client.endpoints[0]
+    _fail(client, endpoint, 3)
+    clock[0] += 30
+    assert endpoint.state == 'half-open'
+
+    assert client._acquire() is endpoint
+    assert client._acquire() is None
+    client._release(endpoint, seconds=0.5)
+    assert (endpoint.state, endpoint.latency) == ('closed', 0.5)
+
+
+def test_failed_trial_reopens_for_another_cooldown(clock):
+    client = OllamaClient(['http://a'])
+    endpoint = client.endpoints[0]
+    _fail(client, endpoint, 3)
+    clock[0] += 30
+    _fail(client, endpoint, 1)
+    assert endpoint.state == 'open'
+    clock[0] += 29
+    assert endpoint.state == 'open'
+
+
+def test_cancelled_requests_do_not_count_against_the_server(clock):
+    client = OllamaClient(['http://a'])
+    endpoint = client.endpoints[0]
+    for _ in range(5):
+        client._acquire()
+        client._release(endpoint, failed=None)
+    assert (endpoint.state, endpoint.in_flight) == ('closed', 0)
+
+
+def test_acquire_picks_the_least_loaded_server(clock):
+    client = OllamaClient(['http://a', 'http://b'])
+    fast, slow = client.endpoints
+    fast.latency, slow.latency = 1.0, 4.0
+    # (in_flight + 1) * latency: a is picked until it has 3 requests running
+    picked = [client._acquire().url for _ in range(5)]
+    assert picked == ['http://a', 'http://a', 'http://a', 'http://b', 'http://a']
+
+
+def test_acquire_skips_excluded_and_open_servers(clock):
+    client = OllamaClient(['http://a', 'http://b'])
+    first, second = client.endpoints
+    assert client._acquire(exclude=[first]) is second
+    _fail(client, first, 3)
+    assert client._acquire() is second
+
+
+def test_post_fails_over_to_the_next_server(clock, monkeypatch):
+    client = OllamaClient(['http://a', 'http://b'])
+    calls = []
+
+    def post(url, **kwargs):
+        calls.append(url)
+        if url.startswith('http://a'):
+            raise requests.ConnectionError('refused')
+        return _Response()
+
+    monkeypatch.setattr(client.session, 'post', post)
+    with client.post('/api/generate', {}) as response:
+        assert isinstance(response, _Response)
+    assert calls == ['http://a/api/generate', 'http://b/api/generate']
+    assert [endpoint.errors for endpoint in client.endpoints] == [1, 0]
+
+
+def test_post_without_any_server_raises(clock, monkeypatch):
+    client = OllamaClient(['http://a'])
+
+    def post(url, **kwargs):
+        raise requests.ConnectionError('refused')
+
+    monkeypatch.setattr(client.session, 'post', post)
+    with pytest.raises(OllamaUnavailable):
+        with client.post('/api/generate', {}):
+            pass
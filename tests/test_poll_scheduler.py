@@ -0,0 +1,68 @@
+import pytest
+
+import poll_scheduler
+from poll_scheduler import MailboxSchedule
+
+
+@pytest.fixture(autouse=True)
+def tuning(monkeypatch):
+    monkeypatch.setattr(poll_scheduler, 'POLL_RATE_ALPHA', 0.3)
+    monkeypatch.setattr(poll_scheduler, 'POLL_TARGET_EMAILS', 1.0)
+    monkeypatch.setattr(poll_scheduler, 'POLL_IDLE_BACKOFF', 1.5)
+
+
+def test_interval_follows_the_arrival_rate():
+    schedule = MailboxSchedule('m', min_interval=10, max_interval=600)
+    schedule.record(3, now=100.0)
+    # The first poll counts as one interval: 3 emails / 10s, weighted by alpha
+    assert schedule.rate == pytest.approx(0.09)
+    assert schedule.interval == pytest.approx(1 / 0.09)
+
+
+def test_idle_polls_back_off_up_to_the_max():
+    schedule = MailboxSchedule('m', min_interval=10, max_interval=600)
+    schedule.record(3, now=100.0)
+    first = schedule.interval
+    schedule.record(0, now=100.0 + first)
+    # Slower of the decayed rate's interval and the backed-off one
+    assert schedule.interval == pytest.approx(max(1 / 0.063, first * 1.5))
+
+    now = 200.0
+    for _ in range(30):
+        now += schedule.interval
+        schedule.record(0, now=now)
+    assert schedule.interval == 600
+
+
+def test_saturated_poll_comes_back_at_the_min_interval():
+    schedule = MailboxSchedule('m', min_interval=10, max_interval=600)
+    schedule.record(0, now=100.0)
+    schedule.record(50, saturated=True, now=150.0)
+    assert schedule.interval == 10
+
+
+def test_fast_arrivals_are_clamped_to_the_min_interval():
+    schedule = MailboxSchedule('m', min_interval=10, max_interval=600)
+    schedule.record(1000, now=100.0)
+    assert schedule.interval == 10
+
+
+def test_errors_double_the_delay_without_changing_the_interval():
+    schedule = MailboxSchedule('m', min_interval=10, max_interval=600)
+    schedule.record(1, now=0.0)
+    interval = schedule.interval
+
+    schedule.record_error(now=100.0)
+    assert 100.0 + interval * 2 * 0.9 <= schedule.due <= 100.0 + interval * 2 * 1.1
+    schedule.record_error(now=100.0)
+    assert 100.0 + interval * 4 * 0.9 <= schedule.due <= 100.0 + interval * 4 * 1.1
+    assert (schedule.interval, schedule.errors) == (interval, 2)
+
+    schedule.record(1, now=200.0)
+    assert schedule.errors == 0
+
+
+def test_due_has_bounded_jitter():
+    schedule = MailboxSchedule('m', min_interval=10, max_interval=600)
+    schedule.record(50, saturated=True, now=0.0)
+    assert 9.0 <= schedule.due <= 11.0
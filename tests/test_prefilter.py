@@ -0,0 +1,59 @@
+import json
+
+import pytest
+
+from extraction import NO_EVENT, Extraction
+from prefilter import Prefilter, score_email
+
+MEETING = {'id': 'm1', 'from': 'ana@example.com', 'subject': 'Project sync',
+           'snippet': 'Can we meet on October 23rd at 3pm?'}
+NEWSLETTER = {'id': 'n1', 'from': 'newsletter@shop.example', 'subject': 'Big sale',
+              'snippet': 'Everything 20% off this week', 'labels': ['CATEGORY_PROMOTIONS']}
+
+
+def test_score_adds_signals_and_subtracts_bulk_markers():
+    score, reasons = score_email('Meeting on Friday at 3pm')
+    assert (score, reasons) == (4.0, ['date', 'time', 'keyword'])
+
+    score, reasons = score_email('Webinar on Friday', 'no-reply@example.com', ['CATEGORY_UPDATES'])
+    assert (score, reasons) == (0.5, ['date', 'keyword', 'bulk_sender', 'bulk_label'])
+
+
+def test_threshold_decides_the_candidates():
+    assert Prefilter(threshold=2.0).check(MEETING)['candidate']
+    assert not Prefilter(threshold=5.0).check(MEETING)['candidate']
+    assert not Prefilter(threshold=2.0).check(NEWSLETTER)['candidate']
+
+
+@pytest.mark.parametrize('mode, calls_llm', [('enforce', False), ('shadow', True), ('off', True)])
+def test_only_enforce_mode_skips_the_llm(mode, calls_llm):
+    prefilter = Prefilter(mode=mode, log_path='')
+    assert prefilter.check(MEETING)['call_llm']
+    assert prefilter.check(NEWSLETTER)['call_llm'] is calls_llm
+    assert prefilter.stats()['below_threshold'] == 1
+
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError):
+        Prefilter(mode='sometimes')
+
+
+def test_shadow_mode_logs_would_be_skips_and_tracks_recall(tmp_path):
+    log_path = tmp_path / 'skips.jsonl'
+    prefilter = Prefilter(mode='shadow', log_path=str(log_path))
+    event = Extraction(title='Sale', date='2030-01-01', start_time='09:00', end_time='09:30')
+
+    prefilter.record_outcome(MEETING, prefilter.check(MEETING), event)
+    prefilter.record_outcome(NEWSLETTER, prefilter.check(NEWSLETTER), event)
+
+    entries = [json.loads(line) for line in log_path.read_text().splitlines()]
+    assert [(entry['email_id'], entry['llm_found_scheduling']) for entry in entries] == [('n1', True)]
+    stats = prefilter.stats()
+    assert (stats['shadow_skips'], stats['shadow_misses'], stats['shadow_recall']) == (1, 1, 0.5)
+
+
+def test_enforce_mode_records_nothing(tmp_path):
+    log_path = tmp_path / 'skips.jsonl'
+    prefilter = Prefilter(mode='enforce', log_path=str(log_path))
+    prefilter.record_outcome(NEWSLETTER, prefilter.check(NEWSLETTER), NO_EVENT)
+    assert not log_path.exists()
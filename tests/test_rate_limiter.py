@@ -0,0 +1,51 @@
+import pytest
+
+import rate_limiter
+from rate_limiter import TokenBucket
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(rate_limiter.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def test_bucket_allows_burst_then_asks_to_wait(clock):
+    bucket = TokenBucket(rate=10, burst=2)
+    assert bucket.try_acquire() == 0
+    assert bucket.try_acquire() == 0
+    assert bucket.try_acquire() == pytest.approx(0.1)
+
+    clock[0] += 0.1
+    assert bucket.try_acquire() == 0
+
+
+def test_cost_above_burst_is_capped(clock):
+    bucket = TokenBucket(rate=5, burst=5)
+    assert bucket.try_acquire(cost=50) == 0
+    assert bucket.try_acquire(cost=50) == pytest.approx(1.0)
+
+
+def test_throttle_halves_rate_and_blocks(clock):
+    bucket = TokenBucket(rate=100, burst=100)
+    bucket.on_throttle(2.0)
+    assert bucket.rate == 50
+    assert bucket.try_acquire() == pytest.approx(2.0)
+
+    clock[0] += 2.0
+    # Tokens were emptied, so refilling at the halved rate takes 1/50s
+    assert bucket.try_acquire() == 0
+
+
+def test_rate_recovers_additively_and_never_exceeds_quota(clock):
+    bucket = TokenBucket(rate=100, min_fraction=0.05)
+    for _ in range(10):
+        bucket.on_throttle(0)
+    assert bucket.rate == 5
+
+    bucket.on_success()
+    assert bucket.rate == 6
+    for _ in range(200):
+        bucket.on_success()
+    assert bucket.rate == 100
@@ -0,0 +1,78 @@
+import gzip
+import json
+
+import pytest
+from flask import Flask, jsonify
+
+from responses import compress, etag_for, not_modified, project, requested_fields, with_etag
+
+ITEMS = [{'id': str(i), 'subject': f'Subject {i}', 'body': 'x' * 100} for i in range(30)]
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    app.after_request(compress)
+    version = {'value': 1}
+
+    @app.route('/items')
+    def items():
+        etag = etag_for(version['value'])
+        cached = not_modified(etag)
+        if cached is not None:
+            return cached
+        return with_etag(jsonify(project(ITEMS, requested_fields())), etag)
+
+    @app.route('/plain')
+    def plain():
+        return with_etag(jsonify({'ok': True}))
+
+    client = app.test_client()
+    client.version = version
+    return client
+
+
+def test_matching_etag_gets_304_until_the_data_changes(client):
+    first = client.get('/items')
+    etag = first.headers['ETag']
+    assert first.status_code == 200 and etag.startswith('W/')
+    assert first.headers['Cache-Control'] == 'no-cache'
+
+    cached = client.get('/items', headers={'If-None-Match': etag})
+    assert (cached.status_code, cached.data, cached.headers['ETag']) == (304, b'', etag)
+
+    client.version['value'] = 2
+    assert client.get('/items', headers={'If-None-Match': etag}).status_code == 200
+
+
+def test_etag_depends_on_the_query_string(client):
+    assert client.get('/items').headers['ETag'] != client.get('/items?fields=id').headers['ETag']
+
+
+def test_with_etag_hashes_the_body_without_an_explicit_etag(client):
+    etag = client.get('/plain').headers['ETag']
+    assert client.get('/plain').headers['ETag'] == etag
+
+
+def test_fields_projects_each_item(client):
+    response = client.get('/items?fields=id, subject,missing')
+    assert response.get_json()[0] == {'id': '0', 'subject': 'Subject 0'}
+
+
+def test_project_and_requested_fields_defaults():
+    app = Flask(__name__)
+    with app.test_request_context('/items?fields='):
+        assert requested_fields() is None
+    assert project(ITEMS, None) is ITEMS
+
+
+def test_large_json_is_gzipped_when_accepted(client):
+    response = client.get('/items', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert json.loads(gzip.decompress(response.data)) == ITEMS
+
+
+def test_small_or_unaccepted_responses_stay_plain(client):
+    assert 'Content-Encoding' not in client.get('/items').headers
+    assert 'Content-Encoding' not in client.get('/plain', headers={'Accept-Encoding': 'gzip'}).headers
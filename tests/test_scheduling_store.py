@@ -0,0 +1,59 @@
+import pytest
+
+import scheduling_store
+from scheduling_store import SchedulingStore, decode_cursor, encode_cursor
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    # A fixed clock gives every row the same analyzed_at, so pages are ordered by email id alone
+    monkeypatch.setattr(scheduling_store.time, 'time', lambda: 1000.0)
+    return SchedulingStore(str(tmp_path / 'scheduling.db'))
+
+
+def _email(email_id):
+    return {'id': email_id, 'subject': f'Subject {email_id}', 'from': 'a@example.com', 'snippet': ''}
+
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor(12.5, 'abc')) == (12.5, 'abc')
+    with pytest.raises(ValueError):
+        decode_cursor('not-a-cursor')
+
+
+def test_pages_cover_every_row_once(store):
+    for i in range(7):
+        store.upsert(_email(f'e{i}'), {'date': f'2030-01-0{i + 1}'})
+
+    seen, cursor = [], None
+    while True:
+        page, cursor = store.list(limit=3, cursor=cursor)
+        seen.extend(row['email_id'] for row in page)
+        if cursor is None:
+            break
+    assert seen == [f'e{i}' for i in reversed(range(7))]
+
+
+def test_date_and_mailbox_filters(store):
+    store.upsert(_email('a'), {'date': '2030-01-01'}, 'work')
+    store.upsert(_email('b'), {'date': '2030-01-05'}, 'work')
+    store.upsert(_email('c'), {'date': 'someday'}, 'home')
+
+    assert store.count() == 3
+    assert store.count(mailbox='work') == 2
+    assert [row['email_id'] for row in store.list(date_from='2030-01-02')[0]] == ['b']
+    assert store.list(mailbox='home')[0][0]['event_date'] is None
+
+
+def test_mailboxes_do_not_share_rows(store):
+    store.upsert(_email('same'), {'date': '2030-01-01'}, 'work')
+    store.upsert(_email('same'), {'date': '2030-01-02'}, 'home')
+    assert store.count() == 2
+
+    version = store.version()
+    store.remove('same', 'home')
+    assert store.count(mailbox='work') == 1 and store.count(mailbox='home') == 0
+    assert store.version() == version + 1
+
+    store.remove('same', 'elsewhere')
+    assert store.version() == version + 1
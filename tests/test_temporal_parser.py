@@ -0,0 +1,107 @@
+from datetime import date, time
+
+import pytest
+
+from temporal_parser import add_minutes, parse_date, parse_dates, parse_time, parse_times
+
+# A Wednesday
+TODAY = date(2025, 10, 22)
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('2025-10-23', date(2025, 10, 23)),
+    ('2025-10-23T15:00:00Z', date(2025, 10, 23)),
+    ('10/23/2025', date(2025, 10, 23)),
+    ('10/23/25', date(2025, 10, 23)),
+    ('10/23', date(2025, 10, 23)),
+    ('October 23', date(2025, 10, 23)),
+    ('Oct. 23, 2026', date(2026, 10, 23)),
+    ('Wednesday, October 23rd 2025', date(2025, 10, 23)),
+])
+def test_parse_date_formats(text, expected):
+    assert parse_date(text, TODAY) == expected
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('August 5', date(2025, 8, 5)),
+    ('August 5th', date(2025, 8, 5)),
+    ('Aug 5', date(2025, 8, 5)),
+    ('5 August', date(2025, 8, 5)),
+    ('the 5th of August', date(2025, 8, 5)),
+])
+def test_parse_date_august_is_not_truncated(text, expected):
+    # "August" used to lose its "st" to the ordinal-suffix stripping
+    assert parse_date(text, TODAY) == expected
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('December 1st', date(2025, 12, 1)),
+    ('December 2nd', date(2025, 12, 2)),
+    ('December 3rd', date(2025, 12, 3)),
+    ('December 24th', date(2025, 12, 24)),
+    ('21st of December', date(2025, 12, 21)),
+])
+def test_parse_date_ordinals(text, expected):
+    assert parse_date(text, TODAY) == expected
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('today', date(2025, 10, 22)),
+    ('tonight', date(2025, 10, 22)),
+    ('tomorrow', date(2025, 10, 23)),
+    ('day after tomorrow', date(2025, 10, 24)),
+])
+def test_parse_date_relative(text, expected):
+    assert parse_date(text, TODAY) == expected
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('Friday', date(2025, 10, 24)),
+    ('fri', date(2025, 10, 24)),
+    ('this Friday', date(2025, 10, 24)),
+    ('next Friday', date(2025, 10, 24)),
+    ('Monday', date(2025, 10, 27)),
+    ('Wednesday', date(2025, 10, 22)),
+    ('next Wednesday', date(2025, 10, 29)),
+])
+def test_parse_date_weekdays(text, expected):
+    assert parse_date(text, TODAY) == expected
+
+
+@pytest.mark.parametrize('text', ['February 30th', '2025-13-01', '13/40', 'the day we met', ''])
+def test_parse_date_rejects_impossible_or_unknown(text):
+    with pytest.raises(ValueError):
+        parse_date(text, TODAY)
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('3pm', time(15, 0)),
+    ('3 PM', time(15, 0)),
+    ('3:30 p.m.', time(15, 30)),
+    ('12am', time(0, 0)),
+    ('12pm', time(12, 0)),
+    ('9:05am', time(9, 5)),
+    ('15:00', time(15, 0)),
+    ('09:30:15', time(9, 30, 15)),
+    ('0:00', time(0, 0)),
+    ('noon', time(12, 0)),
+    ('midnight', time(0, 0)),
+])
+def test_parse_time_12h_and_24h(text, expected):
+    assert parse_time(text) == expected
+
+
+@pytest.mark.parametrize('text', ['13pm', '0am', '25:00', '12:60', 'later', ''])
+def test_parse_time_rejects_impossible_or_unknown(text):
+    with pytest.raises(ValueError):
+        parse_time(text)
+
+
+def test_bulk_parsing_returns_none_for_unrecognized():
+    assert parse_dates(['tomorrow', 'someday', None], TODAY) == [date(2025, 10, 23), None, None]
+    assert parse_times(['3pm', 'whenever', '']) == [time(15, 0), None, None]
+
+
+def test_add_minutes_wraps_around_midnight():
+    assert add_minutes(time(15, 0), 30) == time(15, 30)
+    assert add_minutes(time(23, 45), 30) == time(0, 15)